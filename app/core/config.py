@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Literal, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Agro Farm E-commerce API"
@@ -7,6 +7,87 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-super-secret-key-here"  # In production, use environment variable
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     SQLALCHEMY_DATABASE_URL: str = "sqlite:///./agro_farm.db"
+    SQLALCHEMY_READ_DATABASE_URL: Optional[str] = None  # Read replica; defaults to the primary database
+    
+    # Connection pools (per worker process)
+    DB_POOL_SIZE: int = 5
+    DB_READ_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    
+    # SQLite connection pragmas
+    SQLITE_JOURNAL_MODE: str = "WAL"  # Readers don't block the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL, fsync only at checkpoints
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -64000  # Negative values are KiB (64 MB)
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    
+    # Startup
+    SEED_INITIAL_DATA: bool = False  # Create the admin user and sample products on startup
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_WORKERS: int = 2  # Threads running job bodies, off the request event loop
+    SCHEDULER_LEASE_TTL: int = 30  # Seconds before another worker takes over from a dead leader
+
+    # Image processing
+    IMAGE_WORKERS: int = 2  # Worker processes; 0 processes inline on the event loop
+    IMAGE_QUEUE_SIZE: int = 32  # Jobs queued or running before uploads are rejected
+    IMAGE_JOB_TIMEOUT: int = 30  # Seconds
+    IMAGE_MAX_DECODED_PIXELS: int = 24_000_000  # Decoding budget per image (~72 MB as RGB)
+    IMAGE_IMPORT_MAX_ARCHIVE_SIZE: int = 512 * 1024 * 1024  # Bytes
+    IMAGE_IMPORT_MAX_FILES: int = 1000  # Images per archive
+
+    # Orphaned upload cleanup
+    ORPHAN_MIN_AGE_DAYS: int = 7  # Unreferenced files younger than this are kept
+    ORPHAN_SWEEP_BATCH_SIZE: int = 500  # Files re-checked and deleted per batch
+    ORPHAN_SWEEP_DRY_RUN: bool = False  # Only report orphans, never delete them
+    ORPHAN_SWEEP_STATE_FILE: str = "orphan_sweep_state.json"  # Cutoff of the last sweep, for incremental runs
+
+    # Event dispatch
+    EVENT_WORKERS: int = 4  # Worker tasks running event handlers
+    EVENT_QUEUE_SIZE: int = 1000  # Events queued before the overflow policy applies
+    EVENT_HANDLER_TIMEOUT: float = 10.0  # Seconds per handler run
+    EVENT_OVERFLOW_POLICY: Literal["block", "drop_newest", "drop_oldest"] = "block"
+    EVENT_PUBLISH_TIMEOUT: float = 1.0  # Seconds publish waits for space under the block policy
+
+    # Low-stock alerts
+    LOW_STOCK_THRESHOLD: int = 10  # Default; products can override it
+    LOW_STOCK_RECONCILE_HOURS: int = 24  # Safety-net check for alert state that drifted
+
+    # Sales counters
+    SALES_BUCKET_RETENTION_DAYS: int = 90  # Longest bestsellers window; older daily buckets are dropped
+    SALES_REPAIR_HOURS: int = 24  # Recompute counters from order items to fix drift
+
+    # Orders
+    ORDER_MAX_ITEMS: int = 100  # Line items accepted in one order
+
+    # Co-purchase recommendations
+    RECOMMENDATIONS_MAX_BASKET: int = 20  # Orders with more distinct products add no pairs
+
+    # Stalled orders: hours an order may stay in a status before an alert
+    ORDER_STALL_HOURS: Dict[str, float] = {"pending": 24, "processing": 48}
+    ORDER_STALL_RESYNC_HOURS: float = 4.0  # Reload deadlines to pick up other processes' orders
+
+    # Typeahead suggestions
+    SUGGEST_INDEX_ENABLED: bool = True
+    SUGGEST_REFRESH_SECONDS: float = 3600.0  # Incremental index refresh, picking up popularity and other processes' writes; 0 builds once
+
+    # Transactional outbox
+    OUTBOX_RELAY_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 200  # Events claimed per poll
+    OUTBOX_POLL_INTERVAL: float = 0.5  # Seconds between polls when the outbox is drained
+    OUTBOX_CLAIM_TIMEOUT: float = 60.0  # Seconds before another relay may retry a claimed event
+    OUTBOX_RETENTION_HOURS: int = 24  # Processed events are kept this long
+    OUTBOX_COMPACT_INTERVAL: float = 3600.0  # Seconds between compactions
+
+    # Response compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies are sent uncompressed
+
+    # Instrumentation
+    METRICS_ENABLED: bool = True
+    QUERY_TRACKING_ENABLED: bool = False  # Adds X-DB-Queries and logs N+1 warnings (dev)
+    QUERY_REPEAT_THRESHOLD: int = 5  # Same statement shape executed more often than this is flagged
     
     # Email configuration
     SMTP_TLS: bool = True
@@ -16,6 +97,17 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[str] = None
     EMAILS_FROM_NAME: Optional[str] = None
+    SMTP_TIMEOUT: float = 10.0  # Seconds per SMTP command
+
+    # Email delivery queue
+    EMAIL_WORKERS: int = 2  # Each worker keeps one SMTP connection open
+    EMAIL_QUEUE_SIZE: int = 10000
+    EMAIL_BATCH_SIZE: int = 20  # Messages sent per connection before checking for idle
+    EMAIL_MAX_RETRIES: int = 5
+    EMAIL_RETRY_BACKOFF: float = 2.0  # Seconds before the first retry, doubled for each one after
+    EMAIL_RETRY_BACKOFF_MAX: float = 300.0
+    EMAIL_CONNECTION_IDLE_TIMEOUT: float = 30.0  # Seconds before an unused connection is closed
+    EMAIL_DEAD_LETTER_DIR: str = "dead_letters/email"
 
     class Config:
         case_sensitive = True
@@ -1,19 +1,124 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Connection, Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+def _sqlite_pragmas(read_only: bool) -> list[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size = {settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA temp_store = {settings.SQLITE_TEMP_STORE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # Journal mode is persistent in the database file; only writers set it
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+def create_db_engine(url: str, read_only: bool = False) -> Engine:
+    """Create an engine tuned from Settings.
+
+    SQLite file databases get WAL journaling and connection pragmas so readers
+    don't block on writers; read-only engines reject writes with query_only.
+    """
+    database_url = make_url(url)
+    is_sqlite = database_url.get_backend_name() == "sqlite"
+    is_memory = is_sqlite and database_url.database in (None, "", ":memory:")
+
+    kwargs = {}
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not is_memory:
+        kwargs.update(
+            pool_size=settings.DB_READ_POOL_SIZE if read_only else settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+
+    db_engine = create_engine(url, **kwargs)
+
+    if is_sqlite and not is_memory:
+        pragmas = _sqlite_pragmas(read_only)
+
+        @event.listens_for(db_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+
+    return db_engine
+
+engine = create_db_engine(settings.SQLALCHEMY_DATABASE_URL)
+read_engine = create_db_engine(
+    settings.SQLALCHEMY_READ_DATABASE_URL or settings.SQLALCHEMY_DATABASE_URL,
+    read_only=True
 )
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+LEGACY_REVISION = "initial_setup"  # What databases created by create_all before migrations match
+
+def alembic_config(connection: Connection):
+    """Alembic configuration that migrates over an existing connection"""
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["connection"] = connection
+    return config
+
+def init_db(db_engine: Optional[Engine] = None) -> bool:
+    """Bring the schema to the latest migration. Returns False when it was already current.
+
+    An empty database is created from the models and stamped at the latest
+    revision. A database without a revision that already has tables was
+    created by create_all before migrations existed; it is treated as the
+    initial revision and upgraded from there.
+    """
+    # Imported lazily; only startup needs Alembic
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    with (db_engine or engine).begin() as connection:
+        config = alembic_config(connection)
+        current = MigrationContext.configure(connection).get_current_revision()
+        if current == ScriptDirectory.from_config(config).get_current_head():
+            return False
+        if current is None and not inspect(connection).get_table_names():
+            Base.metadata.create_all(bind=connection)
+            command.stamp(config, "head")
+            return True
+        if current is None:
+            command.stamp(config, LEGACY_REVISION)
+        command.upgrade(config, "head")
+    return True
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Session on the read-only engine for endpoints that never write"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,79 @@
+"""Request-scoped batching of lookups by primary key.
+
+A DataLoader collects every load(id) made during one event-loop tick and
+resolves them with a single SELECT ... WHERE id IN (...) just before the
+loop moves on, so code can look rows up one at a time without issuing one
+query per row. Results are cached per loader, and a loader lives for one
+request (see get_loaders), so repeated lookups in a request are free and
+nothing leaks between requests.
+"""
+import asyncio
+from typing import Any, Dict, Generic, Iterable, List, Optional, Type, TypeVar
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.models.product import Product
+from app.models.user import User
+
+T = TypeVar("T")
+
+class DataLoader(Generic[T]):
+    """Batches loads of one model by primary key"""
+
+    def __init__(self, db: Session, model: Type[T]):
+        self.db = db
+        self.model = model
+        self.key = model.__mapper__.primary_key[0]
+        self._cache: Dict[Any, asyncio.Future] = {}
+        self._pending: List[Any] = []
+
+    async def load(self, key: Any) -> Optional[T]:
+        """The row with this primary key, or None if there is none"""
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            if not self._pending:
+                # Runs after every task already scheduled for this tick has queued its keys
+                loop.call_soon(self._dispatch)
+            self._pending.append(key)
+        # Shielded so one cancelled caller doesn't cancel the result for the others
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Any]) -> List[Optional[T]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Any, value: T) -> None:
+        """Cache a row the caller already has"""
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        futures = [self._cache[key] for key in keys]
+        try:
+            rows = self.db.query(self.model).filter(self.key.in_(keys)).all()
+        except Exception as e:
+            for key, future in zip(keys, futures):
+                # Let a later load retry instead of caching the failure
+                self._cache.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        found = {getattr(row, self.key.key): row for row in rows}
+        for key, future in zip(keys, futures):
+            if not future.done():
+                future.set_result(found.get(key))
+
+class Loaders:
+    """The loaders of one request, all bound to its session"""
+
+    def __init__(self, db: Session):
+        self.products: DataLoader[Product] = DataLoader(db, Product)
+        self.users: DataLoader[User] = DataLoader(db, User)
+
+def get_loaders(db: Session = Depends(get_db)) -> Loaders:
+    # FastAPI caches dependencies per request, so every dependent shares these loaders
+    return Loaders(db)
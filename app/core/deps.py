@@ -2,22 +2,15 @@ from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.database import SessionLocal
+from app.core.database import get_db, get_read_db
+from app.core.dataloader import Loaders, get_loaders
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 async def get_current_user(
-    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
     token: str = Depends(oauth2_scheme)
 ) -> User:
     credentials_exception = HTTPException(
@@ -29,13 +22,15 @@ async def get_current_user(
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=["HS256"]
         )
-        user_id: Optional[int] = payload.get("sub")
-        if user_id is None:
+        subject: Optional[str] = payload.get("sub")
+        if subject is None:
             raise credentials_exception
-    except JWTError:
+        user_id = int(subject)
+    except (JWTError, ValueError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Cached for the request, so routes can load the user again without a query
+    user = await loaders.users.load(user_id)
     if user is None:
         raise credentials_exception
     return user
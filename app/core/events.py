@@ -1,41 +1,218 @@
-from typing import Callable, Dict, List
-from app.models.order import OrderStatus
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.metrics import registry
 from loguru import logger
 
+events_published_total = registry.counter(
+    "events_published_total", "Events accepted for dispatch", ("event",)
+)
+events_dropped_total = registry.counter(
+    "events_dropped_total", "Events dropped because the dispatch queue was full", ("event",)
+)
+event_queue_depth = registry.gauge(
+    "event_queue_depth", "Events waiting for a dispatch worker"
+)
+event_handler_duration_seconds = registry.histogram(
+    "event_handler_duration_seconds", "Event handler run time in seconds", ("handler",)
+)
+event_handler_runs_total = registry.counter(
+    "event_handler_runs_total", "Event handler runs by outcome", ("handler", "outcome")
+)
+
+class OverflowPolicy:
+    """What publish does when the dispatch queue is full"""
+    BLOCK = "block"  # Wait up to publish_timeout for space, then drop the new event
+    DROP_NEWEST = "drop_newest"  # Drop the new event immediately
+    DROP_OLDEST = "drop_oldest"  # Evict the oldest queued event to make room
+
 class EventManager:
-    def __init__(self):
+    """Dispatches events to subscribed handlers from a bounded queue.
+
+    publish only enqueues; a pool of worker tasks takes events off the queue
+    and runs all handlers for an event concurrently, each with a timeout, so
+    callers never wait for handler work. Until start() is called (e.g. in
+    scripts), publish runs the handlers directly instead. deliver always runs
+    them directly and reports whether they all succeeded, for callers such
+    as the outbox relay that must know an event was handled.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        queue_size: int = 1000,
+        handler_timeout: float = 10.0,
+        overflow_policy: str = OverflowPolicy.BLOCK,
+        publish_timeout: float = 1.0
+    ):
         self.handlers: Dict[str, List[Callable]] = {}
-    
+        self.workers = workers
+        self.queue_size = queue_size
+        self.handler_timeout = handler_timeout
+        self.overflow_policy = overflow_policy
+        self.publish_timeout = publish_timeout
+        self._accepted_params: Dict[Callable, Optional[Set[str]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._worker_tasks)
+
     def subscribe(self, event_type: str, handler: Callable) -> None:
         """Subscribe a handler to an event type"""
         if event_type not in self.handlers:
             self.handlers[event_type] = []
         self.handlers[event_type].append(handler)
-    
-    async def publish(self, event_type: str, **kwargs) -> None:
-        """Publish an event to all subscribed handlers"""
-        if event_type in self.handlers:
-            for handler in self.handlers[event_type]:
-                try:
-                    await handler(**kwargs)
-                except Exception as e:
-                    logger.error(f"Error in event handler: {str(e)}")
+
+        # Handlers receive only the event fields they declare, unless they take **kwargs
+        parameters = inspect.signature(handler).parameters.values()
+        if any(parameter.kind == parameter.VAR_KEYWORD for parameter in parameters):
+            self._accepted_params[handler] = None
+        else:
+            self._accepted_params[handler] = {parameter.name for parameter in parameters}
+
+    async def start(self) -> None:
+        """Create the queue and worker tasks on the running loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"event-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """Let workers finish queued events, up to drain_timeout, then cancel them"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self._queue.qsize()} queued events on shutdown")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+
+    async def publish(self, event_type: str, **kwargs) -> bool:
+        """Publish an event to all subscribed handlers. Returns False if it was dropped."""
+        if not self.handlers.get(event_type):
+            return True
+        if not self.running:
+            await self._dispatch(event_type, kwargs)
+            events_published_total.inc(event_type)
+            return True
+
+        event = (event_type, kwargs)
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            if not await self._handle_overflow(event):
+                events_dropped_total.inc(event_type)
+                logger.warning(f"Event queue full, dropped {event_type} event")
+                return False
+        events_published_total.inc(event_type)
+        return True
+
+    async def deliver(self, event_type: str, **kwargs) -> bool:
+        """Run all handlers for an event now. Returns False if any of them failed or timed out."""
+        if not self.handlers.get(event_type):
+            return True
+        delivered = await self._dispatch(event_type, kwargs)
+        events_published_total.inc(event_type)
+        return delivered
+
+    async def _handle_overflow(self, event: Tuple[str, dict]) -> bool:
+        if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+            try:
+                dropped_type, _ = self._queue.get_nowait()
+                self._queue.task_done()
+                events_dropped_total.inc(dropped_type)
+                logger.warning(f"Event queue full, dropped oldest {dropped_type} event")
+            except asyncio.QueueEmpty:
+                pass
+            self._queue.put_nowait(event)
+            return True
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            try:
+                await asyncio.wait_for(self._queue.put(event), timeout=self.publish_timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+        return False
+
+    async def _worker(self) -> None:
+        while True:
+            event_type, kwargs = await self._queue.get()
+            try:
+                await self._dispatch(event_type, kwargs)
+            except Exception as e:
+                logger.error(f"Error dispatching {event_type} event: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _dispatch(self, event_type: str, kwargs: Dict[str, Any]) -> bool:
+        """Run the handlers concurrently; True if they all succeeded"""
+        outcomes = await asyncio.gather(*(
+            self._run_handler(handler, kwargs) for handler in list(self.handlers.get(event_type, []))
+        ))
+        return all(outcome == "success" for outcome in outcomes)
+
+    async def _run_handler(self, handler: Callable, kwargs: Dict[str, Any]) -> str:
+        accepted = self._accepted_params.get(handler)
+        if accepted is not None:
+            kwargs = {name: value for name, value in kwargs.items() if name in accepted}
+
+        name = getattr(handler, "__name__", repr(handler))
+        outcome = "success"
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(handler(**kwargs), timeout=self.handler_timeout)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.error(f"Event handler {name} timed out after {self.handler_timeout}s")
+        except Exception as e:
+            outcome = "failure"
+            logger.error(f"Error in event handler {name}: {str(e)}")
+        finally:
+            event_handler_duration_seconds.observe(time.perf_counter() - start_time, name)
+            event_handler_runs_total.inc(name, outcome)
+        return outcome
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
 
 # Create global event manager instance
-event_manager = EventManager()
+event_manager = EventManager(
+    workers=settings.EVENT_WORKERS,
+    queue_size=settings.EVENT_QUEUE_SIZE,
+    handler_timeout=settings.EVENT_HANDLER_TIMEOUT,
+    overflow_policy=settings.EVENT_OVERFLOW_POLICY,
+    publish_timeout=settings.EVENT_PUBLISH_TIMEOUT
+)
+event_queue_depth.add_collector(lambda: [((), event_manager.qsize())])
 
 # Event types
 class OrderEvents:
     STATUS_CHANGED = "order.status_changed"
     CREATED = "order.created"
     CANCELLED = "order.cancelled"
+    STALLED = "order.stalled"
+
+class ProductEvents:
+    LOW_STOCK = "product.low_stock"
+    RESTOCKED = "product.restocked"
 
 # Example event handlers
-async def log_order_status_change(order_id: int, old_status: OrderStatus, new_status: OrderStatus) -> None:
+# Statuses arrive as OrderStatus string values, since events are relayed as JSON from the outbox
+async def log_order_status_change(order_id: int, old_status: str, new_status: str) -> None:
     """Log order status changes"""
     logger.info(f"Order {order_id} status changed from {old_status} to {new_status}")
 
-async def notify_customer_order_status(order_id: int, new_status: OrderStatus, user_email: str) -> None:
+async def notify_customer_order_status(order_id: int, new_status: str, user_email: str) -> None:
     """Send notification to customer about order status change"""
     # This is a placeholder for email notification logic
     logger.info(f"Notification sent to {user_email} for order {order_id}: Status changed to {new_status}")
@@ -44,7 +221,19 @@ async def handle_order_cancellation(order_id: int, reason: str = None) -> None:
     """Handle order cancellation tasks"""
     logger.info(f"Order {order_id} cancelled. Reason: {reason or 'Not specified'}")
 
+async def log_low_stock_alert(product_id: int, product_name: str, stock_quantity: int, threshold: int) -> None:
+    """Log products that dropped to or below their low-stock threshold"""
+    logger.warning(
+        f"Low inventory alert: Product {product_name} (ID: {product_id}) has only "
+        f"{stock_quantity} units left (threshold {threshold})"
+    )
+
+async def log_restock(product_id: int, product_name: str, stock_quantity: int) -> None:
+    logger.info(f"Product {product_name} (ID: {product_id}) restocked to {stock_quantity} units")
+
 # Register default event handlers
 event_manager.subscribe(OrderEvents.STATUS_CHANGED, log_order_status_change)
 event_manager.subscribe(OrderEvents.STATUS_CHANGED, notify_customer_order_status)
-event_manager.subscribe(OrderEvents.CANCELLED, handle_order_cancellation)
\ No newline at end of file
+event_manager.subscribe(OrderEvents.CANCELLED, handle_order_cancellation)
+event_manager.subscribe(ProductEvents.LOW_STOCK, log_low_stock_alert)
+event_manager.subscribe(ProductEvents.RESTOCKED, log_restock)
@@ -43,4 +43,19 @@ class NotAuthorized(AgroFarmException):
         super().__init__(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=message
-        )
\ No newline at end of file
+        )
+
+class ImageProcessingBusy(AgroFarmException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image processing queue is full, try again shortly",
+            headers={"Retry-After": "5"}
+        )
+
+class InvalidSalesWindow(AgroFarmException):
+    def __init__(self, message: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=message
+        )
@@ -0,0 +1,148 @@
+"""Leader election over a lease row, so cluster-wide work runs in one process.
+
+Every worker competes for the same named row in the leases table. The
+holder renews it every ttl/3 seconds and the others retry on the same
+interval, so when the holder dies another worker takes over within one
+ttl. A leader that fails to renew steps down straight away, and is_leader
+turns false once the last successful renewal is a ttl old, so a stalled
+process stops acting as leader by the time its lease can be taken.
+"""
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+from loguru import logger
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.core.metrics import registry
+from app.models.lease import Lease
+
+leader_elected = registry.gauge(
+    "leader_elected", "1 while this process holds the lease", ("lease",)
+)
+leader_transitions_total = registry.counter(
+    "leader_transitions_total", "Times this process gained or lost a lease", ("lease", "transition")
+)
+
+class LeaderElection:
+    """Holds a named lease and runs callbacks when leadership changes"""
+
+    def __init__(
+        self,
+        name: str,
+        on_elected: Callable[[], Awaitable[None]],
+        on_demoted: Callable[[], Awaitable[None]],
+        session_factory: Callable[[], Session] = SessionLocal,
+        ttl: float = 30.0
+    ):
+        self.name = name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.renew_interval = ttl / 3
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._elected = False
+        self._valid_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._elected and time.monotonic() < self._valid_until
+
+    def _try_acquire(self) -> bool:
+        """Take the lease if it is free or expired, or extend it if already held"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(Lease)
+                .where(Lease.name == self.name)
+                .where((Lease.holder == self.holder) | (Lease.expires_at < now))
+                .values(holder=self.holder, expires_at=expires_at),
+                execution_options={"synchronize_session": False}
+            )
+            if result.rowcount == 0:
+                # No row yet, or another holder's lease is still live
+                db.add(Lease(name=self.name, holder=self.holder, expires_at=expires_at))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    return False
+            else:
+                db.commit()
+            return True
+        finally:
+            db.close()
+
+    def _release(self) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                delete(Lease).where(Lease.name == self.name, Lease.holder == self.holder),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def renew(self) -> bool:
+        """Acquire or renew the lease, starting or stopping leader work on a change"""
+        started = time.monotonic()
+        try:
+            acquired = await asyncio.to_thread(self._try_acquire)
+        except Exception as e:
+            logger.error(f"Error renewing {self.name} lease: {str(e)}")
+            acquired = False
+
+        if acquired:
+            self._valid_until = started + self.ttl
+            if not self._elected:
+                self._elected = True
+                leader_elected.set(1, self.name)
+                leader_transitions_total.inc(self.name, "elected")
+                logger.info(f"Holding the {self.name} lease as {self.holder}")
+                await self.on_elected()
+        elif self._elected:
+            await self._demote()
+        return acquired
+
+    async def _demote(self) -> None:
+        self._elected = False
+        self._valid_until = 0.0
+        leader_elected.set(0, self.name)
+        leader_transitions_total.inc(self.name, "demoted")
+        logger.warning(f"Gave up the {self.name} lease")
+        await self.on_demoted()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.renew()
+            except Exception as e:
+                logger.error(f"Error in {self.name} leader callbacks: {str(e)}")
+            await asyncio.sleep(self.renew_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name=f"{self.name}-leader")
+
+    async def stop(self) -> None:
+        """Stop competing, and hand the lease over at once if held"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._elected:
+            await self._demote()
+            try:
+                await asyncio.to_thread(self._release)
+            except Exception as e:
+                logger.error(f"Error releasing {self.name} lease: {str(e)}")
@@ -3,6 +3,7 @@ import sys
 from pathlib import Path
 from loguru import logger
 from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Callable
 import time
 import json
@@ -10,45 +11,11 @@ import json
 # Configure Loguru logger
 LOG_LEVEL = "INFO"
 LOG_PATH = Path("logs")
-LOG_PATH.mkdir(exist_ok=True)
 
-# Remove default logger
-logger.remove()
-
-# Add console logger
-logger.add(
-    sys.stdout,
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-    level=LOG_LEVEL,
-    colorize=True
-)
-
-# Add file logger for errors
-logger.add(
-    LOG_PATH / "error.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-    level="ERROR",
-    rotation="1 day",
-    retention="30 days"
-)
-
-# Add file logger for access logs
-logger.add(
-    LOG_PATH / "access.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {message}",
-    level="INFO",
-    filter=lambda record: "access" in record["extra"],
-    rotation="1 day",
-    retention="30 days"
-)
-
-class RequestLoggingMiddleware:
+class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Middleware for logging requests and responses"""
     
-    def __init__(self, app):
-        self.app = app
-    
-    async def __call__(self, request: Request, call_next: Callable):
+    async def dispatch(self, request: Request, call_next: Callable):
         # Start timer
         start_time = time.time()
         
@@ -93,6 +60,40 @@ class RequestLoggingMiddleware:
 
 def setup_logging():
     """Initialize logging configuration"""
+    LOG_PATH.mkdir(exist_ok=True)
+    
+    # Remove default logger
+    logger.remove()
+    
+    # Add console logger
+    logger.add(
+        sys.stdout,
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+        level=LOG_LEVEL,
+        colorize=True
+    )
+    
+    # Add file logger for errors
+    logger.add(
+        LOG_PATH / "error.log",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+        level="ERROR",
+        rotation="1 day",
+        retention="30 days",
+        delay=True
+    )
+    
+    # Add file logger for access logs
+    logger.add(
+        LOG_PATH / "access.log",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {message}",
+        level="INFO",
+        filter=lambda record: "access" in record["extra"],
+        rotation="1 day",
+        retention="30 days",
+        delay=True
+    )
+    
     # Suppress uvicorn access logging as we have our own
     logging.getLogger("uvicorn.access").handlers = []
     
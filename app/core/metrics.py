@@ -0,0 +1,320 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+JOB_DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+LabelKey = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class Metric:
+    """Base class for metrics rendered in the Prometheus text format.
+
+    Updates are plain dict operations without locks: the request path runs on
+    a single event loop, and the GIL keeps concurrent threadpool updates from
+    corrupting state (at worst a racing increment is lost).
+    """
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labelvalues: Sequence) -> LabelKey:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {len(labelvalues)} values"
+            )
+        return tuple(str(value) for value in labelvalues)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yield (name suffix, rendered labels, value) tuples"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        self._values[self._key(labelvalues)] += amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(self._key(labelvalues), 0.0)
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield "", _format_labels(self.labelnames, key), value
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Iterable[Tuple[Sequence, float]]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._collectors: List[Callable[[], Iterable[Tuple[Sequence, float]]]] = []
+        if collect:
+            self._collectors.append(collect)
+
+    def dec(self, *labelvalues, amount: float = 1.0) -> None:
+        self._values[self._key(labelvalues)] -= amount
+
+    def set(self, value: float, *labelvalues) -> None:
+        self._values[self._key(labelvalues)] = value
+
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[Sequence, float]]]) -> None:
+        """Register a callback that refreshes gauge values at scrape time"""
+        self._collectors.append(collect)
+
+    def samples(self):
+        for collect in self._collectors:
+            for labelvalues, value in collect():
+                self.set(value, *labelvalues)
+        return super().samples()
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per-bucket (non-cumulative) counts; the last slot is the +Inf bucket
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = defaultdict(float)
+
+    def observe(self, value: float, *labelvalues) -> None:
+        key = self._key(labelvalues)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def count(self, *labelvalues) -> int:
+        return sum(self._counts.get(self._key(labelvalues), ()))
+
+    def sum(self, *labelvalues) -> float:
+        return self._sums.get(self._key(labelvalues), 0.0)
+
+    def samples(self):
+        for key, counts in list(self._counts.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield "_bucket", _format_labels(self.labelnames, key, le), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield "_sum", labels, self._sums[key]
+            yield "_count", labels, cumulative
+
+class MetricsRegistry:
+    """Collection of metrics exported together at /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global registry and application metrics
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "Total HTTP requests", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds", ("method", "route")
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("method",)
+)
+db_queries_total = registry.counter("db_queries_total", "Total SQL statements executed")
+db_query_duration_seconds = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time in seconds"
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request",
+    ("route",), buckets=QUERY_COUNT_BUCKETS
+)
+db_time_per_request_seconds = registry.histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request in seconds", ("route",)
+)
+db_pool_connections = registry.gauge(
+    "db_pool_connections", "Connection pool state", ("pool", "state")
+)
+cache_hits_total = registry.counter(
+    "cache_hits_total", "Response cache hits", ("key_prefix",)
+)
+cache_misses_total = registry.counter(
+    "cache_misses_total", "Response cache misses", ("key_prefix",)
+)
+scheduler_job_duration_seconds = registry.histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time in seconds",
+    ("job",), buckets=JOB_DURATION_BUCKETS
+)
+scheduler_job_runs_total = registry.counter(
+    "scheduler_job_runs_total", "Scheduled job runs", ("job", "outcome")
+)
+scheduler_job_last_success_seconds = registry.gauge(
+    "scheduler_job_last_success_seconds", "Unix time the job last finished without error", ("job",)
+)
+scheduler_job_overlaps_total = registry.counter(
+    "scheduler_job_overlaps_total", "Runs skipped because the previous run was still going", ("job",)
+)
+
+class RequestDBStats:
+    """SQL statement count and time accumulated during one request"""
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.seconds += elapsed
+
+request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar(
+    "request_db_stats", default=None
+)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    db_queries_total.inc()
+    db_query_duration_seconds.observe(elapsed)
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+def install_db_instrumentation() -> None:
+    """Time every SQL statement executed by any engine in this process"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+def register_pool(engine: Engine, name: str = "primary") -> None:
+    """Export connection pool statistics for an engine"""
+    def collect():
+        pool = engine.pool
+        for state, attr in (
+            ("size", "size"),
+            ("checked_in", "checkedin"),
+            ("checked_out", "checkedout"),
+            ("overflow", "overflow"),
+        ):
+            getter = getattr(pool, attr, None)
+            if getter is not None:
+                yield (name, state), getter()
+
+    db_pool_connections.add_collector(collect)
+
+def route_label(request: Request) -> str:
+    """Return the route template for a request to keep label cardinality bounded"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """Middleware recording per-route request counts, latency and SQL usage"""
+
+    async def dispatch(self, request: Request, call_next: Callable):
+        method = request.method
+        stats = RequestDBStats()
+        token = request_db_stats.set(stats)
+        http_requests_in_progress.inc(method)
+        start_time = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - start_time
+            http_requests_in_progress.dec(method)
+            request_db_stats.reset(token)
+
+            route = route_label(request)
+            http_requests_total.inc(method, route, status_code)
+            http_request_duration_seconds.observe(duration, method, route)
+            db_queries_per_request.observe(stats.queries, route)
+            db_time_per_request_seconds.observe(stats.seconds, route)
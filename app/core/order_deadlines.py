@@ -0,0 +1,202 @@
+"""Stalled-order detection from per-order deadlines.
+
+Every open order in a status with an SLA (ORDER_STALL_HOURS) has a
+deadline: the time it entered the status plus the SLA. Deadlines are kept
+in a min-heap, rebuilt at startup from the (status, updated_at) index, and
+replaced on every status transition, so a transition costs O(log n) and the
+tracker sleeps until the earliest deadline instead of scanning orders.
+
+Transitions made by other processes aren't seen directly: expired
+deadlines are re-checked against the database before an alert is raised,
+and the heap is rebuilt every ORDER_STALL_RESYNC_HOURS to pick up orders
+created elsewhere.
+"""
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import ReadSessionLocal
+from app.core.events import EventManager, OrderEvents, event_manager
+from app.core.metrics import registry
+from app.models.order import Order, OrderStatus
+
+orders_stalled_total = registry.counter(
+    "orders_stalled_total", "Orders that missed their status deadline", ("status",)
+)
+order_deadlines_tracked = registry.gauge(
+    "order_deadlines_tracked", "Open orders with a pending stall deadline"
+)
+
+# (deadline, order id, status value)
+Deadline = Tuple[datetime, int, str]
+
+class StallTracker:
+    """Min-heap of order deadlines with lazy invalidation"""
+
+    def __init__(
+        self,
+        sla_hours: Dict[str, float],
+        events: EventManager,
+        session_factory: Callable[[], Session] = ReadSessionLocal,
+        resync_interval: float = 4 * 3600
+    ):
+        self.sla = {OrderStatus(status): timedelta(hours=hours) for status, hours in sla_hours.items()}
+        self.events = events
+        self.session_factory = session_factory
+        self.resync_interval = resync_interval
+        self._heap: List[Deadline] = []
+        self._current: Dict[int, Deadline] = {}  # Live entry per order; other heap entries are stale
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_resync = 0.0
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def track(self, order_id: int, status: OrderStatus, since: datetime) -> None:
+        """Replace an order's deadline after it entered status at since"""
+        if not self.running:
+            return
+        self._schedule(order_id, status, since)
+
+    def _schedule(self, order_id: int, status: OrderStatus, since: datetime) -> None:
+        sla = self.sla.get(status)
+        if sla is None:
+            self._current.pop(order_id, None)
+            return
+        entry = (since + sla, order_id, status.value)
+        self._current[order_id] = entry
+        heapq.heappush(self._heap, entry)
+        # Stale entries are skipped when popped; rebuild before they dominate the heap
+        if len(self._heap) > 2 * len(self._current) + 64:
+            self._heap = list(self._current.values())
+            heapq.heapify(self._heap)
+        if self._wakeup is not None and self._heap[0] is entry:
+            self._wakeup.set()
+
+    def next_deadline(self) -> Optional[datetime]:
+        while self._heap and self._current.get(self._heap[0][1]) is not self._heap[0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now: datetime) -> List[Deadline]:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._current.get(entry[1]) is entry:
+                del self._current[entry[1]]
+                expired.append(entry)
+        return expired
+
+    def _load_open_orders(self) -> List[Tuple[int, OrderStatus, datetime]]:
+        db = self.session_factory()
+        try:
+            return db.query(Order.id, Order.status, Order.updated_at).filter(
+                Order.status.in_(list(self.sla))
+            ).all()
+        finally:
+            db.close()
+
+    async def rebuild(self) -> None:
+        """Reload deadlines for every open order in a status with an SLA"""
+        rows = await asyncio.to_thread(self._load_open_orders)
+        self._current = {}
+        for order_id, status, since in rows:
+            self._current[order_id] = (since + self.sla[status], order_id, status.value)
+        self._heap = list(self._current.values())
+        heapq.heapify(self._heap)
+        self._last_resync = time.monotonic()
+        order_deadlines_tracked.set(len(self._current))
+
+    def _confirm(self, expired: List[Deadline]) -> List[Tuple[Deadline, datetime]]:
+        """Keep deadlines whose order is still in the same status since the same time"""
+        db = self.session_factory()
+        try:
+            rows = db.query(Order.id, Order.status, Order.updated_at).filter(
+                Order.id.in_([order_id for _, order_id, _ in expired])
+            ).all()
+        finally:
+            db.close()
+        current = {order_id: (status, since) for order_id, status, since in rows}
+
+        confirmed = []
+        for entry in expired:
+            deadline, order_id, status = entry
+            if order_id not in current:
+                continue
+            current_status, since = current[order_id]
+            if current_status.value == status and since + self.sla[current_status] == deadline:
+                confirmed.append((entry, since))
+            elif current_status in self.sla:
+                # Moved on in another process; track its new deadline
+                self._schedule(order_id, current_status, since)
+        return confirmed
+
+    async def fire_expired(self, now: Optional[datetime] = None) -> int:
+        """Raise alerts for deadlines that have passed. Returns the number raised."""
+        expired = self.pop_expired(now or datetime.utcnow())
+        if not expired:
+            return 0
+        confirmed = await asyncio.to_thread(self._confirm, expired)
+        for (deadline, order_id, status), since in confirmed:
+            logger.warning(
+                f"Stalled order alert: Order {order_id} has been "
+                f"in {status.upper()} status since {since}"
+            )
+            orders_stalled_total.inc(status)
+            await self.events.publish(
+                OrderEvents.STALLED, order_id=order_id, status=status, since=since.isoformat()
+            )
+        order_deadlines_tracked.set(len(self._current))
+        return len(confirmed)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._last_resync >= self.resync_interval:
+                    await self.rebuild()
+                await self.fire_expired()
+            except Exception as e:
+                logger.error(f"Error checking order deadlines: {str(e)}")
+
+            timeout = self.resync_interval - (time.monotonic() - self._last_resync)
+            next_deadline = self.next_deadline()
+            if next_deadline is not None:
+                timeout = min(timeout, (next_deadline - datetime.utcnow()).total_seconds())
+            self._wakeup.clear()
+            # asyncio.wait rather than wait_for, which can swallow a cancel that races a wakeup
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=max(timeout, 0))
+            finally:
+                waiter.cancel()
+
+    async def start(self) -> None:
+        """Load deadlines from the database, then fire them as they expire"""
+        if self._task is None:
+            await self.rebuild()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run(), name="order-deadlines")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._wakeup = None
+            self._heap = []
+            self._current = {}
+
+stall_tracker = StallTracker(
+    settings.ORDER_STALL_HOURS,
+    event_manager,
+    resync_interval=settings.ORDER_STALL_RESYNC_HOURS * 3600
+)
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+from uuid import uuid4
+from loguru import logger
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import EventManager, event_manager
+from app.core.metrics import registry
+from app.models.outbox import OutboxEvent
+
+outbox_events_relayed_total = registry.counter(
+    "outbox_events_relayed_total", "Outbox events whose handlers all succeeded", ("event",)
+)
+outbox_events_failed_total = registry.counter(
+    "outbox_events_failed_total", "Outbox events left unprocessed because a handler failed", ("event",)
+)
+outbox_relay_batch_seconds = registry.histogram(
+    "outbox_relay_batch_seconds", "Time to claim, dispatch and mark one outbox batch"
+)
+outbox_relay_lag_seconds = registry.gauge(
+    "outbox_relay_lag_seconds", "Age of the oldest event in the last relayed batch"
+)
+outbox_events_compacted_total = registry.counter(
+    "outbox_events_compacted_total", "Processed outbox events deleted by compaction"
+)
+
+def add_event(db: Session, event_type: str, **payload) -> OutboxEvent:
+    """Record an event in the caller's transaction; it is relayed after commit"""
+    event = OutboxEvent(event_type=event_type, payload=json.dumps(payload))
+    db.add(event)
+    return event
+
+class OutboxRelay:
+    """Polls the outbox in batches and runs each event's handlers.
+
+    Rows are claimed with a lease before dispatch so several processes can
+    relay the same table. The handlers run directly rather than through the
+    event queue, and only events whose handlers all finished successfully
+    are marked processed, in one UPDATE per batch. A failed event stays
+    unprocessed and is claimed again once its lease expires. Delivery is
+    at-least-once: a crash after the handlers ran but before marking, or a
+    retry after one of several handlers failed, runs them again. Processed
+    rows older than the retention period are compacted away.
+    """
+
+    def __init__(
+        self,
+        events: EventManager,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = 200,
+        poll_interval: float = 0.5,
+        claim_timeout: float = 60.0,
+        retention: timedelta = timedelta(hours=24),
+        compact_interval: float = 3600.0
+    ):
+        self.events = events
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self.relay_id = uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._last_compaction = 0.0
+
+    def _claim_batch(self) -> List[Tuple[int, str, str, datetime]]:
+        """Claim up to batch_size unprocessed rows and return them in order"""
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self.claim_timeout)
+        db = self.session_factory()
+        try:
+            candidates = (
+                select(OutboxEvent.id)
+                .where(OutboxEvent.processed_at.is_(None))
+                .where((OutboxEvent.claimed_at.is_(None)) | (OutboxEvent.claimed_at < lease_expired))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            )
+            db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(candidates.scalar_subquery()))
+                .values(claimed_by=self.relay_id, claimed_at=now),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+            return db.execute(
+                select(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload, OutboxEvent.created_at)
+                .where(OutboxEvent.claimed_by == self.relay_id, OutboxEvent.claimed_at == now)
+                .where(OutboxEvent.processed_at.is_(None))
+                .order_by(OutboxEvent.id)
+            ).all()
+        finally:
+            db.close()
+
+    def _mark_processed(self, ids: List[int]) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids))
+                .values(processed_at=datetime.utcnow()),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _compact(self) -> int:
+        """Delete processed rows older than the retention period"""
+        cutoff = datetime.utcnow() - self.retention
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                delete(OutboxEvent)
+                .where(OutboxEvent.processed_at < cutoff),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+            return result.rowcount or 0
+        finally:
+            db.close()
+
+    async def _relay(self, event_id: int, event_type: str, payload: str) -> bool:
+        """Run one event's handlers; True if it can be marked processed"""
+        try:
+            kwargs = json.loads(payload)
+        except ValueError:
+            # Retrying can't fix it; mark it so it doesn't block the outbox
+            logger.error(f"Skipping outbox event {event_id} with invalid payload")
+            return True
+        if not await self.events.deliver(event_type, **kwargs):
+            outbox_events_failed_total.inc(event_type)
+            logger.warning(f"Outbox event {event_id} ({event_type}) failed, will retry after its lease expires")
+            return False
+        outbox_events_relayed_total.inc(event_type)
+        return True
+
+    async def relay_once(self) -> int:
+        """Relay one batch and return the number of events claimed"""
+        start_time = time.perf_counter()
+        rows = await asyncio.to_thread(self._claim_batch)
+        if not rows:
+            return 0
+
+        delivered = await asyncio.gather(*(
+            self._relay(event_id, event_type, payload) for event_id, event_type, payload, _ in rows
+        ))
+        processed = [row[0] for row, done in zip(rows, delivered) if done]
+        if processed:
+            await asyncio.to_thread(self._mark_processed, processed)
+        outbox_relay_lag_seconds.set((datetime.utcnow() - rows[0][3]).total_seconds())
+        outbox_relay_batch_seconds.observe(time.perf_counter() - start_time)
+        return len(rows)
+
+    async def compact(self) -> int:
+        deleted = await asyncio.to_thread(self._compact)
+        outbox_events_compacted_total.inc(amount=deleted)
+        self._last_compaction = time.monotonic()
+        return deleted
+
+    async def run(self) -> None:
+        while True:
+            try:
+                relayed = await self.relay_once()
+                if time.monotonic() - self._last_compaction >= self.compact_interval:
+                    await self.compact()
+            except Exception as e:
+                relayed = 0
+                logger.error(f"Error relaying outbox events: {str(e)}")
+            # Keep draining while batches come back full
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="outbox-relay")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+outbox_relay = OutboxRelay(
+    event_manager,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    claim_timeout=settings.OUTBOX_CLAIM_TIMEOUT,
+    retention=timedelta(hours=settings.OUTBOX_RETENTION_HOURS),
+    compact_interval=settings.OUTBOX_COMPACT_INTERVAL
+)
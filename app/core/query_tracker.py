@@ -0,0 +1,121 @@
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import Request
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+APP_DIR = Path(__file__).resolve().parent.parent
+_THIS_FILE = Path(__file__).resolve()
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so repeated queries share one shape"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _LITERAL.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+def _call_site() -> str:
+    """Return the innermost application frame outside this module"""
+    for frame in reversed(traceback.extract_stack()):
+        path = Path(frame.filename).resolve()
+        if path == _THIS_FILE or APP_DIR not in path.parents:
+            continue
+        return f"{path.relative_to(APP_DIR.parent)}:{frame.lineno} in {frame.name}"
+    return "<unknown>"
+
+class QueryTracker:
+    """Counts SQL statements and flags statement shapes repeated more than a threshold"""
+
+    def __init__(self, repeat_threshold: int = 5, capture_call_sites: bool = True):
+        self.repeat_threshold = repeat_threshold
+        self.capture_call_sites = capture_call_sites
+        self.count = 0
+        self.shapes: Counter = Counter()
+        self.call_sites: Dict[str, str] = {}
+
+    def record(self, statement: str) -> None:
+        shape = statement_shape(statement)
+        self.count += 1
+        self.shapes[shape] += 1
+        if (
+            self.capture_call_sites
+            and self.shapes[shape] == self.repeat_threshold + 1
+        ):
+            self.call_sites[shape] = _call_site()
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Statement shapes executed more than repeat_threshold times"""
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count > self.repeat_threshold
+        ]
+
+    def summary(self) -> str:
+        return "\n".join(
+            f"{count}x {shape}" for shape, count in self.shapes.most_common()
+        )
+
+request_query_tracker: ContextVar[Optional[QueryTracker]] = ContextVar(
+    "request_query_tracker", default=None
+)
+
+# Trackers that observe statements from every thread, used by test helpers
+_global_trackers: List[QueryTracker] = []
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    tracker = request_query_tracker.get()
+    if tracker is not None:
+        tracker.record(statement)
+    for tracker in _global_trackers:
+        tracker.record(statement)
+
+def install_query_tracking() -> None:
+    """Feed every SQL statement executed in this process to active trackers"""
+    if not event.contains(Engine, "before_cursor_execute", _record_statement):
+        event.listen(Engine, "before_cursor_execute", _record_statement)
+
+@contextmanager
+def track_queries(repeat_threshold: int = 5) -> Iterator[QueryTracker]:
+    """Track every SQL statement executed while the block runs, in any thread"""
+    install_query_tracking()
+    tracker = QueryTracker(repeat_threshold)
+    _global_trackers.append(tracker)
+    try:
+        yield tracker
+    finally:
+        _global_trackers.remove(tracker)
+
+class QueryBudgetMiddleware(BaseHTTPMiddleware):
+    """Middleware counting SQL statements per request and warning about N+1 patterns"""
+
+    def __init__(self, app, repeat_threshold: int = 5):
+        super().__init__(app)
+        self.repeat_threshold = repeat_threshold
+
+    async def dispatch(self, request: Request, call_next: Callable):
+        tracker = QueryTracker(self.repeat_threshold)
+        token = request_query_tracker.set(tracker)
+        try:
+            response = await call_next(request)
+        finally:
+            request_query_tracker.reset(token)
+
+        for shape, count in tracker.repeated():
+            logger.warning(
+                f"Possible N+1 query in {request.method} {request.url.path}: "
+                f"{count}x {shape} (first repeated at {tracker.call_sites.get(shape, '<unknown>')})"
+            )
+
+        response.headers["X-DB-Queries"] = str(tracker.count)
+        return response
@@ -0,0 +1,107 @@
+"""Frequently-bought-together recommendations from order co-purchases.
+
+product_cooccurrences is a sparse co-occurrence matrix in coordinate form:
+one row per ordered product pair with the number of orders containing both.
+create_order adds its pairs in the same transaction, and the table is
+indexed by (product_id, count), so a product's top-K related products are
+one short index range read; order items are never scanned at request time.
+Cancelled orders are kept: the basket still says the products go together.
+An order adds N * (N - 1) rows, so orders with more than
+RECOMMENDATIONS_MAX_BASKET distinct products are left out; such bulk
+baskets say little about what goes together anyway.
+
+rebuild_cooccurrences recomputes the matrix from order history with one
+self-join of order_items, e.g. after loading orders outside the API.
+
+Usage:
+    python -m app.core.recommendations --rebuild
+"""
+import argparse
+import time
+from typing import Iterable, List, Tuple
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import registry
+from app.models.order import OrderItem
+from app.models.product import Product, ProductCooccurrence
+
+co_purchase_baskets_skipped_total = registry.counter(
+    "co_purchase_baskets_skipped_total", "Orders left out of co-purchase counts for having too many products"
+)
+
+def record_co_purchases(db: Session, product_ids: Iterable[int]) -> int:
+    """Count one more co-purchase for every pair of distinct products in an order; call before commit"""
+    products = sorted(set(product_ids))
+    if len(products) > settings.RECOMMENDATIONS_MAX_BASKET:
+        co_purchase_baskets_skipped_total.inc()
+        return 0
+    rows = [
+        {"product_id": product_id, "related_id": related_id, "count": 1}
+        for product_id in products for related_id in products if related_id != product_id
+    ]
+    if not rows:
+        return 0
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    statement = upsert(ProductCooccurrence)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["product_id", "related_id"],
+        set_={"count": ProductCooccurrence.count + statement.excluded["count"]}
+    ), rows)
+    return len(rows)
+
+def related_products(db: Session, product_id: int, limit: int = 10) -> List[Tuple[Product, int]]:
+    """(product, orders bought together) for the products most often ordered with product_id"""
+    return (
+        db.query(Product, ProductCooccurrence.count)
+        .join(ProductCooccurrence, ProductCooccurrence.related_id == Product.id)
+        .filter(ProductCooccurrence.product_id == product_id)
+        .order_by(ProductCooccurrence.count.desc(), ProductCooccurrence.related_id.desc())
+        .limit(limit)
+        .all()
+    )
+
+def rebuild_cooccurrences(db: Session) -> int:
+    """Replace the matrix with counts recomputed from order items. Returns the number of pairs."""
+    item = OrderItem.__table__.alias("item")
+    other = OrderItem.__table__.alias("other")
+    baskets = (
+        select(OrderItem.order_id)
+        .group_by(OrderItem.order_id)
+        .having(func.count(func.distinct(OrderItem.product_id)) <= settings.RECOMMENDATIONS_MAX_BASKET)
+    )
+    pairs = (
+        select(item.c.product_id, other.c.product_id, func.count(func.distinct(item.c.order_id)))
+        .select_from(item.join(other, and_(
+            item.c.order_id == other.c.order_id, item.c.product_id != other.c.product_id
+        )))
+        .where(item.c.order_id.in_(baskets))
+        .group_by(item.c.product_id, other.c.product_id)
+    )
+    db.execute(delete(ProductCooccurrence))
+    db.execute(insert(ProductCooccurrence).from_select(["product_id", "related_id", "count"], pairs))
+    db.commit()
+    return db.query(func.count()).select_from(ProductCooccurrence).scalar()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the product co-purchase matrix")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute it from all order items")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do; pass --rebuild")
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        pairs = rebuild_cooccurrences(db)
+    finally:
+        db.close()
+    print(f"Rebuilt {pairs} product pairs in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
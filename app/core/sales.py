@@ -0,0 +1,201 @@
+"""Denormalized sales counters for popularity sorting and bestsellers.
+
+record_order and record_cancellation adjust the counters in the order's own
+transaction. Lifetime units, orders and last sale time are columns of the
+product row, indexed for sort=popular; product_sales_buckets holds the same
+per product and day, so bestsellers over a rolling window sum a handful of
+rows per product instead of aggregating order items. repair_sales_counters
+recomputes both from order items to fix drift, and drops buckets older than
+SALES_BUCKET_RETENTION_DAYS. It reads the counters and order items from one
+snapshot and adds the difference to each drifted row, so orders counted
+while it runs are kept.
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import Date, DateTime, Table, bindparam, case, cast, func, or_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product, ProductCategory, ProductSalesBucket
+
+sales_counters_repaired_total = registry.counter(
+    "sales_counters_repaired_total", "Sales counter rows corrected by the repair job", ("table",)
+)
+
+WINDOW_PATTERN = re.compile(r"^(\d+)d$")
+
+def parse_window(window: str) -> int:
+    """Days in a window like "7d". Raises ValueError outside 1..SALES_BUCKET_RETENTION_DAYS."""
+    match = WINDOW_PATTERN.match(window)
+    days = int(match.group(1)) if match else 0
+    if not 1 <= days <= settings.SALES_BUCKET_RETENTION_DAYS:
+        raise ValueError(
+            f"Window must be between 1d and {settings.SALES_BUCKET_RETENTION_DAYS}d, got {window!r}"
+        )
+    return days
+
+def _upsert(db: Session, table: Table, key: Sequence[str], rows: List[dict]) -> None:
+    """Insert rows, or add their counts to existing rows with the same key"""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(table)
+    excluded = statement.excluded
+    set_ = {name: table.c[name] + excluded[name] for name in ("units_sold", "order_count")}
+    db.execute(statement.on_conflict_do_update(index_elements=list(key), set_=set_), rows)
+
+def _update_products(db: Session, rows: List[dict]) -> None:
+    """Add rows' counts to the counters of the products they name, in one executemany.
+    last_sold_at only moves forward; rows without a sale time leave it as it is."""
+    if not rows:
+        return
+    products = Product.__table__
+    values = {name: products.c[name] + bindparam(f"new_{name}") for name in ("units_sold", "order_count")}
+    sold_at = bindparam("new_last_sold_at", type_=DateTime)
+    values["last_sold_at"] = case(
+        (or_(products.c.last_sold_at.is_(None), products.c.last_sold_at < sold_at), sold_at),
+        else_=products.c.last_sold_at
+    )
+    # Selling a product isn't an edit of it; keep onupdate from bumping updated_at
+    values["updated_at"] = products.c.updated_at
+    statement = update(products).where(products.c.id == bindparam("product_id")).values(values)
+    db.execute(statement, rows)
+
+def _record(db: Session, order: Order, items: Iterable[Tuple[int, int]], sign: int) -> None:
+    units: Dict[int, int] = {}
+    for product_id, quantity in items:
+        units[product_id] = units.get(product_id, 0) + quantity
+    sold_at = order.created_at or datetime.utcnow()
+    _update_products(db, [
+        {
+            "product_id": product_id,
+            "new_units_sold": sign * quantity,
+            "new_order_count": sign,
+            # A cancellation leaves the last sale time as it was
+            "new_last_sold_at": sold_at if sign > 0 else None,
+        }
+        for product_id, quantity in units.items()
+    ])
+
+    day = sold_at.date()
+    if day > datetime.utcnow().date() - timedelta(days=settings.SALES_BUCKET_RETENTION_DAYS):
+        _upsert(db, ProductSalesBucket.__table__, ["day", "product_id"], [
+            {"day": day, "product_id": product_id, "units_sold": sign * quantity, "order_count": sign}
+            for product_id, quantity in units.items()
+        ])
+
+def record_order(db: Session, order: Order, items: Iterable[Tuple[int, int]]) -> None:
+    """Count a placed order's (product id, quantity) items; call before commit"""
+    _record(db, order, items, 1)
+
+def record_cancellation(db: Session, order: Order, items: Iterable[Tuple[int, int]]) -> None:
+    """Take a cancelled order's items back out of the counters"""
+    _record(db, order, items, -1)
+
+def _day(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(column)
+    return cast(column, Date)
+
+def repair_sales_counters(db: Session, today: Optional[date] = None) -> int:
+    """Recompute counters and recent buckets from order items. Returns the number of rows corrected."""
+    today = today or datetime.utcnow().date()
+    if db.get_bind().dialect.name == "postgresql":
+        # Read counters and order items from one snapshot; SQLite transactions already do
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    is_live = Order.status != OrderStatus.CANCELLED
+    actual = {
+        product_id: (int(units or 0), int(orders or 0), last_sold_at)
+        for product_id, units, orders, last_sold_at in db.query(
+            OrderItem.product_id,
+            func.sum(case((is_live, OrderItem.quantity), else_=0)),
+            func.count(func.distinct(case((is_live, OrderItem.order_id)))),
+            func.max(Order.created_at)
+        ).join(Order, Order.id == OrderItem.order_id).group_by(OrderItem.product_id)
+    }
+    counter_fixes = []
+    for product_id, units, orders, last_sold_at in db.query(
+        Product.id, Product.units_sold, Product.order_count, Product.last_sold_at
+    ):
+        expected_units, expected_orders, expected_last_sold_at = actual.get(product_id, (0, 0, None))
+        moves_forward = expected_last_sold_at is not None and (last_sold_at is None or last_sold_at < expected_last_sold_at)
+        if (units, orders) != (expected_units, expected_orders) or moves_forward:
+            counter_fixes.append({
+                "product_id": product_id,
+                "new_units_sold": expected_units - units,
+                "new_order_count": expected_orders - orders,
+                "new_last_sold_at": expected_last_sold_at,
+            })
+    _update_products(db, counter_fixes)
+
+    # Buckets: recompute the retained days, and drop the ones that aged out
+    start = today - timedelta(days=settings.SALES_BUCKET_RETENTION_DAYS - 1)
+    day = _day(db, Order.created_at)
+    actual_buckets = {}
+    for bucket_day, product_id, units, orders in (
+        db.query(day, OrderItem.product_id, func.sum(OrderItem.quantity), func.count(func.distinct(OrderItem.order_id)))
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(is_live, Order.created_at >= datetime.combine(start, datetime.min.time()))
+        .group_by(day, OrderItem.product_id)
+    ):
+        if isinstance(bucket_day, str):
+            bucket_day = date.fromisoformat(bucket_day)
+        actual_buckets[(bucket_day, product_id)] = (int(units), int(orders))
+    stored_buckets = {
+        (bucket_day, product_id): (units, orders)
+        for bucket_day, product_id, units, orders in db.query(
+            ProductSalesBucket.day, ProductSalesBucket.product_id,
+            ProductSalesBucket.units_sold, ProductSalesBucket.order_count
+        ).filter(ProductSalesBucket.day >= start)
+    }
+    bucket_fixes = []
+    for key in actual_buckets.keys() | stored_buckets.keys():
+        expected_units, expected_orders = actual_buckets.get(key, (0, 0))
+        units, orders = stored_buckets.get(key, (0, 0))
+        if (units, orders) != (expected_units, expected_orders):
+            bucket_day, product_id = key
+            bucket_fixes.append({
+                "day": bucket_day, "product_id": product_id,
+                "units_sold": expected_units - units, "order_count": expected_orders - orders,
+            })
+    _upsert(db, ProductSalesBucket.__table__, ["day", "product_id"], bucket_fixes)
+    db.query(ProductSalesBucket).filter(ProductSalesBucket.day < start).delete(synchronize_session=False)
+    db.commit()
+
+    sales_counters_repaired_total.inc("products", amount=len(counter_fixes))
+    sales_counters_repaired_total.inc("product_sales_buckets", amount=len(bucket_fixes))
+    return len(counter_fixes) + len(bucket_fixes)
+
+def bestsellers(
+    db: Session,
+    days: int,
+    category: Optional[ProductCategory] = None,
+    limit: int = 10,
+    today: Optional[date] = None
+) -> List[Tuple[Product, int, int]]:
+    """(product, units, orders) of the best-selling products over the last days, today included"""
+    start = (today or datetime.utcnow().date()) - timedelta(days=days - 1)
+    totals = (
+        db.query(
+            ProductSalesBucket.product_id,
+            func.sum(ProductSalesBucket.units_sold).label("units_sold"),
+            func.sum(ProductSalesBucket.order_count).label("order_count")
+        )
+        .filter(ProductSalesBucket.day >= start)
+        .group_by(ProductSalesBucket.product_id)
+        .subquery()
+    )
+    query = (
+        db.query(Product, totals.c.units_sold, totals.c.order_count)
+        .join(totals, totals.c.product_id == Product.id)
+        .filter(totals.c.units_sold > 0)
+    )
+    if category:
+        query = query.filter(Product.category == category)
+    return query.order_by(totals.c.units_sold.desc(), Product.id).limit(limit).all()
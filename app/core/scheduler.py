@@ -1,134 +1,161 @@
-from fastapi import FastAPI
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
+"""Scheduled maintenance jobs, run by whichever worker holds the scheduler lease.
+
+Only the leader (see app.core.leader) runs the scheduler and the stalled-order
+tracker, so each job runs once per cluster however many workers there are.
+Job bodies run in a dedicated thread pool rather than on the event loop that
+serves requests.
+"""
 from loguru import logger
-from pathlib import Path
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
-from app.models.product import Product
-from app.models.order import Order, OrderStatus
-from app.utils.file_upload import UPLOAD_DIR
-import os
-
-# Initialize scheduler
-scheduler = AsyncIOScheduler()
+from app.core.leader import LeaderElection
+from app.core.order_deadlines import stall_tracker
+from app.core.sales import repair_sales_counters
+from app.core.stock_alerts import reconcile_stock_alerts
+from app.utils.orphan_sweeper import sweep_orphans
+from app.core.config import settings
+from app.core.metrics import (
+    scheduler_job_duration_seconds, scheduler_job_last_success_seconds,
+    scheduler_job_overlaps_total, scheduler_job_runs_total
+)
+from typing import Callable
+import asyncio
+import functools
+import time
 
-async def cleanup_old_files():
-    """Clean up unused files older than 7 days"""
-    try:
-        cutoff = datetime.now() - timedelta(days=7)
-        
-        for root, _, files in os.walk(UPLOAD_DIR):
-            for file in files:
-                file_path = Path(root) / file
-                if file_path.stat().st_mtime < cutoff.timestamp():
-                    # Check if file is still referenced in database
-                    db = SessionLocal()
-                    try:
-                        product = db.query(Product).filter(
-                            Product.image_url.contains(file)
-                        ).first()
-                        
-                        if not product:
-                            os.remove(file_path)
-                            logger.info(f"Removed unused file: {file_path}")
-                    finally:
-                        db.close()
-    
-    except Exception as e:
-        logger.error(f"Error in cleanup_old_files: {str(e)}")
+# Scheduler instance, created by start_scheduler so APScheduler is only
+# imported by processes that actually run jobs
+scheduler = None
 
-async def check_low_inventory():
-    """Check for products with low inventory and log warnings"""
-    try:
-        db = SessionLocal()
+def instrumented_job(job: Callable) -> Callable:
+    """Record run time and outcome of a scheduled job, and skip it unless leader"""
+    @functools.wraps(job)
+    def wrapper(*args, **kwargs):
+        if not leader.is_leader:
+            # Lease lapsed since the run was scheduled; another worker may own it now
+            scheduler_job_runs_total.inc(job.__name__, "skipped")
+            return None
+        start_time = time.perf_counter()
+        outcome = "success"
         try:
-            low_stock_products = db.query(Product).filter(
-                Product.stock_quantity <= 10
-            ).all()
-            
-            for product in low_stock_products:
-                logger.warning(
-                    f"Low inventory alert: Product {product.name} "
-                    f"(ID: {product.id}) has only {product.stock_quantity} units left"
-                )
+            return job(*args, **kwargs)
+        except Exception:
+            outcome = "failure"
+            raise
         finally:
-            db.close()
-    
-    except Exception as e:
-        logger.error(f"Error in check_low_inventory: {str(e)}")
+            scheduler_job_duration_seconds.observe(time.perf_counter() - start_time, job.__name__)
+            scheduler_job_runs_total.inc(job.__name__, outcome)
+            if outcome == "success":
+                scheduler_job_last_success_seconds.set(time.time(), job.__name__)
+    return wrapper
+
+@instrumented_job
+def cleanup_old_files(incremental: bool = False):
+    """Delete unreferenced uploads older than ORPHAN_MIN_AGE_DAYS"""
+    # The sweep is async; give it its own event loop in this worker thread
+    report = asyncio.run(sweep_orphans(incremental=incremental, dry_run=settings.ORPHAN_SWEEP_DRY_RUN))
+    logger.info(report.summary())
 
-async def check_stalled_orders():
-    """Check for orders that have been in the same status for too long"""
+@instrumented_job
+def reconcile_low_stock_alerts():
+    """Raise or clear low-stock alerts that were missed when stock changed"""
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        try:
-            # Check orders that haven't moved from PENDING in 24 hours
-            cutoff = datetime.utcnow() - timedelta(hours=24)
-            stalled_orders = db.query(Order).filter(
-                Order.status == OrderStatus.PENDING,
-                Order.created_at < cutoff
-            ).all()
-            
-            for order in stalled_orders:
-                logger.warning(
-                    f"Stalled order alert: Order {order.id} has been "
-                    f"in PENDING status since {order.created_at}"
-                )
-            
-            # Check orders that haven't moved from PROCESSING in 48 hours
-            cutoff = datetime.utcnow() - timedelta(hours=48)
-            processing_orders = db.query(Order).filter(
-                Order.status == OrderStatus.PROCESSING,
-                Order.updated_at < cutoff
-            ).all()
-            
-            for order in processing_orders:
-                logger.warning(
-                    f"Stalled order alert: Order {order.id} has been "
-                    f"in PROCESSING status since {order.updated_at}"
-                )
-        
-        finally:
-            db.close()
-    
-    except Exception as e:
-        logger.error(f"Error in check_stalled_orders: {str(e)}")
+        events = reconcile_stock_alerts(db)
+        if events:
+            logger.warning(f"Low-stock reconciliation raised or cleared {events} alerts")
+    finally:
+        db.close()
+
+@instrumented_job
+def repair_product_sales():
+    """Recompute sales counters from order items and drop expired daily buckets"""
+    db = SessionLocal()
+    try:
+        fixed = repair_sales_counters(db)
+        if fixed:
+            logger.warning(f"Sales counter repair corrected {fixed} rows")
+    finally:
+        db.close()
+
+def record_overlap(event) -> None:
+    scheduler_job_overlaps_total.inc(event.job_id)
+    logger.warning(f"Skipped {event.job_id}: the previous run is still going")
 
-def init_scheduler(app: FastAPI):
-    """Initialize and start the scheduler with all jobs"""
+def start_scheduler() -> None:
+    """Create the scheduler, register all jobs and start it"""
+    global scheduler
+    from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+    from apscheduler.executors.pool import ThreadPoolExecutor
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.triggers.interval import IntervalTrigger
+    
+    # The event loop only fires triggers; job bodies run in the thread pool
+    scheduler = AsyncIOScheduler(
+        executors={"default": ThreadPoolExecutor(settings.SCHEDULER_WORKERS)},
+        job_defaults={"coalesce": True, "max_instances": 1}
+    )
+    scheduler.add_listener(record_overlap, EVENT_JOB_MAX_INSTANCES)
     
     # Add jobs to scheduler
     scheduler.add_job(
         cleanup_old_files,
         CronTrigger(hour=3, minute=0),  # Run at 3 AM every day
+        kwargs={"incremental": True},
         id='cleanup_old_files',
-        name='Clean up unused files',
+        name='Clean up unused files added since the last sweep',
         misfire_grace_time=3600  # Allow job to be run up to 1 hour late
     )
     
     scheduler.add_job(
-        check_low_inventory,
-        IntervalTrigger(hours=6),  # Run every 6 hours
-        id='check_low_inventory',
-        name='Check low inventory',
+        cleanup_old_files,
+        CronTrigger(day_of_week='sun', hour=4, minute=0),  # Full sweep every Sunday at 4 AM
+        id='cleanup_old_files_full',
+        name='Clean up all unused files',
+        misfire_grace_time=3600
+    )
+    
+    # Alerts are raised as stock changes; this only repairs drifted alert state
+    scheduler.add_job(
+        reconcile_low_stock_alerts,
+        IntervalTrigger(hours=settings.LOW_STOCK_RECONCILE_HOURS),
+        id='reconcile_low_stock_alerts',
+        name='Reconcile low-stock alerts',
         misfire_grace_time=3600
     )
     
+    # Counters are updated with each order and backfilled by their migration;
+    # this only fixes drift and drops expired buckets
     scheduler.add_job(
-        check_stalled_orders,
-        IntervalTrigger(hours=4),  # Run every 4 hours
-        id='check_stalled_orders',
-        name='Check stalled orders',
+        repair_product_sales,
+        IntervalTrigger(hours=settings.SALES_REPAIR_HOURS),
+        id='repair_product_sales',
+        name='Repair product sales counters',
         misfire_grace_time=3600
     )
     
     # Start scheduler
     scheduler.start()
-    
-    # Shutdown event handler
-    @app.on_event("shutdown")
-    async def shutdown_scheduler():
-        scheduler.shutdown()
\ No newline at end of file
+
+def shutdown_scheduler() -> None:
+    """Stop the scheduler if it is running"""
+    global scheduler
+    if scheduler is not None and scheduler.running:
+        # Don't block the event loop on a running job; its thread finishes on its own
+        scheduler.shutdown(wait=False)
+    scheduler = None
+
+async def start_leader_work() -> None:
+    start_scheduler()
+    await stall_tracker.start()
+
+async def stop_leader_work() -> None:
+    await stall_tracker.stop()
+    shutdown_scheduler()
+
+leader = LeaderElection(
+    "scheduler",
+    start_leader_work,
+    stop_leader_work,
+    ttl=settings.SCHEDULER_LEASE_TTL
+)
@@ -1,15 +1,21 @@
+import enum
 from typing import Optional
 from sqlalchemy import or_
 from sqlalchemy.orm import Query
 from app.models.product import Product, ProductCategory
 
+class ProductSort(str, enum.Enum):
+    NAME = "name"
+    POPULAR = "popular"  # Most units sold first
+
 def filter_products(
     query: Query,
     search: Optional[str] = None,
     category: Optional[ProductCategory] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    in_stock: Optional[bool] = None
+    in_stock: Optional[bool] = None,
+    sort: ProductSort = ProductSort.NAME
 ) -> Query:
     if search:
         search_filter = or_(
@@ -33,4 +39,7 @@ def filter_products(
         else:
             query = query.filter(Product.stock_quantity == 0)
     
+    if sort == ProductSort.POPULAR:
+        # Ordered by the counters' popularity index rather than aggregating order items
+        return query.order_by(Product.units_sold.desc(), Product.id.desc())
     return query.order_by(Product.name)
\ No newline at end of file
@@ -1,9 +1,16 @@
 from fastapi import HTTPException, Request
-from typing import Callable, Optional
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import serialize_response
+from typing import Callable, Dict, Optional
+import functools
+import inspect
 import time
 from datetime import datetime, timedelta
 from cachetools import TTLCache
 from collections import defaultdict
+from app.core.compression import compress, negotiate_encoding
+from app.core.config import settings
+from app.core.metrics import cache_hits_total, cache_misses_total
 
 # Rate limiting configuration
 RATE_LIMIT_DURATION = 60  # seconds
@@ -44,14 +51,75 @@ def rate_limit(max_requests: int = MAX_REQUESTS, duration: int = RATE_LIMIT_DURA
         return wrapper
     return decorator
 
+class CachedResponse:
+    """Serialized response body plus compressed variants, each built once per cache fill"""
+    
+    def __init__(self, body: bytes, status_code: int = 200, media_type: str = "application/json"):
+        self.body = body
+        self.status_code = status_code
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {}
+    
+    def body_for(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        variant = self.variants.get(encoding)
+        if variant is None:
+            variant = self.variants[encoding] = compress(self.body, encoding)
+        return variant
+    
+    def to_response(self, request: Request) -> Response:
+        encoding = None
+        if settings.COMPRESSION_ENABLED and len(self.body) >= settings.COMPRESSION_MINIMUM_SIZE:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.body_for(encoding),
+            status_code=self.status_code,
+            headers=headers,
+            media_type=self.media_type
+        )
+
+async def render_cached_response(request: Request, content) -> CachedResponse:
+    """Serialize endpoint output through the route's response model"""
+    route = request.scope.get("route")
+    content = await serialize_response(
+        field=getattr(route, "response_field", None),
+        response_content=content,
+        include=getattr(route, "response_model_include", None),
+        exclude=getattr(route, "response_model_exclude", None),
+        by_alias=getattr(route, "response_model_by_alias", True),
+        exclude_unset=getattr(route, "response_model_exclude_unset", False),
+        exclude_defaults=getattr(route, "response_model_exclude_defaults", False),
+        exclude_none=getattr(route, "response_model_exclude_none", False),
+    )
+    return CachedResponse(
+        body=JSONResponse(content).body,
+        status_code=getattr(route, "status_code", None) or 200
+    )
+
 def cache_response(
     expire_after_seconds: int = 300,
     key_prefix: str = "",
     vary_on_headers: Optional[list[str]] = None
 ):
-    """Caching decorator for API endpoints"""
+    """Caching decorator for API endpoints.
+    
+    Responses are cached as serialized bytes so hits skip serialization, and
+    compressed variants are stored alongside the raw body.
+    """
     def decorator(func: Callable):
-        async def wrapper(request: Request, *args, **kwargs):
+        signature = inspect.signature(func)
+        wants_request = "request" in signature.parameters
+
+        @functools.wraps(func)
+        async def wrapper(*args, request: Request, **kwargs):
+            if wants_request:
+                kwargs["request"] = request
+
             # Generate cache key
             cache_key = f"{key_prefix}:{request.url.path}"
             
@@ -66,14 +134,27 @@ def cache_response(
                         cache_key += f":{header}={request.headers[header]}"
             
             # Return cached response if exists
-            if cache_key in cache:
-                return cache[cache_key]
+            cached = cache.get(cache_key)
+            if cached is not None:
+                cache_hits_total.inc(key_prefix)
+                return cached.to_response(request)
             
             # Generate and cache response
-            response = await func(request, *args, **kwargs)
-            cache[cache_key] = response
-            return response
+            cache_misses_total.inc(key_prefix)
+            response = await func(*args, **kwargs)
+            if isinstance(response, Response):
+                return response
+            cached = await render_cached_response(request, response)
+            cache[cache_key] = cached
+            return cached.to_response(request)
         
+        if not wants_request:
+            request_param = inspect.Parameter(
+                "request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+            )
+            wrapper.__signature__ = signature.replace(
+                parameters=[*signature.parameters.values(), request_param]
+            )
         return wrapper
     return decorator
 
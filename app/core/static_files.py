@@ -0,0 +1,122 @@
+import os
+import stat
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.compression import negotiate_encoding
+from app.utils.file_upload import PRECOMPRESSED_SUFFIXES, file_version, image_content_key
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Alternate formats stored next to content-addressed images, in order of preference
+ALTERNATE_FORMATS = {
+    ".jpg": ((".webp", "image/webp"),),
+    ".jpeg": ((".webp", "image/webp"),),
+    ".png": ((".webp", "image/webp"),),
+}
+
+def accepts_media_type(accept: str, media_type: str) -> bool:
+    """Whether an Accept header explicitly lists a media type with a non-zero quality"""
+    for part in accept.split(","):
+        value, _, params = part.strip().partition(";")
+        if value.strip().lower() != media_type:
+            continue
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+def _regular_file(path: Path) -> Optional[os.stat_result]:
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return stat_result if stat.S_ISREG(stat_result.st_mode) else None
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files with long-lived caching for versioned URLs.
+
+    Content-addressed images, and other files requested with the ?v= token
+    from get_file_url, are served with an immutable Cache-Control; anything
+    else must be revalidated. Content-addressed images are swapped for an
+    alternate format the client accepts (WebP for JPEG/PNG), and any file is
+    swapped for a precompressed .br/.gz sibling when one exists. Range
+    requests and conditional requests are handled by FileResponse/StaticFiles.
+    """
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path = Path(full_path)
+        content_key = image_content_key(path.name)
+        headers: Dict[str, str] = {}
+        vary = []
+
+        if content_key or QueryParams(scope.get("query_string", b"")).get("v") == file_version(stat_result):
+            headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+
+        media_type = guess_type(path.name)[0] or "application/octet-stream"
+        alternates = ALTERNATE_FORMATS.get(path.suffix.lower(), ()) if content_key else ()
+        if alternates:
+            vary.append("Accept")
+            path, stat_result, media_type = self._negotiate_format(
+                path, stat_result, media_type, alternates, request_headers.get("accept", "")
+            )
+
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if any(_regular_file(path.with_name(path.name + suffix)) for suffix in PRECOMPRESSED_SUFFIXES.values()):
+            vary.append("Accept-Encoding")
+            if encoding is not None:
+                compressed = path.with_name(path.name + PRECOMPRESSED_SUFFIXES[encoding])
+                compressed_stat = _regular_file(compressed)
+                if compressed_stat is not None:
+                    path, stat_result = compressed, compressed_stat
+                    headers["Content-Encoding"] = encoding
+
+        if vary:
+            headers["Vary"] = ", ".join(vary)
+        # Content-addressed files never change, so their name is a strong validator
+        etag = path.name if content_key else file_version(stat_result)
+        headers["ETag"] = f'"{etag}"'
+
+        response = FileResponse(
+            path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    @staticmethod
+    def _negotiate_format(
+        path: Path,
+        stat_result: os.stat_result,
+        media_type: str,
+        alternates: Tuple[Tuple[str, str], ...],
+        accept: str,
+    ) -> Tuple[Path, os.stat_result, str]:
+        for suffix, alternate_type in alternates:
+            if not accepts_media_type(accept, alternate_type):
+                continue
+            alternate = path.with_suffix(suffix)
+            alternate_stat = _regular_file(alternate)
+            if alternate_stat is not None:
+                return alternate, alternate_stat, alternate_type
+        return path, stat_result, media_type
@@ -0,0 +1,108 @@
+"""Low-stock alerts raised where stock changes.
+
+Code that changes stock_quantity calls check_stock_levels in the same
+transaction. A product that is at or below its threshold and not already
+alerted gets a product.low_stock event in the outbox; one that has risen
+back above it gets product.restocked. The alert state kept on the product
+row makes each crossing alert exactly once. reconcile_stock_alerts repairs
+any state that drifted, e.g. from stock edited directly in the database.
+"""
+from datetime import datetime
+from typing import Iterable, List
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.events import ProductEvents
+from app.core.metrics import registry
+from app.core.outbox import add_event
+from app.models.product import Product
+
+stock_alerts_total = registry.counter(
+    "stock_alerts_total", "Low-stock alerts raised and cleared", ("event",)
+)
+
+def effective_threshold(product: Product) -> int:
+    if product.low_stock_threshold is not None:
+        return product.low_stock_threshold
+    return settings.LOW_STOCK_THRESHOLD
+
+def check_stock_levels(db: Session, products: Iterable[Product]) -> int:
+    """Raise or clear alerts for products whose stock changed. Returns the number of events added."""
+    products = list({
+        product.id: product for product in products if product.stock_quantity is not None
+    }.values())
+
+    events = 0
+    now = datetime.utcnow()
+    for product in products:
+        threshold = effective_threshold(product)
+        is_low = product.stock_quantity <= threshold
+        is_alerted = product.low_stock_alerted_at is not None
+
+        if is_low and not is_alerted:
+            product.low_stock_alerted_at = now
+            product.low_stock_alerted_quantity = product.stock_quantity
+            add_event(
+                db,
+                ProductEvents.LOW_STOCK,
+                product_id=product.id,
+                product_name=product.name,
+                stock_quantity=product.stock_quantity,
+                threshold=threshold
+            )
+            stock_alerts_total.inc(ProductEvents.LOW_STOCK)
+            events += 1
+        elif is_alerted and not is_low:
+            product.low_stock_alerted_at = None
+            product.low_stock_alerted_quantity = None
+            add_event(
+                db,
+                ProductEvents.RESTOCKED,
+                product_id=product.id,
+                product_name=product.name,
+                stock_quantity=product.stock_quantity,
+                threshold=threshold
+            )
+            stock_alerts_total.inc(ProductEvents.RESTOCKED)
+            events += 1
+    return events
+
+def mismatched_alert_ids(db: Session) -> List[int]:
+    """Products whose alert state disagrees with their stock level"""
+    is_low = Product.stock_quantity <= func.coalesce(Product.low_stock_threshold, settings.LOW_STOCK_THRESHOLD)
+    is_alerted = Product.low_stock_alerted_at.isnot(None)
+    rows = (
+        db.query(Product.id)
+        .filter(Product.stock_quantity.isnot(None))
+        .filter(or_(and_(is_low, ~is_alerted), and_(~is_low, is_alerted)))
+    )
+    return [product_id for product_id, in rows]
+
+def reconcile_stock_alerts(db: Session) -> int:
+    """Raise or clear alerts that were missed. Returns the number of events added."""
+    product_ids = mismatched_alert_ids(db)
+    if not product_ids:
+        return 0
+    products = db.query(Product).filter(Product.id.in_(product_ids)).all()
+    events = check_stock_levels(db, products)
+    db.commit()
+    return events
+
+def active_alerts(db: Session) -> List[dict]:
+    rows = (
+        db.query(
+            Product.id, Product.name, Product.stock_quantity, Product.low_stock_threshold, Product.low_stock_alerted_at
+        )
+        .filter(Product.low_stock_alerted_at.isnot(None))
+        .order_by(Product.low_stock_alerted_at)
+    )
+    return [
+        {
+            "product_id": product_id,
+            "product_name": name,
+            "stock_quantity": stock_quantity,
+            "threshold": threshold if threshold is not None else settings.LOW_STOCK_THRESHOLD,
+            "alerted_at": alerted_at,
+        }
+        for product_id, name, stock_quantity, threshold, alerted_at in rows
+    ]
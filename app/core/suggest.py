@@ -0,0 +1,349 @@
+"""Typeahead suggestions from an in-memory prefix index.
+
+Product names are normalized (accents stripped, case folded, punctuation
+dropped) and indexed under every word start, so "mil" and "fresh mil" both
+find "Fresh Milk". The keys live in one sorted array searched with bisect.
+Small key ranges are ranked directly. Every range larger than SCAN_LIMIT keeps
+a precomputed list of its most popular products, built bottom-up from its
+children, so a lookup touches at most SCAN_LIMIT keys whatever the prefix.
+
+Every worker process builds and keeps its own index: about 400 MB and a
+12 s build per 1M products, paid once per worker at startup. Product writes
+update the index of the process that made them in place. Popularity (units
+sold) and writes made by other processes are picked up every
+SUGGEST_REFRESH_SECONDS by an incremental refresh: a thread reads each
+product's id, units sold and updated_at, and only products that changed are
+loaded and reindexed, in small batches between lookups. Workers' indexes
+can differ by up to one refresh interval. When a large share of the catalog
+changed, the refresh falls back to a full rebuild, swapped in when done.
+"""
+import asyncio
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from loguru import logger
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import ReadSessionLocal
+from app.core.metrics import registry
+from app.models.product import Product, ProductCategory
+
+suggest_index_products = registry.gauge(
+    "suggest_index_products", "Products in the typeahead prefix index"
+)
+suggest_index_build_seconds = registry.gauge(
+    "suggest_index_build_seconds", "Time taken by the last full build of the prefix index"
+)
+
+MAX_SUGGESTIONS = 20  # Largest limit a lookup may ask for
+TOP_SIZE = 2 * MAX_SUGGESTIONS  # Kept per large range so removals rarely force a recompute
+SCAN_LIMIT = 256  # Key ranges up to this size are ranked directly
+RANK_SCALE = 2 ** 40  # Ranks are units sold, then lower ids first, packed into one int
+REFRESH_OVERLAP = timedelta(minutes=1)  # Edits committed late or by a skewed clock are still picked up
+REFRESH_BATCH = 500  # Products loaded per query and reindexed between lookups during a refresh
+FULL_REBUILD_FRACTION = 0.2  # A refresh changing more of the catalog than this rebuilds it instead
+NON_ALNUM = re.compile(r"[\W_]+")
+
+# (id, name, category, units sold)
+ProductEntry = Tuple[int, str, ProductCategory, int]
+
+def normalize(text: str) -> str:
+    """Lowercase words without accents or punctuation, separated by single spaces"""
+    if not text.isascii():
+        text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return " ".join(NON_ALNUM.sub(" ", text).casefold().split())
+
+def index_keys(name: str) -> Set[str]:
+    """The name from each of its word starts on"""
+    words = normalize(name).split()
+    return {" ".join(words[start:]) for start in range(len(words))}
+
+def rank(product_id: int, units_sold: int) -> int:
+    return units_sold * RANK_SCALE - product_id
+
+def _prefix_end(prefix: str) -> str:
+    """The smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+class PrefixIndex:
+    """Sorted (key, product id) arrays with top lists for large prefix ranges"""
+
+    def __init__(self, products: Iterable[ProductEntry] = ()):
+        self.products: Dict[int, Tuple[str, ProductCategory]] = {}
+        self._rank: Dict[int, int] = {}
+        entries = []
+        for product_id, name, category, units_sold in products:
+            self.products[product_id] = (name, category)
+            self._rank[product_id] = rank(product_id, units_sold)
+            entries.extend((key, product_id) for key in index_keys(name))
+        entries.sort()
+        self.keys: List[str] = [key for key, _ in entries]
+        self.ids: List[int] = [product_id for _, product_id in entries]
+        self._top: Dict[str, List[int]] = {}
+        self._truncated: Set[str] = set()  # Top lists that were cut to TOP_SIZE
+        if entries:
+            self._build_top("", 0, len(entries))
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def ranks(self) -> Dict[int, int]:
+        """A copy of every indexed product's rank"""
+        return self._rank.copy()
+
+    def _best(self, ids: Iterable[int]) -> List[int]:
+        return heapq.nlargest(TOP_SIZE + 1, set(ids), key=self._rank.__getitem__)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, prefix)
+        return lo, bisect_left(self.keys, _prefix_end(prefix), lo)
+
+    def _build_top(self, prefix: str, lo: int, hi: int) -> List[int]:
+        """Top products of the keys in [lo, hi), which all start with prefix; caches large ranges"""
+        if hi - lo <= SCAN_LIMIT:
+            return self._best(self.ids[lo:hi])
+        depth = len(prefix)
+        start = lo
+        while start < hi and len(self.keys[start]) == depth:  # The prefix itself sorts first
+            start += 1
+        candidates = self.ids[lo:start]
+        while start < hi:
+            child = self.keys[start][:depth + 1]
+            end = bisect_left(self.keys, _prefix_end(child), start, hi)
+            candidates.extend(self._build_top(child, start, end))
+            start = end
+        top = self._best(candidates)
+        if len(top) > TOP_SIZE:
+            del top[TOP_SIZE:]
+            self._truncated.add(prefix)
+        else:
+            self._truncated.discard(prefix)
+        self._top[prefix] = top
+        return top
+
+    def search(self, query: str, limit: int = 10) -> List[int]:
+        """Ids of the most popular products with a name word starting with query"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        lo, hi = self._range(prefix)
+        if hi - lo <= SCAN_LIMIT:
+            return self._best(self.ids[lo:hi])[:limit]
+        top = self._top.get(prefix)
+        if top is None:
+            # The range grew past SCAN_LIMIT, or lost too many of its top products
+            top = self._build_top(prefix, lo, hi)
+        return top[:limit]
+
+    def add(self, product_id: int, name: str, category: ProductCategory, units_sold: Optional[int] = None) -> None:
+        """Index a product, replacing it if present; units_sold defaults to its current count"""
+        if units_sold is None:
+            units_sold = (self._rank[product_id] + product_id) // RANK_SCALE if product_id in self._rank else 0
+        self.remove(product_id)
+        self.products[product_id] = (name, category)
+        product_rank = self._rank[product_id] = rank(product_id, units_sold)
+        for key in index_keys(name):
+            position = bisect_left(self.keys, key)
+            while position < len(self.keys) and self.keys[position] == key and self.ids[position] < product_id:
+                position += 1
+            self.keys.insert(position, key)
+            self.ids.insert(position, product_id)
+            for length in range(1, len(key) + 1):
+                top = self._top.get(key[:length])
+                if top is None or product_id in top:
+                    continue
+                truncated = key[:length] in self._truncated
+                if truncated and len(top) and product_rank < self._rank[top[-1]]:
+                    continue  # Ranks below everything kept; unseen products may rank above it
+                top.append(product_id)
+                top.sort(key=self._rank.__getitem__, reverse=True)
+                if len(top) > TOP_SIZE:
+                    del top[TOP_SIZE:]
+                    self._truncated.add(key[:length])
+
+    def remove(self, product_id: int) -> None:
+        if product_id not in self.products:
+            return
+        name, _ = self.products.pop(product_id)
+        for key in index_keys(name):
+            position = bisect_left(self.keys, key)
+            while position < len(self.keys) and self.keys[position] == key:
+                if self.ids[position] == product_id:
+                    del self.keys[position]
+                    del self.ids[position]
+                    break
+                position += 1
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                top = self._top.get(prefix)
+                if top is None or product_id not in top:
+                    continue
+                top.remove(product_id)
+                if prefix in self._truncated and len(top) < MAX_SUGGESTIONS:
+                    # Products beyond the kept list are unknown; recompute on the next lookup
+                    del self._top[prefix]
+                    self._truncated.discard(prefix)
+        del self._rank[product_id]
+
+class ProductSuggester:
+    """The prefix index of one process, with in-place updates and periodic incremental refreshes"""
+
+    def __init__(self, session_factory: Callable[[], Session] = ReadSessionLocal, refresh_interval: float = 600.0):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.index = PrefixIndex()
+        self._lock = threading.Lock()
+        self._pending: Optional[List[Tuple]] = None  # Writes made while a rebuild or refresh is loading
+        self._refreshed_at: Optional[datetime] = None  # When the data of the last build or refresh was read
+        self._task: Optional[asyncio.Task] = None
+
+    def suggest(self, query: str, limit: int = 10) -> Tuple[List[ProductCategory], List[Tuple[int, str, ProductCategory]]]:
+        """Categories and (id, name, category) of products matching what has been typed so far"""
+        prefix = normalize(query)
+        categories = [
+            category for category in ProductCategory
+            if any(key.startswith(prefix) for key in index_keys(category.value))
+        ] if prefix else []
+        index = self.index
+        products = []
+        for product_id in index.search(prefix, limit):
+            name, category = index.products[product_id]
+            products.append((product_id, name, category))
+        return categories, products
+
+    def add(self, product: Product) -> None:
+        """Index a created or renamed product"""
+        self._apply(("add", product.id, product.name or "", product.category))
+
+    def remove(self, product_id: int) -> None:
+        self._apply(("remove", product_id))
+
+    def _apply(self, change: Tuple) -> None:
+        with self._lock:
+            self._change(self.index, change)
+            if self._pending is not None:
+                self._pending.append(change)
+
+    @staticmethod
+    def _change(index: PrefixIndex, change: Tuple) -> None:
+        if change[0] == "add":
+            index.add(*change[1:])
+        else:
+            index.remove(change[1])
+
+    def _load(self, db: Session, ids: Optional[List[int]] = None) -> List[ProductEntry]:
+        query = db.query(Product.id, Product.name, Product.category, Product.units_sold)
+        if ids is not None:
+            query = query.filter(Product.id.in_(ids))
+        return [(product_id, name or "", category, units_sold) for product_id, name, category, units_sold in query]
+
+    def rebuild(self, db: Optional[Session] = None) -> int:
+        """Rebuild the index from the database and swap it in; returns the number of products"""
+        start = time.perf_counter()
+        read_at = datetime.utcnow()
+        with self._lock:
+            self._pending = []
+        try:
+            session = db or self.session_factory()
+            try:
+                index = PrefixIndex(self._load(session))
+            finally:
+                if db is None:
+                    session.close()
+            with self._lock:
+                # Replay writes the snapshot may have missed; adds and removes are idempotent
+                for change in self._pending:
+                    self._change(index, change)
+                self.index = index
+                self._refreshed_at = read_at
+        finally:
+            with self._lock:
+                self._pending = None
+        elapsed = time.perf_counter() - start
+        suggest_index_products.set(len(index))
+        suggest_index_build_seconds.set(elapsed)
+        logger.info(f"Built suggest index of {len(index)} products in {elapsed:.1f}s")
+        return len(index)
+
+    def _load_changes(self) -> Tuple[datetime, List[Tuple]]:
+        """Changes that bring the index up to date with the database; starts recording local writes"""
+        read_at = datetime.utcnow()
+        since = self._refreshed_at - REFRESH_OVERLAP
+        with self._lock:
+            ranks = self.index.ranks()
+            self._pending = []
+        session = self.session_factory()
+        try:
+            stale = []
+            for product_id, units_sold, updated_at in session.query(
+                Product.id, Product.units_sold, Product.updated_at
+            ):
+                # Selling a product doesn't touch updated_at, so popularity is compared separately
+                if ranks.pop(product_id, None) != rank(product_id, units_sold) or (
+                    updated_at is not None and updated_at >= since
+                ):
+                    stale.append(product_id)
+            changes: List[Tuple] = [("remove", product_id) for product_id in ranks]  # Deleted since
+            for start in range(0, len(stale), REFRESH_BATCH):
+                changes.extend(("add", *entry) for entry in self._load(session, stale[start:start + REFRESH_BATCH]))
+        finally:
+            session.close()
+        return read_at, changes
+
+    async def refresh(self) -> int:
+        """Apply what changed in the database since the last build or refresh.
+
+        Returns the number of changed products, or of all products when this is the first build.
+        """
+        if self._refreshed_at is None:
+            return await asyncio.to_thread(self.rebuild)
+        try:
+            read_at, changes = await asyncio.to_thread(self._load_changes)
+            rebuild = len(changes) > len(self.index) * FULL_REBUILD_FRACTION
+            if not rebuild:
+                for start in range(0, len(changes), REFRESH_BATCH):
+                    with self._lock:
+                        for change in changes[start:start + REFRESH_BATCH]:
+                            self._change(self.index, change)
+                    await asyncio.sleep(0)  # Let lookups run between batches
+                with self._lock:
+                    # Local writes made since the read are newer than what it returned
+                    for change in self._pending:
+                        self._change(self.index, change)
+                    self._refreshed_at = read_at
+        finally:
+            with self._lock:
+                self._pending = None
+        if rebuild:
+            await asyncio.to_thread(self.rebuild)
+        else:
+            suggest_index_products.set(len(self.index))
+            logger.info(f"Refreshed suggest index with {len(changes)} changed products")
+        return len(changes)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing suggest index: {str(e)}")
+            if self.refresh_interval <= 0:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="suggest-index")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+product_suggester = ProductSuggester(refresh_interval=settings.SUGGEST_REFRESH_SECONDS)
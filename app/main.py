@@ -1,33 +1,78 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
-from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from app.core.logging import setup_logging, RequestLoggingMiddleware
 from app.core.docs import api_tags_metadata
 from app.routers import auth, product, order
-from app.core.database import engine, SessionLocal
-from app.models import user, product as product_model, order as order_model
-from app.utils.seed_data import seed_initial_data
+from app.core.database import engine, read_engine, SessionLocal, init_db
+from app.core import scheduler
+from app.core.events import event_manager
+from app.core.outbox import outbox_relay
+from app.core.suggest import product_suggester
+from app.utils.email_queue import email_queue
+from app.utils.email_templates import email_templates
+from app.models import user, product as product_model, order as order_model, outbox as outbox_model, lease as lease_model
+from app.utils.file_upload import UPLOAD_DIR, ensure_upload_dirs
+from app.utils.image_processing import image_processor
 from app.core.middleware import error_handler
+from app.core.compression import CompressionMiddleware
+from app.core.static_files import ImmutableStaticFiles
+from app.core.metrics import (
+    MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, install_db_instrumentation, register_pool, registry
+)
+from app.core.query_tracker import QueryBudgetMiddleware, install_query_tracking
+from contextlib import asynccontextmanager
 from datetime import datetime
-from pathlib import Path
-
-# Setup logging
-setup_logging()
+from loguru import logger
 
-# Create database tables
-user.Base.metadata.create_all(bind=engine)
-product_model.Base.metadata.create_all(bind=engine)
-order_model.Base.metadata.create_all(bind=engine)
-
-# Seed initial data
-db = SessionLocal()
-seed_initial_data(db)
-db.close()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Setup logging
+    setup_logging()
+    
+    # Ensure upload directories exist
+    ensure_upload_dirs()
+    
+    # Create missing database tables and indexes
+    if init_db():
+        logger.info("Database schema updated")
+    
+    # Seed initial data (opt-in, hashes the admin password)
+    if settings.SEED_INITIAL_DATA:
+        from app.utils.seed_data import seed_initial_data
+        
+        db = SessionLocal()
+        try:
+            seed_initial_data(db)
+        finally:
+            db.close()
+    
+    email_templates.load()
+    await email_queue.start()
+    await event_manager.start()
+    if settings.OUTBOX_RELAY_ENABLED:
+        outbox_relay.start()
+    # Suggestions are empty until the first build finishes in the background
+    if settings.SUGGEST_INDEX_ENABLED:
+        product_suggester.start()
+    
+    # Every worker competes for the lease; only the holder runs the scheduled jobs
+    if settings.SCHEDULER_ENABLED:
+        scheduler.leader.start()
+    
+    yield
+    
+    await scheduler.leader.stop()
+    await product_suggester.stop()
+    await outbox_relay.stop()
+    await event_manager.stop()
+    await email_queue.stop()
+    image_processor.shutdown()
 
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
@@ -61,21 +106,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count", "X-Process-Time"]
+    expose_headers=["X-Total-Count", "X-Process-Time", "X-DB-Queries"]
 )
 
+# Compress large responses; precompressed cached bodies pass through untouched
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
 # Add request logging middleware
 app.add_middleware(RequestLoggingMiddleware)
 
+# Add metrics middleware
+if settings.METRICS_ENABLED:
+    install_db_instrumentation()
+    register_pool(engine)
+    register_pool(read_engine, name="read")
+    app.add_middleware(MetricsMiddleware)
+
+# Add per-request SQL query budget tracking
+if settings.QUERY_TRACKING_ENABLED:
+    install_query_tracking()
+    app.add_middleware(QueryBudgetMiddleware, repeat_threshold=settings.QUERY_REPEAT_THRESHOLD)
+
 # Add error handling middleware
 @app.middleware("http")
 async def error_handling_middleware(request: Request, call_next):
     return await error_handler(request, call_next)
 
-# Mount static file directory
-uploads_path = Path("uploads")
-uploads_path.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_path), name="uploads")
+# Mount static file directory (created on startup)
+app.mount("/uploads", ImmutableStaticFiles(directory=UPLOAD_DIR, check_dir=False), name="uploads")
 
 # Custom validation error handler
 @app.exception_handler(RequestValidationError)
@@ -110,14 +169,6 @@ async def health_check():
         "version": "1.0.0"
     }
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    # Ensure upload directories exist
-    uploads_path.mkdir(exist_ok=True)
-    (uploads_path / "products").mkdir(exist_ok=True)
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    pass
\ No newline at end of file
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
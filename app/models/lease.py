@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from app.core.database import Base
+
+class Lease(Base):
+    """A named lock held by one process until it expires"""
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # Process holding the lease
+    expires_at = Column(DateTime, nullable=False)
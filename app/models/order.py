@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -28,6 +28,11 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        # Stall tracking loads open orders by status with the time they entered it
+        Index("ix_orders_status_updated_at", "status", "updated_at"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
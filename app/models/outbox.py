@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from app.core.database import Base
+
+class OutboxEvent(Base):
+    """An event written in the same transaction as the change it describes"""
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON keyword arguments for the handlers
+    created_at = Column(DateTime, default=datetime.utcnow)
+    claimed_by = Column(String, nullable=True)  # Relay holding the row
+    claimed_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The relay only ever scans unprocessed rows
+        Index(
+            "ix_outbox_unprocessed", "id",
+            sqlite_where=processed_at.is_(None),
+            postgresql_where=processed_at.is_(None)
+        ),
+        Index("ix_outbox_processed_at", "processed_at"),
+    )
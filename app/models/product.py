@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, Text, Date, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -22,8 +22,42 @@ class Product(Base):
     category = Column(Enum(ProductCategory))
     unit = Column(String)  # e.g., kg, pieces, litres
     image_url = Column(String, nullable=True)
+    low_stock_threshold = Column(Integer, nullable=True)  # None uses LOW_STOCK_THRESHOLD
+    low_stock_alerted_at = Column(DateTime, nullable=True)  # Set while stock is at or below the threshold
+    low_stock_alerted_quantity = Column(Integer, nullable=True)
+    # Sales counters, kept up to date as orders are placed and cancelled
+    units_sold = Column(Integer, nullable=False, default=0, server_default="0")
+    order_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_sold_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    order_items = relationship("OrderItem", back_populates="product")
\ No newline at end of file
+    order_items = relationship("OrderItem", back_populates="product")
+
+    __table_args__ = (
+        # sort=popular walks this index instead of aggregating order items
+        Index("ix_products_popularity", "units_sold", "id"),
+    )
+
+class ProductSalesBucket(Base):
+    """Units and orders of a product on one day, for rolling-window bestsellers"""
+    __tablename__ = "product_sales_buckets"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    units_sold = Column(Integer, nullable=False, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+
+class ProductCooccurrence(Base):
+    """Number of orders containing both products; stored in both directions"""
+    __tablename__ = "product_cooccurrences"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    related_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # A product's top-K related products are the first K entries of this index
+        Index("ix_product_cooccurrences_top", "product_id", "count", "related_id"),
+    )
@@ -1,20 +1,34 @@
 from typing import List
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.core.deps import get_current_user, get_current_active_admin, get_db
+from sqlalchemy.orm import Session, selectinload
+from app.core.dataloader import Loaders, get_loaders
+from app.core.deps import get_current_user, get_current_active_admin, get_db, get_read_db
 from app.core.pagination import Page, PageParams, paginate
-from app.core.exceptions import OrderNotFound, NotAuthorized, InsufficientStock
+from app.core.exceptions import (
+    OrderNotFound, NotAuthorized, InsufficientStock, InvalidOrderStatus, ProductNotFound
+)
 from app.core.order_utils import OrderStatusTransition
+from app.core.events import OrderEvents
+from app.core.outbox import add_event
+from app.core.recommendations import record_co_purchases
+from app.core.sales import record_cancellation, record_order
+from app.core.security_utils import clear_cache_for_prefix
+from app.core.stock_alerts import check_stock_levels
+from app.core.order_deadlines import stall_tracker
 from app.models.order import Order, OrderItem, OrderStatus
-from app.models.product import Product
 from app.models.user import User
 from app.schemas.order import OrderCreate, OrderUpdate, Order as OrderSchema
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+async def _order_email(order: Order, loaders: Loaders) -> str:
+    """Email of the order's customer; no query when they made the request"""
+    user = await loaders.users.load(order.user_id)
+    return user.email
+
 @router.get("/", response_model=Page[OrderSchema])
 async def list_orders(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     params: PageParams = Depends(),
     status: OrderStatus = None
@@ -23,7 +37,7 @@ async def list_orders(
     List orders with pagination.
     Admins can see all orders, regular users see only their orders.
     """
-    query = db.query(Order)
+    query = db.query(Order).options(selectinload(Order.items))
     if not current_user.is_admin:
         query = query.filter(Order.user_id == current_user.id)
     if status:
@@ -34,7 +48,7 @@ async def list_orders(
 @router.get("/{order_id}", response_model=OrderSchema)
 async def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -52,6 +66,7 @@ async def get_order(
 async def create_order(
     order_in: OrderCreate,
     db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -61,9 +76,11 @@ async def create_order(
     # Calculate total amount and validate stock
     total_amount = 0
     order_items = []
+    products = []
     
-    for item in order_in.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+    # One query for every product in the order
+    loaded = await loaders.products.load_many(item.product_id for item in order_in.items)
+    for item, product in zip(order_in.items, loaded):
         if not product:
             raise ProductNotFound(item.product_id)
         if product.stock_quantity < item.quantity:
@@ -71,6 +88,7 @@ async def create_order(
         
         # Update stock quantity
         product.stock_quantity -= item.quantity
+        products.append(product)
         total_amount += product.price * item.quantity
         
         order_items.append({
@@ -80,31 +98,58 @@ async def create_order(
         })
     
     # Create order
+    user_id, user_email = current_user.id, current_user.email
     db_order = Order(
-        user_id=current_user.id,
+        user_id=user_id,
         total_amount=total_amount,
         status=OrderStatus.PENDING,
         shipping_address=order_in.shipping_address,
         contact_phone=order_in.contact_phone
     )
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db.flush()
     
     # Create order items
     for item_data in order_items:
         db_item = OrderItem(order_id=db_order.id, **item_data)
         db.add(db_item)
     
+    # The event commits atomically with the order and is relayed afterwards
+    add_event(
+        db,
+        OrderEvents.CREATED,
+        order_id=db_order.id,
+        user_id=user_id,
+        user_email=user_email,
+        total_amount=total_amount
+    )
+    check_stock_levels(db, products)
+    record_order(db, db_order, [(item["product_id"], item["quantity"]) for item in order_items])
+    record_co_purchases(db, [item["product_id"] for item in order_items])
     db.commit()
+    # Stock and sales counters changed, so cached listings and rankings are stale
+    clear_cache_for_prefix("product")
     db.refresh(db_order)
+    stall_tracker.track(db_order.id, db_order.status, db_order.updated_at)
     return db_order
 
+async def _cancel_items(db: Session, order: Order, loaders: Loaders) -> None:
+    """Restock a cancelled order's items and take them out of the sales counters; call before commit,
+    and clear the product caches after it"""
+    products = await loaders.products.load_many(item.product_id for item in order.items)
+    for item, product in zip(order.items, products):
+        if product:
+            product.stock_quantity += item.quantity
+    check_stock_levels(db, [product for product in products if product])
+    record_cancellation(db, order, [(item.product_id, item.quantity) for item in order.items])
+    add_event(db, OrderEvents.CANCELLED, order_id=order.id)
+
 @router.put("/{order_id}/status", response_model=OrderSchema)
 async def update_order_status(
     order_id: int,
     status: OrderStatus,
     db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
     current_user: User = Depends(get_current_active_admin)
 ):
     """
@@ -116,15 +161,29 @@ async def update_order_status(
         raise OrderNotFound(order_id)
     
     OrderStatusTransition.validate_transition(order.status, status)
+    add_event(
+        db,
+        OrderEvents.STATUS_CHANGED,
+        order_id=order.id,
+        old_status=order.status.value,
+        new_status=status.value,
+        user_email=await _order_email(order, loaders)
+    )
+    if status == OrderStatus.CANCELLED:
+        await _cancel_items(db, order, loaders)
     order.status = status
     db.commit()
+    if status == OrderStatus.CANCELLED:
+        clear_cache_for_prefix("product")
     db.refresh(order)
+    stall_tracker.track(order.id, order.status, order.updated_at)
     return order
 
 @router.post("/{order_id}/cancel", response_model=OrderSchema)
 async def cancel_order(
     order_id: int,
     db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -146,15 +205,20 @@ async def cancel_order(
             ["Cannot cancel order in current status"]
         )
     
-    # Restore product quantities
-    for item in order.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if product:
-            product.stock_quantity += item.quantity
-    
+    add_event(
+        db,
+        OrderEvents.STATUS_CHANGED,
+        order_id=order.id,
+        old_status=order.status.value,
+        new_status=OrderStatus.CANCELLED.value,
+        user_email=await _order_email(order, loaders)
+    )
+    await _cancel_items(db, order, loaders)
     order.status = OrderStatus.CANCELLED
     db.commit()
+    clear_cache_for_prefix("product")
     db.refresh(order)
+    stall_tracker.track(order.id, order.status, order.updated_at)
     return order
 
 @router.get("/status/transitions")
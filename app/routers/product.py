@@ -1,17 +1,32 @@
+import functools
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session
-from app.core.deps import get_current_user, get_current_active_admin, get_db
-from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductUpdate, Product as ProductSchema
+from app.core.deps import get_current_user, get_current_active_admin, get_db, get_read_db
+from app.schemas.product import (
+    BestSeller, ProductCreate, ProductUpdate, Product as ProductSchema, RelatedProduct, StockAlertStatus,
+    StockAlertUpdate, Suggestions
+)
 from app.models.user import User
 from app.core.pagination import Page, PageParams, paginate
-from app.core.search import filter_products
-from app.core.exceptions import ProductNotFound
-from app.models.product import Product, ProductCategory
-from app.utils.file_upload import save_upload_file, delete_file, get_file_url
+from app.core.search import ProductSort, filter_products
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.exceptions import InvalidSalesWindow, ProductNotFound, AgroFarmException
+from app.models.product import (
+    Product, ProductCategory, ProductCooccurrence, ProductSalesBucket
+)
+from app.core.recommendations import related_products
+from app.core.suggest import MAX_SUGGESTIONS, product_suggester
+from app.core.sales import bestsellers, parse_window
+from app.core.stock_alerts import active_alerts, check_stock_levels, effective_threshold
+from app.utils.file_upload import (
+    UPLOAD_DIR, stage_upload_file, delete_image, get_file_url, image_srcset, primary_image_path
+)
+from app.utils.image_processing import ImageJob, generate_variants, image_processor
+from app.utils.image_import import import_product_images
 from app.core.docs import generate_response_schema
-from app.core.security_utils import cache_response
+from app.core.security_utils import cache_response, clear_cache_for_prefix
 
 router = APIRouter(prefix="/products", tags=["products"])
 
@@ -19,13 +34,14 @@ router = APIRouter(prefix="/products", tags=["products"])
 @cache_response(expire_after_seconds=300, key_prefix="products", vary_on_headers=["authorization"])
 async def list_products(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     params: PageParams = Depends(),
     search: Optional[str] = None,
     category: Optional[ProductCategory] = None,
     min_price: Optional[float] = Query(None, ge=0),
     max_price: Optional[float] = Query(None, ge=0),
-    in_stock: Optional[bool] = None
+    in_stock: Optional[bool] = None,
+    sort: ProductSort = ProductSort.NAME
 ):
     """
     List products with filtering and pagination.
@@ -34,6 +50,7 @@ async def list_products(
     - **min_price**: Minimum price filter
     - **max_price**: Maximum price filter
     - **in_stock**: Filter by stock availability
+    - **sort**: `name` (default) or `popular` for most units sold first
     """
     query = db.query(Product)
     query = filter_products(
@@ -42,13 +59,64 @@ async def list_products(
         category=category,
         min_price=min_price,
         max_price=max_price,
-        in_stock=in_stock
+        in_stock=in_stock,
+        sort=sort
     )
     return paginate(query, params)
 
+@router.get("/bestsellers", response_model=List[BestSeller])
+@cache_response(expire_after_seconds=60, key_prefix="product_bestsellers")
+async def list_bestsellers(
+    *,
+    db: Session = Depends(get_read_db),
+    category: Optional[ProductCategory] = None,
+    window: str = "7d",
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Best-selling products over a rolling window of days, today included.
+    - **category**: Filter by product category
+    - **window**: Days to cover, e.g. `1d`, `7d` or `30d`
+    """
+    try:
+        days = parse_window(window)
+    except ValueError as e:
+        raise InvalidSalesWindow(str(e))
+    return [
+        {"product": product, "units_sold": units_sold, "order_count": order_count}
+        for product, units_sold, order_count in bestsellers(db, days, category=category, limit=limit)
+    ]
+
+@router.get("/suggest", response_model=Suggestions)
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=MAX_SUGGESTIONS)
+):
+    """
+    Typeahead suggestions for a partly typed search, most popular products first.
+    - **q**: Start of any word in a product name or category
+    """
+    categories, products = product_suggester.suggest(q, limit)
+    return {
+        "categories": categories,
+        "products": [
+            {"id": product_id, "name": name, "category": category} for product_id, name, category in products
+        ],
+    }
+
+@router.get("/stock-alerts", response_model=List[StockAlertStatus])
+async def list_stock_alerts(
+    db: Session = Depends(get_read_db),
+    _: None = Depends(get_current_active_admin)
+):
+    """
+    List products currently below their low-stock threshold (admin only).
+    """
+    return active_alerts(db)
+
 @router.get("/{product_id}", response_model=ProductSchema)
 @cache_response(expire_after_seconds=300, key_prefix="product")
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: int, db: Session = Depends(get_read_db)):
     """
     Get a specific product by ID.
     """
@@ -57,6 +125,21 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
         raise ProductNotFound(product_id)
     return product
 
+@router.get("/{product_id}/related", response_model=List[RelatedProduct])
+@cache_response(expire_after_seconds=300, key_prefix="product_related")
+async def list_related_products(
+    product_id: int,
+    db: Session = Depends(get_read_db),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Products most often bought together with this one, by number of shared orders.
+    """
+    related = related_products(db, product_id, limit=limit)
+    if not related and not db.query(Product.id).filter(Product.id == product_id).first():
+        raise ProductNotFound(product_id)
+    return [{"product": product, "bought_together": count} for product, count in related]
+
 @router.post("/", response_model=ProductSchema)
 async def create_product(
     product_in: ProductCreate,
@@ -70,42 +153,129 @@ async def create_product(
     db.add(product)
     db.commit()
     db.refresh(product)
+    product_suggester.add(product)
+    clear_cache_for_prefix("product")
     return product
 
-@router.post("/{product_id}/image")
+def _image_in_use(db: Session, image_path: str, exclude_product_id: Optional[int] = None) -> bool:
+    """Whether any product references an image; identical uploads share one copy"""
+    query = db.query(Product.id).filter(Product.image_url == image_path)
+    if exclude_product_id is not None:
+        query = query.filter(Product.id != exclude_product_id)
+    return query.first() is not None
+
+async def _apply_product_image(product_id: int, old_image: Optional[str], job: ImageJob) -> None:
+    """Point the product at its processed image and remove the previous one if unused"""
+    if job.status != ImageJob.DONE:
+        return
+    
+    file_path = str(job.destination.relative_to(UPLOAD_DIR))
+    db = SessionLocal()
+    try:
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            if not _image_in_use(db, file_path):
+                await delete_image(file_path)
+            return
+        product.image_url = file_path
+        db.commit()
+        remove_old_image = bool(old_image) and old_image != file_path and not _image_in_use(db, old_image)
+    finally:
+        db.close()
+    
+    if remove_old_image:
+        await delete_image(old_image)
+    clear_cache_for_prefix("product")
+
+@router.post("/{product_id}/image", status_code=status.HTTP_202_ACCEPTED)
 async def upload_product_image(
     product_id: int,
     image: UploadFile = File(...),
     db: Session = Depends(get_db),
-    _: None = Depends(get_current_active_admin),
-    background_tasks: BackgroundTasks = None
+    _: None = Depends(get_current_active_admin)
 ):
     """
     Upload a product image (admin only).
+    Thumbnail, card and detail variants are generated in the background in
+    WebP and JPEG; poll the returned status URL until the job is done, after
+    which the product points at the new image. Images are stored by content
+    hash, so re-uploading an existing photo reuses the stored variants.
     """
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise ProductNotFound(product_id)
     
     try:
-        # Delete old image if exists
-        if product.image_url:
-            background_tasks.add_task(delete_file, product.image_url)
-        
-        # Save new image
-        file_path = await save_upload_file(image)
-        product.image_url = file_path
-        db.commit()
+        staged = await stage_upload_file(image)
+        destination = primary_image_path(staged.content_key)
+        try:
+            job = image_processor.submit(
+                staged.path,
+                destination,
+                on_complete=functools.partial(_apply_product_image, product_id, product.image_url),
+                worker=generate_variants,
+                reuse_existing=True
+            )
+        except AgroFarmException:
+            staged.path.unlink(missing_ok=True)
+            raise
         
+        image_path = str(destination.relative_to(UPLOAD_DIR))
         return {
-            "message": "Image uploaded successfully",
-            "image_url": get_file_url(file_path)
+            "message": "Image upload accepted for processing",
+            **job.to_dict(),
+            "image_url": get_file_url(image_path),
+            "image_srcset": image_srcset(image_path),
+            "status_url": f"{settings.API_V1_STR}{router.prefix}/images/jobs/{job.id}"
         }
+    except AgroFarmException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error uploading image")
 
+@router.post("/images/import")
+async def import_images(
+    archive: UploadFile = File(...),
+    manifest: Optional[UploadFile] = File(None),
+    db: Session = Depends(get_db),
+    _: None = Depends(get_current_active_admin)
+):
+    """
+    Import product images from a zip or tar archive (admin only).
+    The manifest maps archive file names to product ids or names, as a JSON
+    object or a CSV with filename and product columns. It can be uploaded
+    alongside the archive or included in it as manifest.json/manifest.csv.
+    Images are processed in parallel and all products are updated in one
+    transaction; the response reports the outcome for every file.
+    """
+    try:
+        report = await import_product_images(db, archive, manifest)
+    except AgroFarmException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    clear_cache_for_prefix("product")
+    return report
+
+@router.get("/images/jobs/{job_id}")
+async def get_image_job(
+    job_id: str,
+    _: None = Depends(get_current_active_admin)
+):
+    """
+    Get the status of an image processing job (admin only).
+    """
+    job = image_processor.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Image job {job_id} not found")
+    return {
+        **job.to_dict(),
+        "image_url": get_file_url(str(job.destination.relative_to(UPLOAD_DIR)))
+    }
+
 @router.put("/{product_id}", response_model=ProductSchema)
 async def update_product(
     product_id: int,
@@ -123,9 +293,14 @@ async def update_product(
     update_data = product_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(product, field, value)
+    if "stock_quantity" in update_data:
+        check_stock_levels(db, [product])
     
     db.commit()
     db.refresh(product)
+    if "name" in update_data or "category" in update_data:
+        product_suggester.add(product)
+    clear_cache_for_prefix("product")
     return product
 
 @router.delete("/{product_id}")
@@ -142,14 +317,48 @@ async def delete_product(
     if not product:
         raise ProductNotFound(product_id)
     
-    # Delete product image if exists
-    if product.image_url:
-        background_tasks.add_task(delete_file, product.image_url)
+    # Delete product image if no other product shares it
+    if product.image_url and not _image_in_use(db, product.image_url, exclude_product_id=product.id):
+        background_tasks.add_task(delete_image, product.image_url)
     
+    db.query(ProductSalesBucket).filter(ProductSalesBucket.product_id == product.id).delete(synchronize_session=False)
+    db.query(ProductCooccurrence).filter(
+        (ProductCooccurrence.product_id == product.id) | (ProductCooccurrence.related_id == product.id)
+    ).delete(synchronize_session=False)
     db.delete(product)
     db.commit()
+    product_suggester.remove(product_id)
+    clear_cache_for_prefix("product")
     return {"message": "Product deleted successfully"}
 
+@router.put("/{product_id}/stock-alert", response_model=StockAlertStatus)
+async def update_stock_alert(
+    product_id: int,
+    alert_in: StockAlertUpdate,
+    db: Session = Depends(get_db),
+    _: None = Depends(get_current_active_admin)
+):
+    """
+    Set a product's low-stock threshold (admin only).
+    A null threshold uses the default. Raises or clears the alert right away if needed.
+    """
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        raise ProductNotFound(product_id)
+    
+    product.low_stock_threshold = alert_in.threshold
+    check_stock_levels(db, [product])
+    
+    result = {
+        "product_id": product.id,
+        "product_name": product.name,
+        "stock_quantity": product.stock_quantity,
+        "threshold": effective_threshold(product),
+        "alerted_at": product.low_stock_alerted_at,
+    }
+    db.commit()
+    return result
+
 @router.get("/categories/list")
 @cache_response(expire_after_seconds=3600, key_prefix="categories")
 async def list_categories():
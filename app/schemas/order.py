@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional
+from app.core.config import settings
 from app.models.order import OrderStatus
 
 class OrderItemBase(BaseModel):
@@ -24,7 +25,7 @@ class OrderBase(BaseModel):
     contact_phone: str
 
 class OrderCreate(OrderBase):
-    items: List[OrderItemCreate]
+    items: List[OrderItemCreate] = Field(max_length=settings.ORDER_MAX_ITEMS)
 
 class OrderUpdate(BaseModel):
     status: Optional[OrderStatus] = None
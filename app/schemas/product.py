@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from app.models.product import ProductCategory
+from app.utils.file_upload import image_srcset
 
 class ProductBase(BaseModel):
     name: str
@@ -29,6 +30,12 @@ class Product(ProductBase):
     created_at: datetime
     updated_at: datetime
 
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        """srcset of responsive variant URLs per format (webp, jpeg), for uploaded images"""
+        return image_srcset(self.image_url)
+
     class Config:
         from_attributes = True
 
@@ -40,4 +47,32 @@ class PaginatedProducts(BaseModel):
     has_more: bool
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class StockAlertUpdate(BaseModel):
+    threshold: Optional[int] = Field(None, ge=0)  # None resets to the default threshold
+
+class StockAlertStatus(BaseModel):
+    product_id: int
+    product_name: str
+    stock_quantity: int
+    threshold: int
+    alerted_at: Optional[datetime] = None
+
+class BestSeller(BaseModel):
+    product: Product
+    units_sold: int
+    order_count: int
+
+class RelatedProduct(BaseModel):
+    product: Product
+    bought_together: int
+
+class ProductSuggestion(BaseModel):
+    id: int
+    name: str
+    category: ProductCategory
+
+class Suggestions(BaseModel):
+    categories: List[ProductCategory]
+    products: List[ProductSuggestion]
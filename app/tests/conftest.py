@@ -1,9 +1,19 @@
+import os
+
+# Point the app's own engines at the test database and keep background workers that
+# use it (scheduler, outbox relay, suggest index) out of tests; must happen before app imports
+os.environ["SQLALCHEMY_DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["SCHEDULER_ENABLED"] = "False"
+os.environ["OUTBOX_RELAY_ENABLED"] = "False"
+os.environ["SUGGEST_INDEX_ENABLED"] = "False"
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_read_db
 from app.main import app
+from app.core.security_utils import cache
 from app.utils.seed_data import seed_initial_data
 
 # Use an in-memory SQLite database for testing
@@ -37,6 +47,8 @@ def client(db):
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    cache.clear()
     
     with TestClient(app) as test_client:
         yield test_client
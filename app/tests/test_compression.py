@@ -0,0 +1,44 @@
+import asyncio
+from app.core.compression import CompressionMiddleware
+
+BODY = b'{"name": "Heirloom Tomatoes"}' * 100
+
+def run(messages, method="GET"):
+    async def app(scope, receive, send):
+        for message in messages:
+            await send(message)
+
+    sent = []
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=10)(scope, None, send))
+    return sent
+
+def start(status=200, **headers):
+    raw = [(b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode())]
+    raw += [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return {"type": "http.response.start", "status": status, "headers": raw}
+
+def test_compresses_full_responses():
+    sent = run([start(), {"type": "http.response.body", "body": BODY}])
+    assert (b"content-encoding", b"gzip") in sent[0]["headers"]
+    assert len(sent[1]["body"]) < len(BODY)
+
+def test_passes_through_head_partial_and_error_responses():
+    cases = [
+        (run([start(), {"type": "http.response.body", "body": b""}], method="HEAD"), b""),
+        (run([start(206, content_range=f"bytes 0-99/{len(BODY)}"), {"type": "http.response.body", "body": BODY[:100]}]), BODY[:100]),
+        (run([start(404), {"type": "http.response.body", "body": BODY}]), BODY),
+    ]
+    for sent, body in cases:
+        assert sent[0]["headers"][1] == (b"content-length", str(len(BODY)).encode())
+        assert all(name != b"content-encoding" for name, _ in sent[0]["headers"])
+        assert sent[1]["body"] == body
+
+def test_flushes_held_start_before_other_messages():
+    pathsend = {"type": "http.response.pathsend", "path": "/tmp/products.json"}
+    sent = run([start(), pathsend])
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.pathsend"]
+    assert all(name != b"content-encoding" for name, _ in sent[0]["headers"])
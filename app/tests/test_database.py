@@ -0,0 +1,81 @@
+import pytest
+from alembic import command
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from app.core.database import Base, alembic_config, create_db_engine, init_db
+
+def test_sqlite_engine_profile(tmp_path):
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    engine = create_db_engine(url)
+    read_engine = create_db_engine(url, read_only=True)
+    
+    with engine.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO items (id) VALUES (1)"))
+    
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM items")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO items (id) VALUES (2)"))
+    
+    engine.dispose()
+    read_engine.dispose()
+
+def schema(engine):
+    inspector = inspect(engine)
+    return {table: {column["name"] for column in inspector.get_columns(table)} for table in inspector.get_table_names()}
+
+def test_migrations_build_the_model_schema(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    with engine.begin() as conn:
+        command.upgrade(alembic_config(conn), "leases")
+        conn.execute(text(
+            "INSERT INTO products (id, name, price, stock_quantity, category, unit) "
+            "VALUES (1, 'Rice', 2.5, 4, 'GRAINS', 'kg'), (2, 'Milk', 1.0, 40, 'DAIRY', 'litre')"
+        ))
+        conn.execute(text(
+            "INSERT INTO users (id, email, full_name, hashed_password) VALUES (1, 'a@example.com', 'A', 'x')"
+        ))
+        conn.execute(text(
+            "INSERT INTO orders (id, user_id, total_amount, status, shipping_address, contact_phone) "
+            "VALUES (1, 1, 10, 'DELIVERED', 'Street', '1'), (2, 1, 10, 'PENDING', 'Street', '1'), "
+            "(3, 1, 10, 'CANCELLED', 'Street', '1')"
+        ))
+        conn.execute(text(
+            "INSERT INTO order_items (order_id, product_id, quantity, unit_price) "
+            "VALUES (1, 2, 3, 1), (2, 2, 4, 1), (3, 2, 5, 1), (3, 1, 1, 2.5)"
+        ))
+        command.upgrade(alembic_config(conn), "head")
+        # Past orders are counted; cancelled ones aren't
+        counters = conn.execute(text("SELECT id, units_sold, order_count FROM products ORDER BY id"))
+        assert counters.all() == [(1, 0, 0), (2, 7, 2)]
+        buckets = conn.execute(text("SELECT product_id, units_sold, order_count FROM product_sales_buckets"))
+        assert buckets.all() == [(2, 7, 2)]
+    expected = {table.name: {column.name for column in table.columns} for table in Base.metadata.sorted_tables}
+    migrated = schema(engine)
+    assert {table: migrated[table] for table in expected} == expected
+    engine.dispose()
+
+def test_init_db_stamps_new_and_upgrades_legacy_databases(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    assert init_db(engine) is True
+    assert init_db(engine) is False
+    assert set(Base.metadata.tables) <= set(schema(engine))
+    engine.dispose()
+    
+    # Created by create_all before some tables existed, and never stamped
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(engine, tables=[
+        table for table in Base.metadata.sorted_tables if table.name != "product_cooccurrences"
+    ])
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (1, 1, 1, 1), (1, 2, 1, 1)"))
+    assert init_db(engine) is True
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == "product_cooccurrences"
+        pairs = conn.execute(text("SELECT product_id, related_id, count FROM product_cooccurrences ORDER BY 1"))
+        assert pairs.all() == [(1, 2, 1), (2, 1, 1)]
+    engine.dispose()
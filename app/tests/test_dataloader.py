@@ -0,0 +1,25 @@
+import asyncio
+from app.core.dataloader import DataLoader
+from app.core.query_tracker import track_queries
+from app.models.product import Product
+from app.tests.conftest import TestingSessionLocal
+
+def test_loads_in_one_tick_share_a_query(test_data):
+    db = TestingSessionLocal()
+    product_ids = [product_id for product_id, in db.query(Product.id)]
+
+    async def run():
+        loader = DataLoader(db, Product)
+        with track_queries() as tracker:
+            products = await asyncio.gather(*(loader.load(product_id) for product_id in product_ids + [999]))
+            again = await loader.load_many(product_ids)
+        return products, again, tracker.count
+
+    try:
+        products, again, queries = asyncio.run(run())
+    finally:
+        db.close()
+    assert queries == 1
+    assert [product.id for product in products[:-1]] == product_ids
+    assert products[-1] is None
+    assert again == products[:-1]
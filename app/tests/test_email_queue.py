@@ -0,0 +1,130 @@
+import asyncio
+import json
+import socket
+import pytest
+import aiosmtplib
+from app.utils.email_queue import EmailQueue, QueuedEmail
+
+class RecordingClient:
+    """In-process SMTP client that fails the first sends listed in failures"""
+    connections = 0
+
+    def __init__(self, sent, failures):
+        self.sent = sent
+        self.failures = failures
+        self.is_connected = False
+
+    async def connect(self):
+        RecordingClient.connections += 1
+        self.is_connected = True
+
+    async def send_message(self, message):
+        if self.failures:
+            error = self.failures.pop(0)
+            if isinstance(error, aiosmtplib.SMTPServerDisconnected):
+                self.is_connected = False
+            raise error
+        self.sent.append(message["To"])
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+def make_queue(tmp_path, sent, failures=None, **kwargs):
+    failures = failures if failures is not None else []
+    return EmailQueue(
+        dead_letter_dir=tmp_path / "dead",
+        client_factory=lambda: RecordingClient(sent, failures),
+        retry_backoff=0.01,
+        **kwargs
+    )
+
+def test_batches_reuse_one_connection(tmp_path):
+    RecordingClient.connections = 0
+    sent = []
+
+    async def run():
+        queue = make_queue(tmp_path, sent, workers=1, batch_size=10)
+        await queue.start()
+        for i in range(25):
+            assert queue.enqueue(QueuedEmail(f"user{i}@example.com", "Hello", "<p>Hi</p>"))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert sorted(sent) == sorted(f"user{i}@example.com" for i in range(25))
+    assert RecordingClient.connections == 1
+
+def test_transient_failures_are_retried(tmp_path):
+    sent = []
+    failures = [
+        aiosmtplib.SMTPServerDisconnected("connection lost"),
+        aiosmtplib.SMTPResponseException(421, "try again later"),
+    ]
+
+    async def run():
+        queue = make_queue(tmp_path, sent, failures, workers=1)
+        await queue.start()
+        queue.enqueue(QueuedEmail("retry@example.com", "Hello", "<p>Hi</p>"))
+        for _ in range(100):
+            if sent:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert sent == ["retry@example.com"]
+    assert not (tmp_path / "dead").exists()
+
+def test_permanent_failures_are_dead_lettered(tmp_path):
+    sent = []
+    failures = [aiosmtplib.SMTPResponseException(550, "mailbox unavailable")]
+
+    async def run():
+        queue = make_queue(tmp_path, sent, failures, workers=1)
+        await queue.start()
+        queue.enqueue(QueuedEmail("bounce@example.com", "Hello", "<p>Hi</p>"))
+        queue.enqueue(QueuedEmail("ok@example.com", "Hello", "<p>Hi</p>"))
+        await queue.stop()
+        return [email.to for _, email in queue.dead_letters]
+
+    assert asyncio.run(run()) == ["bounce@example.com"]
+    assert sent == ["ok@example.com"]
+    dead_letter = json.loads(next((tmp_path / "dead").glob("*.json")).read_text())
+    assert dead_letter["attempts"] == 1
+    assert "mailbox unavailable" in dead_letter["error"]
+
+def test_delivers_to_local_smtp_server(tmp_path):
+    pytest.importorskip("aiosmtpd")
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.handlers import Sink
+
+    received = []
+
+    class Handler(Sink):
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope.rcpt_tos[0])
+            return "250 OK"
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    controller = Controller(Handler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        async def run():
+            queue = EmailQueue(
+                workers=2,
+                dead_letter_dir=tmp_path / "dead",
+                client_factory=lambda: aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False)
+            )
+            await queue.start()
+            for i in range(10):
+                queue.enqueue(QueuedEmail(f"user{i}@example.com", "Hello", "<p>Hi</p>"))
+            await queue.stop()
+
+        asyncio.run(run())
+    finally:
+        controller.stop()
+    assert sorted(received) == sorted(f"user{i}@example.com" for i in range(10))
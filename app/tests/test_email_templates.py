@@ -0,0 +1,37 @@
+from app.models.order import OrderStatus
+from app.utils.email_queue import QueuedEmail
+from app.utils.email_templates import (
+    email_templates, order_status_context, render_order_status, render_order_status_batch
+)
+
+def test_html_part_is_escaped_and_text_part_is_not():
+    email = render_order_status(OrderStatus.SHIPPED, order_status_context(
+        "<b>Ann</b>", 7, 12.5, OrderStatus.SHIPPED, tracking_number="TRK-1"
+    ))
+    assert email.subject == "Your Order Has Been Shipped"
+    assert "Dear &lt;b&gt;Ann&lt;/b&gt;" in email.html
+    assert "<li>Tracking Number: TRK-1</li>" in email.html
+    assert "Dear <b>Ann</b>," in email.text
+    assert "- Total Amount: $12.50" in email.text
+
+def test_statuses_without_a_template_use_the_generic_update():
+    email = render_order_status(OrderStatus.PENDING, order_status_context("Bo", 3, 5, OrderStatus.PENDING))
+    assert email.subject == "Order Status Update"
+    assert "- Status: Pending" in email.text
+
+def test_batch_rendering_matches_single_renders():
+    contexts = [
+        order_status_context(f"Customer {i}", i, 10.0 + i, OrderStatus.CANCELLED, cancel_reason="Out of stock")
+        for i in range(5)
+    ]
+    batch = render_order_status_batch(OrderStatus.CANCELLED, contexts)
+    single = [render_order_status(OrderStatus.CANCELLED, context) for context in contexts]
+    assert [(e.html, e.text) for e in batch] == [(e.html, e.text) for e in single]
+    assert "Reason: Out of stock" in batch[0].text
+
+def test_every_template_has_both_parts():
+    assert {"base", "order_status", "welcome"} <= set(email_templates.names())
+
+def test_queued_email_includes_text_alternative():
+    message = QueuedEmail("a@example.com", "Hi", "<p>Hi</p>", text="Hi").to_message()
+    assert [part.get_content_type() for part in message.iter_parts()] == ["text/plain", "text/html"]
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from app.core.events import EventManager, OverflowPolicy, event_handler_runs_total
+
+def test_publish_does_not_wait_for_handlers():
+    calls = []
+    
+    async def slow_handler(order_id: int):
+        await asyncio.sleep(0.2)
+        calls.append(("slow", order_id))
+    
+    async def fast_handler(order_id: int, user_email: str):
+        calls.append(("fast", order_id, user_email))
+    
+    async def run():
+        manager = EventManager(workers=2, queue_size=10)
+        manager.subscribe("order.created", slow_handler)
+        manager.subscribe("order.created", fast_handler)
+        await manager.start()
+        
+        start = time.perf_counter()
+        await manager.publish("order.created", order_id=1, user_email="a@example.com")
+        await manager.publish("order.created", order_id=2, user_email="b@example.com")
+        publish_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        await manager.stop()
+        return publish_time, time.perf_counter() - start
+    
+    publish_time, drain_time = asyncio.run(run())
+    assert publish_time < 0.05
+    # Both events and both handlers per event run concurrently
+    assert drain_time < 0.35
+    assert sorted(calls) == [
+        ("fast", 1, "a@example.com"), ("fast", 2, "b@example.com"), ("slow", 1), ("slow", 2)
+    ]
+
+def test_handler_timeout():
+    async def stuck_handler():
+        await asyncio.sleep(10)
+    
+    async def run():
+        manager = EventManager(workers=1, queue_size=10, handler_timeout=0.05)
+        manager.subscribe("test.timeout", stuck_handler)
+        await manager.start()
+        await manager.publish("test.timeout")
+        await manager.stop()
+    
+    before = event_handler_runs_total.value("stuck_handler", "timeout")
+    asyncio.run(run())
+    assert event_handler_runs_total.value("stuck_handler", "timeout") == before + 1
+
+def test_overflow_policies():
+    received = []
+    
+    async def handler(n: int):
+        received.append(n)
+    
+    async def run(policy):
+        manager = EventManager(workers=1, queue_size=2, overflow_policy=policy, publish_timeout=0.01)
+        manager.subscribe("test.overflow", handler)
+        await manager.start()
+        # The worker can't run until this coroutine yields, so the queue fills up
+        accepted = [await manager.publish("test.overflow", n=n) for n in range(4)]
+        await manager.stop()
+        return accepted
+    
+    assert asyncio.run(run(OverflowPolicy.DROP_NEWEST)) == [True, True, False, False]
+    assert received == [0, 1]
+    
+    received.clear()
+    assert asyncio.run(run(OverflowPolicy.DROP_OLDEST)) == [True, True, True, True]
+    assert received == [2, 3]
@@ -0,0 +1,54 @@
+import asyncio
+import hashlib
+import io
+import pytest
+from fastapi import UploadFile
+from app.utils import file_upload
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+def stage(tmp_path, monkeypatch, filename, content):
+    monkeypatch.setattr(file_upload, "STAGING_DIR", tmp_path)
+    upload = UploadFile(file=io.BytesIO(content), filename=filename)
+    return asyncio.run(file_upload.stage_upload_file(upload))
+
+def test_stage_upload_streams_and_hashes(tmp_path, monkeypatch):
+    content = PNG_HEADER + b"\0" * (3 * file_upload.UPLOAD_CHUNK_SIZE)
+    staged = stage(tmp_path, monkeypatch, "photo.png", content)
+    
+    assert staged.path.parent == tmp_path
+    assert staged.path.read_bytes() == content
+    assert staged.size == len(content)
+    assert staged.sha256 == hashlib.sha256(content).hexdigest()
+    assert list(tmp_path.iterdir()) == [staged.path]
+
+def test_stage_upload_rejects_oversized_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_upload, "MAX_IMAGE_SIZE", 2 * file_upload.UPLOAD_CHUNK_SIZE)
+    content = PNG_HEADER + b"\0" * (3 * file_upload.UPLOAD_CHUNK_SIZE)
+    with pytest.raises(ValueError, match="exceeds maximum"):
+        stage(tmp_path, monkeypatch, "photo.png", content)
+    assert list(tmp_path.iterdir()) == []
+
+def test_stage_upload_rejects_mismatched_content(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match="does not match"):
+        stage(tmp_path, monkeypatch, "photo.jpg", PNG_HEADER + b"\0" * 100)
+    with pytest.raises(ValueError, match="not allowed"):
+        stage(tmp_path, monkeypatch, "script.exe", PNG_HEADER)
+    assert list(tmp_path.iterdir()) == []
+
+def test_product_schema_exposes_srcset():
+    from datetime import datetime
+    from app.schemas.product import Product as ProductSchema
+    
+    fields = dict(
+        id=1, name="Tomatoes", description="Fresh", price=2.5, stock_quantity=10,
+        category="vegetables", unit="kg", created_at=datetime.utcnow(), updated_at=datetime.utcnow()
+    )
+    key = "0f" * 16
+    product = ProductSchema(**fields, image_url=f"products/{key}-detail.jpg")
+    srcset = product.model_dump()["image_srcset"]
+    assert set(srcset) == {"webp", "jpeg"}
+    assert srcset["webp"].startswith(f"/uploads/products/{key}-thumb.webp 200w, ")
+    
+    legacy = ProductSchema(**fields, image_url="https://example.com/tomatoes.jpg")
+    assert legacy.image_srcset is None
@@ -0,0 +1,58 @@
+import io
+import json
+import zipfile
+from PIL import Image
+from fastapi.testclient import TestClient
+from app.models.product import Product
+from app.tests.utils import get_auth_headers
+from app.utils.file_upload import UPLOAD_DIR, image_variant_paths
+
+def image_bytes(color: str, image_format: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 200), color).save(buffer, image_format)
+    return buffer.getvalue()
+
+def test_import_images_from_archive(client: TestClient, test_data):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    products = [(product.id, product.name) for product in test_data.query(Product).order_by(Product.id).limit(2)]
+    
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("photos/first.png", image_bytes("red"))
+        zf.writestr("photos/second.jpg", image_bytes("blue", "JPEG"))
+        zf.writestr("photos/broken.jpg", b"not an image")
+        zf.writestr("photos/extra.png", image_bytes("green"))
+        zf.writestr("manifest.json", json.dumps({
+            "first.png": products[0][0],
+            "photos/second.jpg": products[1][1],
+            "broken.jpg": products[0][0],
+            "missing.png": 9999,
+        }))
+    
+    response = client.post(
+        "/api/products/images/import",
+        files={"archive": ("photos.zip", archive.getvalue(), "application/zip")},
+        headers=headers
+    )
+    assert response.status_code == 200
+    report = response.json()
+    results = {result["filename"]: result for result in report["results"]}
+    try:
+        assert (report["imported"], report["failed"], report["skipped"]) == (2, 2, 1)
+        assert results["photos/first.png"]["product_id"] == products[0][0]
+        assert results["photos/second.jpg"]["product_id"] == products[1][0]
+        assert results["photos/broken.jpg"]["status"] == "failed"
+        assert results["missing.png"]["error"] == "File not found in archive"
+        assert results["photos/extra.png"]["status"] == "skipped"
+        
+        image_urls = dict(test_data.query(Product.id, Product.image_url).filter(
+            Product.id.in_([product_id for product_id, _ in products])
+        ).all())
+        assert image_urls[products[0][0]] == results["photos/first.png"]["image_url"]
+        assert image_urls[products[1][0]] == results["photos/second.jpg"]["image_url"]
+        assert (UPLOAD_DIR / image_urls[products[0][0]]).exists()
+    finally:
+        for result in report["results"]:
+            if result["image_url"]:
+                for path in image_variant_paths(result["image_url"]):
+                    (UPLOAD_DIR / path).unlink(missing_ok=True)
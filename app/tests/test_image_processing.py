@@ -0,0 +1,158 @@
+import asyncio
+import os
+import time
+import pytest
+from PIL import Image
+from app.core.exceptions import ImageProcessingBusy
+from app.utils.image_processing import (
+    IMAGE_FORMATS, IMAGE_VARIANTS, PRIMARY_VARIANT, ImageJob, ImageProcessor, ImageTooLarge,
+    generate_variants, open_bounded, resize_image, variant_filename
+)
+
+def test_process_pool_resizes_image(tmp_path):
+    source = tmp_path / "upload.png"
+    destination = tmp_path / "product.png"
+    Image.new("RGB", (3000, 1500), "green").save(source)
+    
+    async def run():
+        processor = ImageProcessor(max_workers=1, queue_size=4, timeout=30)
+        try:
+            job = processor.submit(source, destination)
+            assert job.status == ImageJob.PROCESSING
+            await job.finished.wait()
+            return job
+        finally:
+            processor.shutdown()
+    
+    job = asyncio.run(run())
+    assert job.status == ImageJob.DONE
+    assert not source.exists()
+    with Image.open(destination) as img:
+        assert img.size == (2000, 1000)
+
+def slow_copy(source, destination):
+    time.sleep(1)
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        dst.write(src.read())
+
+def test_timed_out_job_keeps_its_slot_until_the_worker_finishes(tmp_path):
+    source, destination = tmp_path / "upload.jpg", tmp_path / "product.jpg"
+    source.write_bytes(b"image")
+    
+    async def run():
+        processor = ImageProcessor(max_workers=1, queue_size=1, timeout=0.2)
+        try:
+            job = processor.submit(source, destination, worker=slow_copy)
+            await job.finished.wait()
+            assert job.status == ImageJob.FAILED
+            # The pool process is still busy with it
+            with pytest.raises(ImageProcessingBusy):
+                processor.submit(source, destination, worker=slow_copy)
+            for _ in range(100):
+                if processor._pending == 0:
+                    break
+                await asyncio.sleep(0.05)
+            return processor._pending
+        finally:
+            processor.shutdown()
+    
+    assert asyncio.run(run()) == 0
+    # The late result of a failed job is discarded
+    assert not destination.exists() and not source.exists()
+
+def crash(source, destination):
+    os._exit(1)
+
+def test_crashed_worker_fails_only_its_job(tmp_path):
+    source = tmp_path / "upload.png"
+    Image.new("RGB", (300, 300), "green").save(source)
+    
+    async def run():
+        processor = ImageProcessor(max_workers=1, queue_size=4, timeout=30)
+        try:
+            crashed = processor.submit(tmp_path / "other.png", tmp_path / "other.jpg", worker=crash)
+            await crashed.finished.wait()
+            # The dead pool is replaced, so later jobs still run
+            job = await processor.process(source, tmp_path / "product.jpg")
+            return crashed, job, processor._pending
+        finally:
+            processor.shutdown()
+    
+    crashed, job, pending = asyncio.run(run())
+    assert crashed.status == ImageJob.FAILED
+    assert crashed.error == "Image processing worker crashed"
+    assert job.status == ImageJob.DONE
+    assert pending == 0
+
+def test_invalid_image_fails_job(tmp_path):
+    source = tmp_path / "upload.jpg"
+    source.write_bytes(b"not an image")
+    
+    async def run():
+        processor = ImageProcessor(max_workers=0, queue_size=4, timeout=30)
+        job = processor.submit(source, tmp_path / "product.jpg")
+        await job.finished.wait()
+        return job
+    
+    job = asyncio.run(run())
+    assert job.status == ImageJob.FAILED
+    assert not (tmp_path / "product.jpg").exists()
+
+def test_failed_job_keeps_shared_destination(tmp_path):
+    destination = tmp_path / variant_filename("cd" * 16, *PRIMARY_VARIANT)
+    Image.new("RGB", (100, 100), "green").save(destination)
+    source = tmp_path / "upload.png"
+    source.write_bytes(b"not an image")
+    
+    async def run():
+        processor = ImageProcessor(max_workers=0, queue_size=4, timeout=30)
+        job = processor.submit(source, destination, worker=generate_variants)
+        await job.finished.wait()
+        return job
+    
+    # Another job produced the file; only this job's temporary files may go
+    assert asyncio.run(run()).status == ImageJob.FAILED
+    assert [path.name for path in tmp_path.iterdir()] == [destination.name]
+
+def test_generate_variants_and_reuse_existing(tmp_path):
+    key = "ab" * 16
+    destination = tmp_path / variant_filename(key, *PRIMARY_VARIANT)
+    
+    async def run():
+        processor = ImageProcessor(max_workers=0, queue_size=4, timeout=30)
+        jobs = []
+        for name in ("first.png", "second.png"):
+            source = tmp_path / name
+            Image.new("RGB", (3000, 1500), "green").save(source)
+            job = processor.submit(source, destination, worker=generate_variants, reuse_existing=True)
+            await job.finished.wait()
+            jobs.append(job)
+        return jobs
+    
+    first, second = asyncio.run(run())
+    assert first.status == second.status == ImageJob.DONE
+    assert not first.deduplicated and second.deduplicated
+    
+    for variant, width in IMAGE_VARIANTS.items():
+        for image_format in IMAGE_FORMATS:
+            with Image.open(tmp_path / variant_filename(key, variant, image_format)) as img:
+                assert img.width == width
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        variant_filename(key, variant, image_format)
+        for variant in IMAGE_VARIANTS for image_format in IMAGE_FORMATS
+    )
+
+def test_large_images_decode_within_pixel_budget(tmp_path):
+    jpeg, png = tmp_path / "large.jpg", tmp_path / "large.png"
+    for path in (jpeg, png):
+        Image.new("RGB", (1600, 1200), "red").save(path)
+    
+    # JPEGs decode at reduced scale (1/4 here), so they fit the budget
+    with open_bounded(str(jpeg), (400, 400), max_pixels=500_000) as img:
+        assert img.size == (400, 300)
+    resize_image(str(jpeg), str(tmp_path / "small.jpg"), max_dimension=400, max_pixels=500_000)
+    with Image.open(tmp_path / "small.jpg") as img:
+        assert img.size == (400, 300)
+    
+    with pytest.raises(ImageTooLarge):
+        resize_image(str(png), str(tmp_path / "small.png"), max_dimension=400, max_pixels=500_000)
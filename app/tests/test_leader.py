@@ -0,0 +1,53 @@
+import asyncio
+import time
+from app.core.leader import LeaderElection
+from app.tests.conftest import TestingSessionLocal
+
+def make_election(transitions, name, ttl=30.0):
+    async def on_elected():
+        transitions.append((name, "elected"))
+
+    async def on_demoted():
+        transitions.append((name, "demoted"))
+
+    return LeaderElection("scheduler", on_elected, on_demoted, session_factory=TestingSessionLocal, ttl=ttl)
+
+def test_only_one_worker_holds_the_lease(db):
+    transitions = []
+    first = make_election(transitions, "first")
+    second = make_election(transitions, "second")
+
+    async def run():
+        assert await first.renew()
+        assert await first.renew()  # Renewing a held lease
+        assert not await second.renew()
+        assert first.is_leader and not second.is_leader
+
+        await first.stop()  # Releases the lease for the next renewal
+        assert await second.renew()
+        assert second.is_leader and not first.is_leader
+        await second.stop()
+
+    asyncio.run(run())
+    assert transitions == [
+        ("first", "elected"), ("first", "demoted"), ("second", "elected"), ("second", "demoted"),
+    ]
+
+def test_expired_lease_is_taken_over(db):
+    transitions = []
+    first = make_election(transitions, "first", ttl=0.2)
+    second = make_election(transitions, "second")
+
+    async def run():
+        assert await first.renew()
+        time.sleep(0.3)  # First worker stalls past its lease
+        assert not first.is_leader
+        assert await second.renew()
+        assert not await first.renew()
+        await second.stop()
+        await first.stop()
+
+    asyncio.run(run())
+    assert transitions == [
+        ("first", "elected"), ("second", "elected"), ("first", "demoted"), ("second", "demoted"),
+    ]
@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+from app.core.metrics import MetricsRegistry, cache_hits_total, cache_misses_total
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(5, "/a")
+
+    output = registry.render()
+    assert "# TYPE latency_seconds histogram" in output
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in output
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in output
+    assert 'latency_seconds_count{route="/a"} 3' in output
+
+def test_metrics_endpoint(client: TestClient, test_data):
+    hits = cache_hits_total.value("products")
+    misses = cache_misses_total.value("products")
+
+    client.get("/api/products/")
+    client.get("/api/products/")
+
+    assert cache_misses_total.value("products") == misses + 1
+    assert cache_hits_total.value("products") == hits + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/products/",status="200"}' in body
+    assert 'db_queries_per_request_count{route="/api/products/"}' in body
+    assert 'cache_hits_total{key_prefix="products"}' in body
+    assert 'db_pool_connections{pool="primary",state="checked_out"}' in body
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.core.events import EventManager, OrderEvents
+from app.core.order_deadlines import StallTracker
+from app.models.order import Order, OrderStatus
+from app.tests.conftest import TestingSessionLocal
+
+def make_tracker():
+    return StallTracker(
+        {"pending": 24, "processing": 48}, EventManager(), session_factory=TestingSessionLocal
+    )
+
+def add_order(db, status, hours_ago):
+    since = datetime.utcnow() - timedelta(hours=hours_ago)
+    order = Order(
+        user_id=1, total_amount=10.0, status=status, shipping_address="1 Farm Road",
+        contact_phone="0", created_at=since, updated_at=since
+    )
+    db.add(order)
+    db.commit()
+    return order.id, since
+
+def test_heap_returns_only_live_deadlines_in_order(db):
+    tracker = make_tracker()
+    start = datetime.utcnow() + timedelta(days=1)
+    
+    async def run():
+        await tracker.start()
+        tracker.track(1, OrderStatus.PENDING, start)
+        tracker.track(2, OrderStatus.PENDING, start + timedelta(hours=1))
+        tracker.track(3, OrderStatus.PROCESSING, start)
+        tracker.track(1, OrderStatus.PROCESSING, start + timedelta(hours=2))  # Replaces the pending deadline
+        tracker.track(2, OrderStatus.SHIPPED, start + timedelta(hours=3))  # No SLA, no longer tracked
+        
+        assert len(tracker) == 2
+        assert tracker.next_deadline() == start + timedelta(hours=48)
+        expired = tracker.pop_expired(start + timedelta(hours=60))
+        await tracker.stop()
+        return expired
+    
+    expired = asyncio.run(run())
+    assert [(order_id, status) for _, order_id, status in expired] == [(3, "processing"), (1, "processing")]
+
+def test_rebuild_and_fire_only_orders_still_stalled(db):
+    stalled_id, _ = add_order(db, OrderStatus.PENDING, hours_ago=30)
+    moved_id, _ = add_order(db, OrderStatus.PENDING, hours_ago=30)
+    add_order(db, OrderStatus.PROCESSING, hours_ago=30)
+    add_order(db, OrderStatus.DELIVERED, hours_ago=100)
+    
+    received = []
+    
+    async def handler(order_id: int, status: str):
+        received.append((order_id, status))
+    
+    tracker = make_tracker()
+    tracker.events.subscribe(OrderEvents.STALLED, handler)
+    
+    async def run():
+        await tracker.rebuild()
+        assert len(tracker) == 3
+        # Another process moved this order on after the heap was built
+        order = db.query(Order).filter(Order.id == moved_id).first()
+        order.status = OrderStatus.PROCESSING
+        db.commit()
+        return await tracker.fire_expired()
+    
+    assert asyncio.run(run()) == 1
+    assert received == [(stalled_id, "pending")]
+    # The moved order is tracked again under its new status, next to the fresh one
+    assert len(tracker) == 2
@@ -1,5 +1,5 @@
 from fastapi.testclient import TestClient
-from app.tests.utils import get_auth_headers
+from app.tests.utils import assert_max_queries, get_auth_headers
 
 def test_create_order(client: TestClient, test_data):
     # Register a regular user
@@ -17,7 +17,7 @@ def test_create_order(client: TestClient, test_data):
     
     # Get a product to order
     response = client.get("/api/products/")
-    products = response.json()
+    products = response.json()["items"]
     product_id = products[0]["id"]
     
     # Create order
@@ -57,7 +57,7 @@ def test_list_orders(client: TestClient, test_data):
     
     # Get a product
     response = client.get("/api/products/")
-    products = response.json()
+    products = response.json()["items"]
     product_id = products[0]["id"]
     
     # Create order
@@ -71,7 +71,7 @@ def test_list_orders(client: TestClient, test_data):
     # List orders
     response = client.get("/api/orders/", headers=headers)
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert len(data) > 0
     assert data[0]["shipping_address"] == order_data["shipping_address"]
 
@@ -89,7 +89,7 @@ def test_cancel_order(client: TestClient, test_data):
     
     # Get a product
     response = client.get("/api/products/")
-    products = response.json()
+    products = response.json()["items"]
     product_id = products[0]["id"]
     initial_quantity = products[0]["stock_quantity"]
     
@@ -108,4 +108,47 @@ def test_cancel_order(client: TestClient, test_data):
     
     # Verify stock is restored
     response = client.get(f"/api/products/{product_id}")
-    assert response.json()["stock_quantity"] == initial_quantity
\ No newline at end of file
+    assert response.json()["stock_quantity"] == initial_quantity
+
+def test_order_endpoints_query_budget(client: TestClient, test_data):
+    client.post(
+        "/api/auth/register",
+        json={
+            "email": "customer@example.com",
+            "full_name": "Test Customer",
+            "password": "customer123"
+        }
+    )
+    headers = get_auth_headers(client, "customer@example.com", "customer123")
+    products = client.get("/api/products/").json()["items"]
+    
+    order_ids = []
+    for product in products:
+        order_data = {
+            "shipping_address": "123 Test Street",
+            "contact_phone": "1234567890",
+            "items": [{"product_id": p["id"], "quantity": 1} for p in products]
+        }
+        response = client.post("/api/orders/", json=order_data, headers=headers)
+        order_ids.append(response.json()["id"])
+    
+    # Every product in the order comes from one batched lookup; includes the two sales counter
+    # upserts and the co-purchase upsert
+    with assert_max_queries(14) as tracker:
+        response = client.post("/api/orders/", json=order_data, headers=headers)
+    assert response.status_code == 200
+    order_ids.append(response.json()["id"])
+    assert sum(count for shape, count in tracker.shapes.items() if "FROM products" in shape) == 1
+    
+    # User lookup, count, orders page and one batched load of their items
+    with assert_max_queries(4) as tracker:
+        response = client.get("/api/orders/", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == len(products) + 1
+    assert not tracker.repeated()
+    
+    # Includes the two outbox rows written in the cancel transaction and the two sales
+    # counter upserts; alert state lives on the product rows, so no lookup of its own
+    with assert_max_queries(12):
+        response = client.post(f"/api/orders/{order_ids[0]}/cancel", headers=headers)
+    assert response.status_code == 200
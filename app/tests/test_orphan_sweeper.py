@@ -0,0 +1,60 @@
+import asyncio
+import os
+import time
+from app.models.product import Product, ProductCategory
+from app.tests.conftest import TestingSessionLocal
+from app.utils import orphan_sweeper
+from app.utils.file_upload import image_variant_paths
+
+DAY = 86400
+
+def write_file(root, path, age_days):
+    full_path = root / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    full_path.write_bytes(b"image")
+    mtime = time.time() - age_days * DAY
+    os.utime(full_path, (mtime, mtime))
+
+def sweep(tmp_path, **kwargs):
+    return asyncio.run(orphan_sweeper.sweep_orphans(
+        min_age_days=7, root=tmp_path / "uploads", state_file=tmp_path / "state.json", **kwargs
+    ))
+
+def test_sweep_deletes_only_old_unreferenced_files(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(orphan_sweeper, "ReadSessionLocal", TestingSessionLocal)
+    root = tmp_path / "uploads"
+    image_url = f"products/{'c3' * 16}-detail.jpg"
+    db.add(Product(
+        name="Tomatoes", description="Fresh", price=2.5, stock_quantity=10,
+        category=ProductCategory.VEGETABLES, unit="kg", image_url=image_url
+    ))
+    db.commit()
+    
+    for path in image_variant_paths(image_url):
+        write_file(root, path, age_days=30)
+    # Precompressed siblings belong to the file they compress
+    write_file(root, f"{image_url}.br", age_days=30)
+    write_file(root, "products/orphan.jpg", age_days=30)
+    write_file(root, "products/orphan.jpg.gz", age_days=30)
+    write_file(root, "tmp/abandoned.jpg.part", age_days=30)
+    write_file(root, "products/recent.jpg", age_days=1)
+    
+    report = sweep(tmp_path, dry_run=True)
+    assert report.orphans == ["products/orphan.jpg", "products/orphan.jpg.gz", "tmp/abandoned.jpg.part"]
+    assert report.scanned == 11 and report.deleted == 0
+    assert (root / "products/orphan.jpg").exists()
+    
+    report = sweep(tmp_path)
+    assert report.deleted == 3
+    assert not (root / "products/orphan.jpg").exists()
+    assert (root / f"{image_url}.br").exists()
+    assert all((root / path).exists() for path in image_variant_paths(image_url))
+    assert (root / "products/recent.jpg").exists()
+    
+    # Incremental sweeps only inspect files that aged past the cutoff since the last sweep
+    write_file(root, "products/missed.jpg", age_days=30)
+    orphan_sweeper.save_state(tmp_path / "state.json", time.time() - 8 * DAY)
+    write_file(root, "products/aged.jpg", age_days=7.5)
+    report = sweep(tmp_path, incremental=True)
+    assert report.orphans == ["products/aged.jpg"]
+    assert (root / "products/missed.jpg").exists()
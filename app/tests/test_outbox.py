@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from app.core.events import EventManager, OrderEvents
+from app.core.outbox import OutboxRelay, add_event
+from app.models.outbox import OutboxEvent
+from app.tests.conftest import TestingSessionLocal
+from app.tests.utils import get_auth_headers
+
+def test_relay_dispatches_and_marks_events(db):
+    received = []
+    
+    async def handler(order_id: int, new_status: str):
+        received.append((order_id, new_status))
+    
+    for order_id in range(1, 6):
+        add_event(db, "order.status_changed", order_id=order_id, new_status="confirmed")
+    db.commit()
+    
+    manager = EventManager()
+    manager.subscribe("order.status_changed", handler)
+    relay = OutboxRelay(manager, session_factory=TestingSessionLocal, batch_size=3)
+    
+    async def run():
+        return [await relay.relay_once() for _ in range(3)]
+    
+    assert asyncio.run(run()) == [3, 2, 0]
+    assert received == [(order_id, "confirmed") for order_id in range(1, 6)]
+    assert db.query(OutboxEvent).filter(OutboxEvent.processed_at.is_(None)).count() == 0
+
+def test_relay_leaves_undelivered_events_unprocessed(db):
+    for order_id in (1, 2):
+        add_event(db, "order.cancelled", order_id=order_id)
+    db.commit()
+    
+    class DroppingManager(EventManager):
+        async def deliver(self, event_type: str, **kwargs) -> bool:
+            return kwargs["order_id"] != 1
+    
+    relay = OutboxRelay(DroppingManager(), session_factory=TestingSessionLocal, claim_timeout=0)
+    assert asyncio.run(relay.relay_once()) == 2
+    unprocessed = [json.loads(payload)["order_id"] for payload, in db.query(OutboxEvent.payload).filter(
+        OutboxEvent.processed_at.is_(None)
+    )]
+    assert unprocessed == [1]
+    
+    # A handler that fails leaves the event for a retry, which then succeeds
+    attempts = []
+    
+    async def flaky(order_id: int):
+        attempts.append(order_id)
+        if len(attempts) == 1:
+            raise RuntimeError("SMTP unavailable")
+    
+    manager = EventManager()
+    manager.subscribe("order.cancelled", flaky)
+    relay = OutboxRelay(manager, session_factory=TestingSessionLocal, claim_timeout=0)
+    assert asyncio.run(relay.relay_once()) == 1
+    assert db.query(OutboxEvent).filter(OutboxEvent.processed_at.is_(None)).count() == 1
+    assert asyncio.run(relay.relay_once()) == 1
+    assert attempts == [1, 1]
+    assert db.query(OutboxEvent).filter(OutboxEvent.processed_at.is_(None)).count() == 0
+
+def test_relay_skips_claimed_events_until_lease_expires(db):
+    event = add_event(db, "order.cancelled", order_id=1)
+    event.claimed_by = "other-relay"
+    event.claimed_at = datetime.utcnow()
+    db.commit()
+    
+    received = []
+    
+    async def handler(order_id: int):
+        received.append(order_id)
+    
+    manager = EventManager()
+    manager.subscribe("order.cancelled", handler)
+    relay = OutboxRelay(manager, session_factory=TestingSessionLocal, claim_timeout=60)
+    assert asyncio.run(relay.relay_once()) == 0
+    
+    relay.claim_timeout = 0
+    assert asyncio.run(relay.relay_once()) == 1
+    assert received == [1]
+
+def test_compact_deletes_old_processed_events(db):
+    old = add_event(db, "order.cancelled", order_id=1)
+    old.processed_at = datetime.utcnow() - timedelta(hours=48)
+    recent = add_event(db, "order.cancelled", order_id=2)
+    recent.processed_at = datetime.utcnow()
+    add_event(db, "order.cancelled", order_id=3)
+    db.commit()
+    
+    relay = OutboxRelay(EventManager(), session_factory=TestingSessionLocal, retention=timedelta(hours=24))
+    assert asyncio.run(relay.compact()) == 1
+    remaining = sorted(json.loads(payload)["order_id"] for payload, in db.query(OutboxEvent.payload))
+    assert remaining == [2, 3]
+
+def test_order_endpoints_write_outbox_events(client, test_data, db):
+    client.post(
+        "/api/auth/register",
+        json={
+            "email": "customer@example.com",
+            "full_name": "Test Customer",
+            "password": "customer123"
+        }
+    )
+    headers = get_auth_headers(client, "customer@example.com", "customer123")
+    product_id = client.get("/api/products/").json()["items"][0]["id"]
+    
+    order_data = {
+        "shipping_address": "123 Test Street",
+        "contact_phone": "1234567890",
+        "items": [{"product_id": product_id, "quantity": 1}]
+    }
+    order_id = client.post("/api/orders/", json=order_data, headers=headers).json()["id"]
+    client.post(f"/api/orders/{order_id}/cancel", headers=headers)
+    
+    events = [
+        (event_type, json.loads(payload))
+        for event_type, payload in db.query(OutboxEvent.event_type, OutboxEvent.payload).order_by(OutboxEvent.id)
+    ]
+    assert [event_type for event_type, _ in events] == [
+        OrderEvents.CREATED, OrderEvents.STATUS_CHANGED, OrderEvents.CANCELLED
+    ]
+    assert events[0][1]["order_id"] == order_id
+    assert events[0][1]["user_email"] == "customer@example.com"
+    assert events[1][1]["old_status"] == "pending"
+    assert events[1][1]["new_status"] == "cancelled"
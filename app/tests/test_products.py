@@ -5,7 +5,7 @@ from app.models.product import ProductCategory
 def test_list_products(client: TestClient, test_data):
     response = client.get("/api/products/")
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert len(data) > 0
     assert "name" in data[0]
     assert "price" in data[0]
@@ -19,7 +19,7 @@ def test_create_product(client: TestClient, test_data):
         "description": "Test Description",
         "price": 9.99,
         "stock_quantity": 50,
-        "category": "VEGETABLES",
+        "category": "vegetables",
         "unit": "kg"
     }
     
@@ -39,7 +39,7 @@ def test_create_product_unauthorized(client: TestClient, test_data):
         "description": "Test Description",
         "price": 9.99,
         "stock_quantity": 50,
-        "category": "VEGETABLES",
+        "category": "vegetables",
         "unit": "kg"
     }
     
@@ -52,7 +52,7 @@ def test_update_product(client: TestClient, test_data):
     
     # First get a product
     response = client.get("/api/products/")
-    products = response.json()
+    products = response.json()["items"]
     product_id = products[0]["id"]
     
     # Update the product
@@ -77,7 +77,7 @@ def test_delete_product(client: TestClient, test_data):
     
     # First get a product
     response = client.get("/api/products/")
-    products = response.json()
+    products = response.json()["items"]
     product_id = products[0]["id"]
     
     # Delete the product
@@ -89,4 +89,32 @@ def test_delete_product(client: TestClient, test_data):
     
     # Verify product is deleted
     response = client.get(f"/api/products/{product_id}")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_list_products_compressed(client: TestClient, test_data):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    client.post(
+        "/api/products/",
+        json={
+            "name": "Heirloom Tomatoes",
+            "description": "Mixed heirloom varieties picked at peak ripeness. " * 40,
+            "price": 6.49,
+            "stock_quantity": 20,
+            "category": "vegetables",
+            "unit": "kg"
+        },
+        headers=headers
+    )
+    
+    # The cache miss and the cache hit serve the same precompressed body
+    for _ in range(2):
+        response = client.get("/api/products/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(response.content)
+        assert len(response.json()["items"]) == 5
+    
+    response = client.get("/api/products/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert len(response.json()["items"]) == 5
@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.recommendations import rebuild_cooccurrences
+from app.models.product import ProductCooccurrence
+from app.tests.utils import assert_max_queries, get_auth_headers
+
+def place_order(client, headers, product_ids):
+    response = client.post("/api/orders/", json={
+        "shipping_address": "123 Test Street",
+        "contact_phone": "1234567890",
+        "items": [{"product_id": product_id, "quantity": 1} for product_id in product_ids]
+    }, headers=headers)
+    assert response.status_code == 200
+
+def test_related_products_from_co_purchases(client: TestClient, test_data, db):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    first, second, third, fourth = [product["id"] for product in client.get("/api/products/").json()["items"]]
+
+    place_order(client, headers, [first, second, third])
+    place_order(client, headers, [first, third])
+    place_order(client, headers, [fourth])
+
+    with assert_max_queries(1):
+        related = client.get(f"/api/products/{first}/related").json()
+    assert [(item["product"]["id"], item["bought_together"]) for item in related] == [(third, 2), (second, 1)]
+    assert client.get(f"/api/products/{first}/related", params={"limit": 1}).json()[0]["product"]["id"] == third
+    assert client.get(f"/api/products/{fourth}/related").json() == []
+    assert client.get("/api/products/9999/related").status_code == 404
+
+    # Rebuilding from order items gives the counts the endpoints kept
+    kept = {(row.product_id, row.related_id): row.count for row in db.query(ProductCooccurrence)}
+    assert rebuild_cooccurrences(db) == len(kept) == 6
+    db.expire_all()
+    assert {(row.product_id, row.related_id): row.count for row in db.query(ProductCooccurrence)} == kept
+
+    client.delete(f"/api/products/{third}", headers=headers)
+    assert db.query(ProductCooccurrence).filter(
+        (ProductCooccurrence.product_id == third) | (ProductCooccurrence.related_id == third)
+    ).count() == 0
+
+def test_large_baskets_add_no_pairs(client: TestClient, test_data, db, monkeypatch):
+    monkeypatch.setattr(settings, "RECOMMENDATIONS_MAX_BASKET", 3)
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    product_ids = [product["id"] for product in client.get("/api/products/").json()["items"]]
+
+    place_order(client, headers, product_ids)
+    place_order(client, headers, product_ids[:3])
+    pairs = {(row.product_id, row.related_id) for row in db.query(ProductCooccurrence)}
+    assert len(pairs) == 6 and product_ids[3] not in {product_id for pair in pairs for product_id in pair}
+    assert rebuild_cooccurrences(db) == 6
+
+    # Orders are capped too, so no basket can be arbitrarily large
+    response = client.post("/api/orders/", json={
+        "shipping_address": "123 Test Street",
+        "contact_phone": "1234567890",
+        "items": [{"product_id": product_ids[0], "quantity": 1}] * (settings.ORDER_MAX_ITEMS + 1)
+    }, headers=headers)
+    assert response.status_code == 422
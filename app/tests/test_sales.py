@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.core.sales import repair_sales_counters
+from app.models.product import Product, ProductSalesBucket
+from app.tests.utils import get_auth_headers
+
+def place_order(client, headers, items):
+    response = client.post("/api/orders/", json={
+        "shipping_address": "123 Test Street",
+        "contact_phone": "1234567890",
+        "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items]
+    }, headers=headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_counters_drive_popular_sort_and_bestsellers(client: TestClient, test_data, db):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    first, second, third = [product["id"] for product in client.get("/api/products/").json()["items"][:3]]
+    
+    place_order(client, headers, [(second, 5), (third, 1)])
+    place_order(client, headers, [(third, 2)])
+    cancelled = place_order(client, headers, [(first, 20)])
+    client.post(f"/api/orders/{cancelled}/cancel", headers=headers)
+    
+    counters = {row.id: (row.units_sold, row.order_count) for row in db.query(Product)}
+    assert counters[first] == (0, 0)
+    assert counters[second] == (5, 1)
+    assert counters[third] == (3, 2)
+    
+    popular = client.get("/api/products/", params={"sort": "popular"}).json()
+    # Products that never sold are listed too, after the ones that did
+    assert [product["id"] for product in popular["items"][:2]] == [second, third]
+    assert popular["total"] == len(popular["items"]) == 4
+    
+    bestsellers = client.get("/api/products/bestsellers", params={"window": "7d"}).json()
+    assert [(item["product"]["id"], item["units_sold"], item["order_count"]) for item in bestsellers] == [
+        (second, 5, 1), (third, 3, 2),
+    ]
+    assert client.get("/api/products/bestsellers", params={"window": "1y"}).status_code == 400
+    
+    # Counters already match the orders
+    assert repair_sales_counters(db) == 0
+
+def test_order_writes_invalidate_cached_rankings(client: TestClient, test_data, db):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    last = client.get("/api/products/").json()["items"][-1]["id"]
+    assert client.get("/api/products/bestsellers").json() == []
+    client.get("/api/products/", params={"sort": "popular"})
+    
+    order_id = place_order(client, headers, [(last, 2)])
+    assert client.get("/api/products/", params={"sort": "popular"}).json()["items"][0]["id"] == last
+    assert [item["product"]["id"] for item in client.get("/api/products/bestsellers").json()] == [last]
+    
+    client.post(f"/api/orders/{order_id}/cancel", headers=headers)
+    assert client.get("/api/products/bestsellers").json() == []
+
+def test_repair_fixes_drift_and_drops_old_buckets(client: TestClient, test_data, db):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    product_id = client.get("/api/products/").json()["items"][0]["id"]
+    place_order(client, headers, [(product_id, 4)])
+    
+    db.query(Product).filter(Product.id == product_id).update({"units_sold": 99})
+    db.query(ProductSalesBucket).update({"units_sold": 1})
+    db.add(ProductSalesBucket(day=datetime.utcnow().date() - timedelta(days=365), product_id=product_id, units_sold=7, order_count=1))
+    db.commit()
+    
+    assert repair_sales_counters(db) == 2
+    db.expire_all()
+    assert db.get(Product, product_id).units_sold == 4
+    assert [(bucket.day, bucket.units_sold) for bucket in db.query(ProductSalesBucket)] == [(datetime.utcnow().date(), 4)]
+    assert repair_sales_counters(db) == 0
+
+def test_cancelling_through_status_update_adjusts_counters(client: TestClient, test_data, db):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    product = client.get("/api/products/").json()["items"][0]
+    order_id = place_order(client, headers, [(product["id"], 3)])
+    client.put(f"/api/orders/{order_id}/status", params={"status": "confirmed"}, headers=headers)
+    
+    response = client.put(f"/api/orders/{order_id}/status", params={"status": "cancelled"}, headers=headers)
+    assert response.status_code == 200
+    db.expire_all()
+    sales = db.get(Product, product["id"])
+    assert (sales.units_sold, sales.order_count) == (0, 0)
+    assert db.query(ProductSalesBucket).filter(ProductSalesBucket.units_sold != 0).count() == 0
+    assert client.get(f"/api/products/{product['id']}").json()["stock_quantity"] == product["stock_quantity"]
+    assert repair_sales_counters(db) == 0
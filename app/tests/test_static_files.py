@@ -0,0 +1,57 @@
+import pytest
+from app.core.static_files import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+from app.utils.file_upload import PRODUCT_IMAGES_DIR, get_file_url
+
+KEY = "5e" * 16
+
+@pytest.fixture
+def stored_files():
+    PRODUCT_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    files = {
+        f"{KEY}-card.jpg": b"\xff\xd8\xff" + b"j" * 2000,
+        f"{KEY}-card.webp": b"RIFF" + b"w" * 1000,
+        "legacy.png": b"\x89PNG\r\n\x1a\n" + b"p" * 500,
+    }
+    for name, content in files.items():
+        (PRODUCT_IMAGES_DIR / name).write_bytes(content)
+    yield files
+    for name in files:
+        (PRODUCT_IMAGES_DIR / name).unlink(missing_ok=True)
+
+def test_content_addressed_image_is_immutable(client, stored_files):
+    url = get_file_url(f"products/{KEY}-card.jpg")
+    assert url == f"/uploads/products/{KEY}-card.jpg"
+    
+    response = client.get(url, headers={"Accept": "image/jpeg"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["vary"] == "Accept"
+    assert response.content == stored_files[f"{KEY}-card.jpg"]
+    
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/")
+    not_modified = client.get(url, headers={"Accept": "image/jpeg", "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    
+    partial = client.get(url, headers={"Accept": "image/jpeg", "Range": "bytes=0-2"})
+    assert partial.status_code == 206
+    assert partial.content == b"\xff\xd8\xff"
+
+def test_webp_served_when_accepted(client, stored_files):
+    response = client.get(
+        f"/uploads/products/{KEY}-card.jpg",
+        headers={"Accept": "image/avif,image/webp,*/*;q=0.8"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.content == stored_files[f"{KEY}-card.webp"]
+    assert response.headers["etag"] == f'"{KEY}-card.webp"'
+
+def test_other_files_need_version_token(client, stored_files):
+    url = get_file_url("products/legacy.png")
+    assert "?v=" in url
+    assert client.get(url).headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    
+    unversioned = client.get("/uploads/products/legacy.png")
+    assert unversioned.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
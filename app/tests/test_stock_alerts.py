@@ -0,0 +1,73 @@
+import json
+from fastapi.testclient import TestClient
+from app.core.events import ProductEvents
+from app.core.stock_alerts import reconcile_stock_alerts
+from app.models.outbox import OutboxEvent
+from app.models.product import Product
+from app.tests.utils import get_auth_headers
+
+def stock_events(db):
+    return [
+        (event_type, json.loads(payload))
+        for event_type, payload in db.query(OutboxEvent.event_type, OutboxEvent.payload)
+        .filter(OutboxEvent.event_type.in_([ProductEvents.LOW_STOCK, ProductEvents.RESTOCKED]))
+        .order_by(OutboxEvent.id)
+    ]
+
+def place_order(client, headers, product_id, quantity):
+    return client.post("/api/orders/", json={
+        "shipping_address": "123 Test Street",
+        "contact_phone": "1234567890",
+        "items": [{"product_id": product_id, "quantity": quantity}]
+    }, headers=headers)
+
+def test_alert_fires_once_when_stock_crosses_threshold(client: TestClient, test_data, db):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    product = client.get("/api/products/").json()["items"][0]
+    product_id, stock = product["id"], product["stock_quantity"]
+    
+    place_order(client, headers, product_id, stock - 12)
+    assert stock_events(db) == []
+    
+    order_id = place_order(client, headers, product_id, 3).json()["id"]
+    place_order(client, headers, product_id, 1)
+    events = stock_events(db)
+    assert [event_type for event_type, _ in events] == [ProductEvents.LOW_STOCK]
+    assert events[0][1]["stock_quantity"] == 9
+    assert events[0][1]["threshold"] == 10
+    
+    alerts = client.get("/api/products/stock-alerts", headers=headers).json()
+    assert [alert["product_id"] for alert in alerts] == [product_id]
+    
+    client.post(f"/api/orders/{order_id}/cancel", headers=headers)
+    assert [event_type for event_type, _ in stock_events(db)] == [ProductEvents.LOW_STOCK, ProductEvents.RESTOCKED]
+    assert client.get("/api/products/stock-alerts", headers=headers).json() == []
+
+def test_per_product_threshold(client: TestClient, test_data, db):
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    product = client.get("/api/products/").json()["items"][0]
+    
+    response = client.put(
+        f"/api/products/{product['id']}/stock-alert", json={"threshold": product["stock_quantity"]}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["threshold"] == product["stock_quantity"]
+    assert response.json()["alerted_at"] is not None
+    
+    response = client.put(f"/api/products/{product['id']}/stock-alert", json={"threshold": None}, headers=headers)
+    assert response.json()["threshold"] == 10
+    assert response.json()["alerted_at"] is None
+    assert [event_type for event_type, _ in stock_events(db)] == [ProductEvents.LOW_STOCK, ProductEvents.RESTOCKED]
+
+def test_reconciliation_repairs_missed_alerts(test_data, db):
+    low, restocked = db.query(Product).order_by(Product.id).limit(2).all()
+    low.stock_quantity = 3
+    restocked.low_stock_alerted_at = restocked.created_at
+    restocked.low_stock_alerted_quantity = 1
+    db.commit()
+    low_id, restocked_id = low.id, restocked.id
+    
+    assert reconcile_stock_alerts(db) == 2
+    assert reconcile_stock_alerts(db) == 0
+    events = {payload["product_id"]: event_type for event_type, payload in stock_events(db)}
+    assert events == {low_id: ProductEvents.LOW_STOCK, restocked_id: ProductEvents.RESTOCKED}
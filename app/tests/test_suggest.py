@@ -0,0 +1,108 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.core import suggest as suggest_module
+from app.core.suggest import PrefixIndex, ProductSuggester, normalize
+from app.models.product import Product, ProductCategory
+from app.routers import product as product_router
+from app.tests.conftest import TestingSessionLocal
+from app.tests.utils import get_auth_headers
+
+def test_suggest_endpoint_follows_product_writes(client: TestClient, test_data, db, monkeypatch):
+    suggester = ProductSuggester()
+    monkeypatch.setattr(product_router, "product_suggester", suggester)
+    headers = get_auth_headers(client, "admin@agrofarm.com", "admin123")
+    products = {product["name"]: product["id"] for product in client.get("/api/products/").json()["items"]}
+    client.post("/api/orders/", json={
+        "shipping_address": "123 Test Street",
+        "contact_phone": "1234567890",
+        "items": [{"product_id": products["Organic Rice"], "quantity": 3}]
+    }, headers=headers)
+    assert suggester.rebuild(db) == 4
+
+    def suggest(q):
+        response = client.get("/api/products/suggest", params={"q": q})
+        assert response.status_code == 200
+        return [product["name"] for product in response.json()["products"]]
+
+    # Most units sold first; any word of the name can start a match
+    assert suggest("org") == ["Organic Rice", "Organic Apples"]
+    assert suggest("FRÉSH") == ["Fresh Tomatoes", "Farm Fresh Milk"]
+    assert suggest("fresh m") == ["Farm Fresh Milk"]
+    assert suggest("zzz") == []
+    assert client.get("/api/products/suggest", params={"q": "da"}).json()["categories"] == ["dairy"]
+    assert client.get("/api/products/suggest", params={"q": ""}).status_code == 422
+
+    response = client.post("/api/products/", json={
+        "name": "Organic Honey", "description": "Raw honey", "price": 8.0,
+        "stock_quantity": 10, "category": "other", "unit": "jar"
+    }, headers=headers)
+    honey = response.json()["id"]
+    assert suggest("organic h") == ["Organic Honey"]
+
+    client.put(f"/api/products/{honey}", json={"name": "Wild Honey"}, headers=headers)
+    assert suggest("organic h") == []
+    assert suggest("hon") == ["Wild Honey"]
+
+    client.delete(f"/api/products/{honey}", headers=headers)
+    assert suggest("hon") == []
+
+def test_prefix_index_matches_a_full_scan():
+    rng = random.Random(7)
+    words = ["fresh", "farm", "organic", "apples", "apricots", "milk", "mint", "rice"]
+    products = {
+        product_id: (f"{rng.choice(words)} {rng.choice(words)} {product_id}", rng.randint(0, 50))
+        for product_id in range(1, 3001)
+    }
+    index = PrefixIndex(
+        (product_id, name, ProductCategory.OTHER, units_sold) for product_id, (name, units_sold) in products.items()
+    )
+
+    def expected(query, limit=10):
+        words_of = {product_id: normalize(name).split() for product_id, (name, _) in products.items()}
+        matches = [
+            product_id for product_id, name_words in words_of.items()
+            if any(" ".join(name_words[start:]).startswith(query) for start in range(len(name_words)))
+        ]
+        return sorted(matches, key=lambda product_id: (-products[product_id][1], product_id))[:limit]
+
+    queries = ["f", "fa", "fresh", "fresh a", "ap", "apricots m", "m", "1", "29", "rice rice"]
+    for query in queries:
+        assert index.search(query) == expected(query)
+
+    # Updates keep the precomputed top lists right
+    for product_id in rng.sample(sorted(products), 400):
+        if rng.random() < 0.5:
+            del products[product_id]
+            index.remove(product_id)
+        else:
+            name, units_sold = f"{rng.choice(words)} {rng.choice(words)} x", rng.randint(0, 60)
+            products[product_id] = (name, units_sold)
+            index.add(product_id, name, ProductCategory.OTHER, units_sold)
+    for query in queries + ["fresh x", "x"]:
+        assert index.search(query, 20) == expected(query, 20)
+
+def test_refresh_applies_only_changed_products(test_data, db, monkeypatch):
+    monkeypatch.setattr(suggest_module, "FULL_REBUILD_FRACTION", 1.0)  # Keep four changes of four products incremental
+    db.query(Product).update({"updated_at": datetime.utcnow() - timedelta(hours=1)})
+    db.commit()
+    suggester = ProductSuggester(session_factory=TestingSessionLocal)
+    assert asyncio.run(suggester.refresh()) == 4
+    assert asyncio.run(suggester.refresh()) == 0
+    products = {product.name: product for product in db.query(Product)}
+
+    # Writes made by another process: a sale, a rename, a new product and a deletion
+    db.query(Product).filter(Product.id == products["Fresh Tomatoes"].id).update(
+        {"units_sold": 5, "updated_at": Product.updated_at}, synchronize_session=False
+    )
+    products["Organic Apples"].name = "Organic Pears"
+    db.delete(products["Farm Fresh Milk"])
+    db.add(Product(name="Fresh Mint", description="Mint", price=1.0, stock_quantity=5, category=ProductCategory.OTHER, unit="bunch"))
+    db.commit()
+
+    index = suggester.index
+    assert asyncio.run(suggester.refresh()) == 4
+    assert suggester.index is index
+    assert [name for _, name, _ in suggester.suggest("fresh")[1]] == ["Fresh Tomatoes", "Fresh Mint"]
+    assert [name for _, name, _ in suggester.suggest("organic")[1]] == ["Organic Pears", "Organic Rice"]
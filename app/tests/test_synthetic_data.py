@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import func, inspect, select
+from app.core.database import create_db_engine
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.utils.synthetic_data import DatasetSpec, generate_dataset
+
+def load(tmp_path, name, **sizes):
+    engine = create_db_engine(f"sqlite:///{tmp_path / name}")
+    counts = generate_dataset(engine, DatasetSpec(**sizes), chunk_size=100, commit_every=250)
+    return engine, counts
+
+def test_dataset_is_deterministic_and_consistent(tmp_path):
+    sizes = {"products": 200, "users": 20, "orders": 500, "seed": 7}
+    first, counts = load(tmp_path, "first.db", **sizes)
+    second, _ = load(tmp_path, "second.db", **sizes)
+
+    assert counts["products"] == 200 and counts["users"] == 20 and counts["orders"] == 500
+    assert counts["order_items"] >= 500
+    for table in (Product.__table__, Order.__table__, OrderItem.__table__):
+        with first.connect() as a, second.connect() as b:
+            assert a.execute(select(table)).all() == b.execute(select(table)).all()
+
+    with first.connect() as conn:
+        item_totals = dict(conn.execute(
+            select(OrderItem.order_id, func.sum(OrderItem.quantity * OrderItem.unit_price))
+            .group_by(OrderItem.order_id)
+        ).all())
+        for order_id, total in conn.execute(select(Order.id, Order.total_amount)):
+            assert total == pytest.approx(item_totals[order_id], abs=0.01)
+
+        # Popularity is skewed: the top 10% of products take a large share of items
+        sold = [count for count, in conn.execute(
+            select(func.count()).select_from(OrderItem.__table__).group_by(OrderItem.product_id)
+            .order_by(func.count().desc())
+        )]
+        assert sum(sold[:20]) > 0.4 * sum(sold)
+
+    index_names = {index["name"] for index in inspect(first).get_indexes("orders")}
+    assert "ix_orders_status_updated_at" in index_names
+
+def test_refuses_to_load_into_a_populated_database(tmp_path):
+    engine, _ = load(tmp_path, "data.db", products=5, users=2, orders=5)
+    with pytest.raises(ValueError):
+        generate_dataset(engine, DatasetSpec(products=5, users=2, orders=5))
@@ -1,4 +1,6 @@
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
+from app.core.query_tracker import track_queries
 
 def get_auth_headers(client: TestClient, email: str, password: str) -> dict:
     response = client.post(
@@ -9,4 +11,13 @@ def get_auth_headers(client: TestClient, email: str, password: str) -> dict:
         }
     )
     token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+@contextmanager
+def assert_max_queries(n: int):
+    """Fail if the block executes more than n SQL statements"""
+    with track_queries() as tracker:
+        yield tracker
+    assert tracker.count <= n, (
+        f"Expected at most {n} queries, got {tracker.count}:\n{tracker.summary()}"
+    )
\ No newline at end of file
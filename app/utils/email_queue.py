@@ -0,0 +1,354 @@
+"""Transactional email delivery queue.
+
+Messages are queued in memory and delivered by a small pool of workers.
+Each worker keeps its SMTP connection open between messages, sends
+whatever is queued as a batch over that connection, and closes it after
+EMAIL_CONNECTION_IDLE_TIMEOUT without work. Transient failures (connection
+errors, timeouts, 4xx replies) are retried with exponential backoff;
+permanent failures (5xx replies, or retries exhausted) are written to the
+dead-letter directory as JSON, one file per message.
+
+Usage:
+    python -m app.utils.email_queue --replay  # Re-send dead-lettered messages
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from uuid import uuid4
+from loguru import logger
+from app.core.config import settings
+from app.core.metrics import registry
+
+emails_sent_total = registry.counter(
+    "emails_sent_total", "Emails accepted by the SMTP server"
+)
+emails_retried_total = registry.counter(
+    "emails_retried_total", "Email deliveries rescheduled after a transient failure"
+)
+emails_dead_lettered_total = registry.counter(
+    "emails_dead_lettered_total", "Emails written to the dead-letter store", ("reason",)
+)
+email_send_seconds = registry.histogram(
+    "email_send_seconds", "Time to send one email over an open SMTP connection"
+)
+smtp_connections_opened_total = registry.counter(
+    "smtp_connections_opened_total", "SMTP connections opened by email workers"
+)
+email_queue_depth = registry.gauge(
+    "email_queue_depth", "Emails waiting for a delivery worker"
+)
+
+class QueuedEmail:
+    """One message waiting for delivery"""
+
+    def __init__(
+        self,
+        to: str,
+        subject: str,
+        body: str,
+        subtype: str = "html",
+        attempts: int = 0,
+        id: Optional[str] = None,
+        text: Optional[str] = None
+    ):
+        self.id = id or uuid4().hex
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.subtype = subtype
+        self.attempts = attempts
+        self.text = text  # Plain-text alternative to an HTML body
+
+    def to_message(self) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((settings.EMAILS_FROM_NAME or "", settings.EMAILS_FROM_EMAIL or ""))
+        message["To"] = self.to
+        message["Subject"] = self.subject
+        message["Message-ID"] = make_msgid()
+        if self.text is not None:
+            message.set_content(self.text)
+            message.add_alternative(self.body, subtype=self.subtype)
+        else:
+            message.set_content(self.body, subtype=self.subtype)
+        return message
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "to": self.to,
+            "subject": self.subject,
+            "body": self.body,
+            "subtype": self.subtype,
+            "text": self.text,
+            "attempts": self.attempts,
+        }
+
+class DeadLetterStore:
+    """Undeliverable messages stored as one JSON file each"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def add(self, email: QueuedEmail, error: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{email.id}.json"
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps({
+            **email.to_dict(),
+            "error": error,
+            "failed_at": datetime.utcnow().isoformat(),
+        }))
+        os.replace(temp_path, path)
+        return path
+
+    def __iter__(self) -> Iterator[Tuple[Path, QueuedEmail]]:
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                logger.error(f"Unreadable dead-lettered email {path}")
+                continue
+            yield path, QueuedEmail(
+                data["to"], data["subject"], data["body"], data.get("subtype", "html"),
+                id=data["id"], text=data.get("text")
+            )
+
+def create_smtp_client() -> Any:
+    """SMTP client for the configured server; imported lazily to keep startup light"""
+    import aiosmtplib
+
+    return aiosmtplib.SMTP(
+        hostname=settings.SMTP_HOST,
+        port=settings.SMTP_PORT,
+        username=settings.SMTP_USER or None,
+        password=settings.SMTP_PASSWORD or None,
+        start_tls=settings.SMTP_TLS,
+        timeout=settings.SMTP_TIMEOUT
+    )
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx replies won't succeed on retry; connection problems and 4xx replies might"""
+    import aiosmtplib
+
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(recipient.code >= 500 for recipient in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code >= 500
+    return False
+
+class EmailQueue:
+    """Delivers queued email over pooled SMTP connections with retries"""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 10000,
+        batch_size: int = 20,
+        max_retries: int = 5,
+        retry_backoff: float = 2.0,
+        retry_backoff_max: float = 300.0,
+        idle_timeout: float = 30.0,
+        dead_letter_dir: Path = Path("dead_letters/email"),
+        client_factory: Callable[[], Any] = create_smtp_client
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.idle_timeout = idle_timeout
+        self.dead_letters = DeadLetterStore(dead_letter_dir)
+        self.client_factory = client_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._retry_tasks: Set[asyncio.Task] = set()
+        self._retrying: Dict[str, QueuedEmail] = {}  # Messages waiting out a backoff
+
+    @property
+    def running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"email-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Deliver what is queued, up to drain_timeout; dead-letter anything left"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._worker_tasks + list(self._retry_tasks):
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, *self._retry_tasks, return_exceptions=True)
+
+        undelivered = list(self._retrying.values())
+        while not self._queue.empty():
+            undelivered.append(self._queue.get_nowait())
+        for email in undelivered:
+            self._dead_letter(email, "Undelivered at shutdown", "shutdown")
+        if undelivered:
+            logger.warning(f"Dead-lettered {len(undelivered)} undelivered emails on shutdown")
+
+        self._worker_tasks = []
+        self._retry_tasks = set()
+        self._retrying = {}
+        self._queue = None
+
+    def enqueue(self, email: QueuedEmail) -> bool:
+        """Queue a message for delivery. Returns False if it could not be queued."""
+        if not self.running:
+            logger.warning(f"Email queue is not running, dropped email to {email.to}")
+            return False
+        try:
+            self._queue.put_nowait(email)
+        except asyncio.QueueFull:
+            self._dead_letter(email, "Email queue full", "queue_full")
+            return False
+        return True
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _next_batch(self) -> List[QueuedEmail]:
+        """Wait up to idle_timeout for a message, then take whatever else is queued"""
+        batch = [await asyncio.wait_for(self._queue.get(), timeout=self.idle_timeout)]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _worker(self) -> None:
+        client = None
+        try:
+            while True:
+                try:
+                    batch = await self._next_batch()
+                except asyncio.TimeoutError:
+                    client = await self._close(client)
+                    continue
+                try:
+                    client = await self._send_batch(client, batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            await self._close(client)
+
+    async def _send_batch(self, client: Any, batch: List[QueuedEmail]) -> Any:
+        """Send a batch over one connection; returns the connection to reuse"""
+        for index, email in enumerate(batch):
+            try:
+                if client is None or not client.is_connected:
+                    client = self.client_factory()
+                    await client.connect()
+                    smtp_connections_opened_total.inc()
+                start_time = time.perf_counter()
+                await client.send_message(email.to_message())
+                email_send_seconds.observe(time.perf_counter() - start_time)
+                emails_sent_total.inc()
+            except asyncio.CancelledError:
+                # Requeue the rest of the batch so stop() can dead-letter it
+                for pending in batch[index:]:
+                    self._retrying[pending.id] = pending
+                raise
+            except Exception as e:
+                self._handle_failure(email, e)
+                if not is_permanent_failure(e):
+                    # The connection may be broken; start the next message on a fresh one
+                    client = await self._close(client)
+        return client
+
+    def _handle_failure(self, email: QueuedEmail, error: Exception) -> None:
+        email.attempts += 1
+        if is_permanent_failure(error):
+            self._dead_letter(email, str(error), "rejected")
+        elif email.attempts > self.max_retries:
+            self._dead_letter(email, str(error), "retries_exhausted")
+        else:
+            delay = min(self.retry_backoff * 2 ** (email.attempts - 1), self.retry_backoff_max)
+            delay *= random.uniform(0.5, 1.0)  # Jitter so a server outage doesn't cause retry bursts
+            logger.warning(f"Email to {email.to} failed ({str(error)}), retry {email.attempts} in {delay:.1f}s")
+            emails_retried_total.inc()
+            self._retrying[email.id] = email
+            task = asyncio.create_task(self._retry_later(email, delay))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+
+    async def _retry_later(self, email: QueuedEmail, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._queue.put(email)
+        self._retrying.pop(email.id, None)
+
+    def _dead_letter(self, email: QueuedEmail, error: str, reason: str) -> None:
+        try:
+            self.dead_letters.add(email, error)
+            logger.error(f"Email to {email.to} dead-lettered: {error}")
+        except OSError as e:
+            logger.error(f"Failed to dead-letter email to {email.to}: {str(e)}")
+        emails_dead_lettered_total.inc(reason)
+
+    @staticmethod
+    async def _close(client: Any) -> None:
+        if client is not None and client.is_connected:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+        return None
+
+    async def replay_dead_letters(self) -> int:
+        """Queue every dead-lettered message again, removing it from the store"""
+        replayed = 0
+        for path, email in self.dead_letters:
+            if not self.enqueue(email):
+                break
+            path.unlink(missing_ok=True)
+            replayed += 1
+        return replayed
+
+email_queue = EmailQueue(
+    workers=settings.EMAIL_WORKERS,
+    queue_size=settings.EMAIL_QUEUE_SIZE,
+    batch_size=settings.EMAIL_BATCH_SIZE,
+    max_retries=settings.EMAIL_MAX_RETRIES,
+    retry_backoff=settings.EMAIL_RETRY_BACKOFF,
+    retry_backoff_max=settings.EMAIL_RETRY_BACKOFF_MAX,
+    idle_timeout=settings.EMAIL_CONNECTION_IDLE_TIMEOUT,
+    dead_letter_dir=Path(settings.EMAIL_DEAD_LETTER_DIR)
+)
+email_queue_depth.add_collector(lambda: [((), email_queue.qsize())])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the email dead-letter store")
+    parser.add_argument("--replay", action="store_true", help="Re-send dead-lettered messages")
+    args = parser.parse_args()
+
+    if not args.replay:
+        print(json.dumps([email.to_dict() for _, email in email_queue.dead_letters], indent=2))
+        return
+
+    async def replay() -> int:
+        await email_queue.start()
+        replayed = await email_queue.replay_dead_letters()
+        await email_queue.stop(drain_timeout=settings.EMAIL_RETRY_BACKOFF_MAX)
+        return replayed
+
+    print(f"Replayed {asyncio.run(replay())} emails")
+
+if __name__ == "__main__":
+    main()
@@ -1,111 +1,118 @@
-from typing import Dict
+"""Email templates, compiled once and rendered to HTML and plain-text parts.
+
+Templates live in app/templates/email as <name>.html and <name>.txt pairs.
+HTML templates are autoescaped, text templates are not. Every template is
+compiled by load() at startup and kept in memory; templates are never
+re-checked on disk, so rendering only runs the compiled code.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
 from app.models.order import OrderStatus
 
-def get_order_status_template(status: OrderStatus) -> Dict[str, str]:
-    """Get email template for order status updates"""
-    templates = {
-        OrderStatus.CONFIRMED: {
-            "subject": "Your Order Has Been Confirmed",
-            "body": """
-            Dear {customer_name},
-
-            Great news! Your order #{order_id} has been confirmed and is being processed.
-
-            Order Details:
-            - Order ID: {order_id}
-            - Total Amount: ${total_amount:.2f}
-            - Status: Confirmed
-
-            We'll notify you when your order is ready for shipping.
-
-            Thank you for choosing Agro Farm!
-            """
-        },
-        OrderStatus.PROCESSING: {
-            "subject": "Your Order is Being Processed",
-            "body": """
-            Dear {customer_name},
-
-            Your order #{order_id} is now being processed and prepared for shipping.
-
-            Order Details:
-            - Order ID: {order_id}
-            - Total Amount: ${total_amount:.2f}
-            - Status: Processing
-
-            We'll update you once your order has been shipped.
-
-            Thank you for your patience!
-            """
-        },
-        OrderStatus.SHIPPED: {
-            "subject": "Your Order Has Been Shipped",
-            "body": """
-            Dear {customer_name},
-
-            Your order #{order_id} is on its way to you!
-
-            Order Details:
-            - Order ID: {order_id}
-            - Total Amount: ${total_amount:.2f}
-            - Status: Shipped
-            - Tracking Number: {tracking_number}
-
-            You can track your order using the tracking number above.
-
-            Thank you for shopping with Agro Farm!
-            """
-        },
-        OrderStatus.DELIVERED: {
-            "subject": "Your Order Has Been Delivered",
-            "body": """
-            Dear {customer_name},
-
-            Your order #{order_id} has been delivered successfully.
-
-            Order Details:
-            - Order ID: {order_id}
-            - Total Amount: ${total_amount:.2f}
-            - Status: Delivered
-            - Delivery Date: {delivery_date}
-
-            We hope you enjoy your fresh farm products! Please don't hesitate to contact us if you have any questions.
-
-            Thank you for choosing Agro Farm!
-            """
-        },
-        OrderStatus.CANCELLED: {
-            "subject": "Your Order Has Been Cancelled",
-            "body": """
-            Dear {customer_name},
-
-            Your order #{order_id} has been cancelled.
-
-            Order Details:
-            - Order ID: {order_id}
-            - Total Amount: ${total_amount:.2f}
-            - Status: Cancelled
-            - Reason: {cancel_reason}
-
-            If you didn't request this cancellation or have any questions, please contact our support team.
-
-            Thank you for your understanding.
-            """
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+COMPANY_NAME = "Agro Farm"
+
+ORDER_STATUS_SUBJECTS = {
+    OrderStatus.CONFIRMED: "Your Order Has Been Confirmed",
+    OrderStatus.PROCESSING: "Your Order is Being Processed",
+    OrderStatus.SHIPPED: "Your Order Has Been Shipped",
+    OrderStatus.DELIVERED: "Your Order Has Been Delivered",
+    OrderStatus.CANCELLED: "Your Order Has Been Cancelled",
+}
+DEFAULT_ORDER_SUBJECT = "Order Status Update"
+WELCOME_SUBJECT = f"Welcome to {COMPANY_NAME}!"
+
+class RenderedEmail:
+    """Subject and body parts of one rendered message"""
+
+    def __init__(self, subject: str, html: str, text: str):
+        self.subject = subject
+        self.html = html
+        self.text = text
+
+class EmailTemplates:
+    """Compiled email templates"""
+
+    def __init__(self, directory: Path = TEMPLATE_DIR):
+        self.directory = directory
+        self._env = None
+        self._templates: Dict[str, Tuple[Any, Any]] = {}
+
+    def load(self) -> None:
+        """Compile every template; Jinja2 is imported here rather than at import time"""
+        if self._env is not None:
+            return
+        from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+        env = Environment(
+            loader=FileSystemLoader(str(self.directory)),
+            autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+            auto_reload=False,
+            cache_size=-1,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            undefined=StrictUndefined
+        )
+        env.globals.update(company_name=COMPANY_NAME, support_email=settings.EMAILS_FROM_EMAIL or "")
+
+        html_names = {path.stem for path in self.directory.glob("*.html")}
+        names = html_names & {path.stem for path in self.directory.glob("*.txt")}
+        self._templates = {
+            name: (env.get_template(f"{name}.html"), env.get_template(f"{name}.txt")) for name in names
         }
+        self._env = env
+
+    def names(self) -> List[str]:
+        self.load()
+        return sorted(self._templates)
+
+    def _get(self, name: str) -> Tuple[Any, Any]:
+        self.load()
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise ValueError(f"Unknown email template: {name}")
+
+    def render(self, name: str, subject: str, context: Dict[str, Any]) -> RenderedEmail:
+        html, text = self._get(name)
+        return RenderedEmail(subject, html.render(context), text.render(context))
+
+    def render_many(self, name: str, subject: str, contexts: Iterable[Dict[str, Any]]) -> List[RenderedEmail]:
+        """Render one template for many recipients, looking it up only once"""
+        html, text = self._get(name)
+        return [RenderedEmail(subject, html.render(context), text.render(context)) for context in contexts]
+
+email_templates = EmailTemplates()
+
+def order_status_template(status: OrderStatus) -> Tuple[str, str]:
+    """Template name and subject for an order status update"""
+    return "order_status", ORDER_STATUS_SUBJECTS.get(status, DEFAULT_ORDER_SUBJECT)
+
+def order_status_context(
+    customer_name: str,
+    order_id: int,
+    total_amount: float,
+    status: OrderStatus,
+    tracking_number: Optional[str] = None,
+    cancel_reason: Optional[str] = None,
+    delivery_date: Optional[str] = None
+) -> Dict[str, Any]:
+    return {
+        "customer_name": customer_name,
+        "order_id": order_id,
+        "total_amount": total_amount,
+        "status": status.value,
+        "tracking_number": tracking_number,
+        "cancel_reason": cancel_reason,
+        "delivery_date": delivery_date,
     }
-    
-    return templates.get(status, {
-        "subject": "Order Status Update",
-        "body": """
-        Dear {customer_name},
-
-        Your order #{order_id} has been updated.
-
-        Order Details:
-        - Order ID: {order_id}
-        - Total Amount: ${total_amount:.2f}
-        - Status: {status}
-
-        Thank you for shopping with Agro Farm!
-        """
-    })
\ No newline at end of file
+
+def render_order_status(status: OrderStatus, context: Dict[str, Any]) -> RenderedEmail:
+    name, subject = order_status_template(status)
+    return email_templates.render(name, subject, context)
+
+def render_order_status_batch(status: OrderStatus, contexts: Iterable[Dict[str, Any]]) -> List[RenderedEmail]:
+    """Render status update emails for many orders moving to the same status"""
+    name, subject = order_status_template(status)
+    return email_templates.render_many(name, subject, contexts)
@@ -1,85 +1,137 @@
+import functools
+import hashlib
 import os
+import re
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 from fastapi import UploadFile
-from PIL import Image
 from uuid import uuid4
 import aiofiles
 from loguru import logger
+from app.utils.image_processing import (
+    IMAGE_FORMATS, IMAGE_VARIANTS, PRIMARY_VARIANT, variant_filename
+)
 
 # Configure upload paths
 UPLOAD_DIR = Path("uploads")
 PRODUCT_IMAGES_DIR = UPLOAD_DIR / "products"
-
-# Create directories if they don't exist
-PRODUCT_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+STAGING_DIR = UPLOAD_DIR / "tmp"  # Raw uploads waiting for processing
 
 # Allowed image extensions
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 
 # Image size limits
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
-MAX_DIMENSION = 2000  # Maximum width/height in pixels
 
-async def save_upload_file(
-    upload_file: UploadFile,
-    directory: Path = PRODUCT_IMAGES_DIR
-) -> str:
-    """Save uploaded file and return the file path"""
-    # Validate file size
-    content = await upload_file.read()
-    if len(content) > MAX_IMAGE_SIZE:
-        raise ValueError(f"File size exceeds maximum limit of {MAX_IMAGE_SIZE/1024/1024}MB")
+# Precompressed siblings, e.g. catalog.svg.br next to catalog.svg
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Length of the sha256 prefix used as a content key in variant file names
+CONTENT_KEY_LENGTH = 32
+VARIANT_FILE_PATTERN = re.compile(
+    rf"^(?P<key>[0-9a-f]{{{CONTENT_KEY_LENGTH}}})-(?:{'|'.join(IMAGE_VARIANTS)})"
+    rf"(?:{'|'.join(re.escape(ext) for _, ext, _ in IMAGE_FORMATS.values())})$"
+)
+
+# Uploads are read, hashed and written in chunks of this size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# File signatures accepted for each image format
+IMAGE_SIGNATURES = {
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "webp": (b"RIFF",),
+}
+EXTENSION_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
+
+def detect_image_format(header: bytes) -> Optional[str]:
+    """Identify an image format from the first bytes of a file"""
+    for image_format, signatures in IMAGE_SIGNATURES.items():
+        if header.startswith(signatures):
+            if image_format == "webp" and header[8:12] != b"WEBP":
+                continue
+            return image_format
+    return None
+
+class StagedUpload:
+    """A validated upload written to the staging directory"""
     
-    # Validate file extension
-    file_ext = Path(upload_file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise ValueError(f"File type not allowed. Supported types: {', '.join(ALLOWED_EXTENSIONS)}")
+    def __init__(self, path: Path, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
     
-    # Generate unique filename
-    unique_filename = f"{uuid4()}{file_ext}"
-    file_path = directory / unique_filename
+    @property
+    def content_key(self) -> str:
+        return self.sha256[:CONTENT_KEY_LENGTH]
+
+def ensure_upload_dirs() -> None:
+    """Create upload directories if they don't exist"""
+    PRODUCT_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+
+async def stream_upload(
+    upload_file: UploadFile,
+    destination: Path,
+    max_size: int,
+    validate_header: Optional[Callable[[bytes], None]] = None
+) -> Tuple[int, str]:
+    """Stream an upload to destination in chunks and return its size and sha256.
     
+    The size limit is enforced on every chunk and validate_header is called
+    with the first chunk, so invalid uploads are rejected without buffering
+    them. Data goes to a .part file that is renamed into place once complete.
+    """
+    partial_path = destination.with_name(destination.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
     try:
-        # Save original file
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
+        async with aiofiles.open(partial_path, "wb") as f:
+            while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                if size == 0 and validate_header:
+                    validate_header(chunk)
+                
+                # Validate file size
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError(f"File size exceeds maximum limit of {max_size/1024/1024}MB")
+                
+                digest.update(chunk)
+                await f.write(chunk)
         
-        # Process image
-        await process_image(file_path)
-        
-        return str(file_path.relative_to(UPLOAD_DIR))
-    
-    except Exception as e:
-        # Clean up file if there was an error
-        if file_path.exists():
-            file_path.unlink()
-        logger.error(f"Error saving file: {str(e)}")
+        if size == 0:
+            raise ValueError("Uploaded file is empty")
+        os.replace(partial_path, destination)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
         raise
+    
+    return size, digest.hexdigest()
 
-async def process_image(file_path: Path) -> None:
-    """Process and optimize uploaded image"""
-    try:
-        with Image.open(file_path) as img:
-            # Convert RGBA to RGB if needed
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
-            
-            # Resize if image is too large
-            if img.width > MAX_DIMENSION or img.height > MAX_DIMENSION:
-                ratio = min(MAX_DIMENSION/img.width, MAX_DIMENSION/img.height)
-                new_size = (int(img.width * ratio), int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # Optimize and save
-            img.save(
-                file_path,
-                optimize=True,
-                quality=85  # Good balance between quality and file size
-            )
+def validate_image_header(header: bytes, file_ext: str) -> None:
+    if detect_image_format(header) != EXTENSION_FORMATS[file_ext]:
+        raise ValueError("File content does not match a supported image type")
+
+async def stage_upload_file(upload_file: UploadFile) -> StagedUpload:
+    """Stream an upload to the staging directory, validating as it goes.
     
-    except Exception as e:
-        logger.error(f"Error processing image {file_path}: {str(e)}")
-        raise
+    The extension is checked before reading and the magic bytes on the
+    first chunk, so invalid files are rejected without buffering them.
+    """
+    # Validate file extension
+    file_ext = Path(upload_file.filename or "").suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"File type not allowed. Supported types: {', '.join(ALLOWED_EXTENSIONS)}")
+    
+    # Generate unique filename
+    staged_path = STAGING_DIR / f"{uuid4()}{file_ext}"
+    size, sha256 = await stream_upload(
+        upload_file,
+        staged_path,
+        MAX_IMAGE_SIZE,
+        validate_header=functools.partial(validate_image_header, file_ext=file_ext)
+    )
+    return StagedUpload(staged_path, size, sha256)
 
 async def delete_file(file_path: str) -> bool:
     """Delete a file from the uploads directory"""
@@ -93,6 +145,73 @@ async def delete_file(file_path: str) -> bool:
         logger.error(f"Error deleting file {file_path}: {str(e)}")
         return False
 
+def file_version(stat_result: os.stat_result) -> str:
+    """Version token of a stored file, changing whenever the file is replaced"""
+    return hashlib.md5(f"{stat_result.st_mtime_ns}-{stat_result.st_size}".encode()).hexdigest()[:16]
+
 def get_file_url(file_path: str) -> str:
-    """Convert file path to URL"""
-    return f"/uploads/{file_path}"
\ No newline at end of file
+    """Convert file path to a versioned URL that can be cached indefinitely.
+    
+    Content-addressed images are versioned by their name; other files get a
+    ?v= token from their modification time and size.
+    """
+    url = f"/uploads/{file_path}"
+    if image_content_key(file_path):
+        return url
+    try:
+        return f"{url}?v={file_version((UPLOAD_DIR / file_path).stat())}"
+    except OSError:
+        return url
+
+def primary_image_path(content_key: str, directory: Path = PRODUCT_IMAGES_DIR) -> Path:
+    """Path of the variant stored as a product's image_url"""
+    return directory / variant_filename(content_key, *PRIMARY_VARIANT)
+
+def image_content_key(file_path: Optional[str]) -> Optional[str]:
+    """Content key of a variant file path, or None for other images"""
+    if not file_path:
+        return None
+    match = VARIANT_FILE_PATTERN.match(Path(file_path).name)
+    return match.group("key") if match else None
+
+def image_reference_path(file_path: str) -> str:
+    """The image_url a stored file is referenced by: the primary variant for variant files,
+    and the file itself for a precompressed sibling"""
+    for suffix in PRECOMPRESSED_SUFFIXES.values():
+        if file_path.endswith(suffix):
+            return image_reference_path(file_path[:-len(suffix)])
+    key = image_content_key(file_path)
+    if key is None:
+        return file_path
+    return str(Path(file_path).parent / variant_filename(key, *PRIMARY_VARIANT))
+
+def image_variant_paths(file_path: str) -> List[str]:
+    """All stored files belonging to an image, relative to UPLOAD_DIR"""
+    key = image_content_key(file_path)
+    if key is None:
+        return [file_path]
+    directory = Path(file_path).parent
+    return [
+        str(directory / variant_filename(key, variant, image_format))
+        for variant in IMAGE_VARIANTS
+        for image_format in IMAGE_FORMATS
+    ]
+
+def image_srcset(file_path: Optional[str]) -> Optional[Dict[str, str]]:
+    """Map each image format to a srcset of its variant URLs"""
+    key = image_content_key(file_path)
+    if key is None:
+        return None
+    directory = Path(file_path).parent
+    return {
+        image_format: ", ".join(
+            f"{get_file_url(str(directory / variant_filename(key, variant, image_format)))} {width}w"
+            for variant, width in IMAGE_VARIANTS.items()
+        )
+        for image_format in IMAGE_FORMATS
+    }
+
+async def delete_image(file_path: str) -> None:
+    """Delete an image and all of its variants"""
+    for path in image_variant_paths(file_path):
+        await delete_file(path)
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""Bulk import of product images from a zip or tar archive.
+
+The archive is streamed to disk, its images are extracted one at a time
+under random names (member paths are never used on disk), processed into
+the usual variants by the image worker pool, and all products are updated
+in a single transaction.
+"""
+import asyncio
+import csv
+import functools
+import hashlib
+import io
+import json
+import shutil
+import tarfile
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from uuid import uuid4
+from fastapi import UploadFile
+from loguru import logger
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.exceptions import AgroFarmException
+from app.models.product import Product
+from app.utils.file_upload import (
+    ALLOWED_EXTENSIONS, MAX_IMAGE_SIZE, STAGING_DIR, UPLOAD_DIR, UPLOAD_CHUNK_SIZE, StagedUpload,
+    delete_image, primary_image_path, stream_upload, validate_image_header
+)
+from app.utils.image_processing import generate_variants, image_processor
+from app.utils.orphan_sweeper import find_references
+
+MANIFEST_NAMES = ("manifest.json", "manifest.csv")
+MAX_MANIFEST_SIZE = 1024 * 1024  # 1MB
+
+ProductRef = Union[int, str]
+
+class ImportResult:
+    """Outcome for one file in an import"""
+
+    PENDING = "pending"
+    IMPORTED = "imported"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(self, filename: str, product: Optional[ProductRef] = None):
+        self.filename = filename
+        self.product = product
+        self.product_id: Optional[int] = None
+        self.status = ImportResult.PENDING
+        self.error: Optional[str] = None
+        self.image_url: Optional[str] = None
+        self.deduplicated = False
+        self.staged: Optional[StagedUpload] = None
+
+    def fail(self, error: str) -> None:
+        self.status = ImportResult.FAILED
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {
+            "filename": self.filename,
+            "product": self.product,
+            "product_id": self.product_id,
+            "status": self.status,
+            "error": self.error,
+            "image_url": self.image_url,
+            "deduplicated": self.deduplicated,
+        }
+
+def parse_manifest(content: bytes, filename: str) -> Dict[str, ProductRef]:
+    """Parse a manifest mapping archive file names to product ids or names.
+
+    JSON manifests are an object of filename -> id or name; CSV manifests
+    have filename and product columns, where numeric products are ids.
+    """
+    try:
+        text = content.decode("utf-8-sig")
+        if filename.lower().endswith(".csv"):
+            rows = csv.DictReader(io.StringIO(text))
+            entries = {}
+            for row in rows:
+                product = (row.get("product") or "").strip()
+                entries[(row.get("filename") or "").strip()] = int(product) if product.isdigit() else product
+        else:
+            entries = json.loads(text)
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise ValueError(f"Invalid manifest: {str(e)}")
+
+    if not isinstance(entries, dict) or not all(
+        isinstance(name, str) and name and isinstance(product, (int, str)) and product != ""
+        for name, product in entries.items()
+    ):
+        raise ValueError("Manifest must map file names to product ids or names")
+    return entries
+
+@contextmanager
+def open_archive(path: Path) -> Iterator[Iterator[Tuple[str, Callable[[], IO[bytes]]]]]:
+    """Iterate over (member name, opener) for the regular files in a zip or tar archive"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            yield (
+                (info.filename, functools.partial(archive.open, info))
+                for info in archive.infolist() if not info.is_dir()
+            )
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, "r:*") as archive:
+            yield (
+                (member.name, functools.partial(archive.extractfile, member))
+                for member in archive if member.isfile()
+            )
+    else:
+        raise ValueError("Archive must be a zip or tar file")
+
+def _extract_image(source: IO[bytes], file_ext: str, directory: Path) -> StagedUpload:
+    """Copy one archive member to directory, validating it like a regular upload"""
+    destination = directory / f"{uuid4()}{file_ext}"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(destination, "wb") as f:
+            # Sizes in archive headers can't be trusted, so count while copying
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                if size == 0:
+                    validate_image_header(chunk, file_ext)
+                size += len(chunk)
+                if size > MAX_IMAGE_SIZE:
+                    raise ValueError(f"File size exceeds maximum limit of {MAX_IMAGE_SIZE/1024/1024}MB")
+                digest.update(chunk)
+                f.write(chunk)
+        if size == 0:
+            raise ValueError("File is empty")
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return StagedUpload(destination, size, digest.hexdigest())
+
+def extract_archive(
+    archive_path: Path,
+    directory: Path
+) -> Tuple[Dict[str, ImportResult], Optional[Dict[str, ProductRef]]]:
+    """Extract the images and manifest from an archive. Blocking; run in a thread."""
+    results: Dict[str, ImportResult] = {}
+    manifest = None
+    with open_archive(archive_path) as members:
+        for name, open_member in members:
+            basename = PurePosixPath(name).name
+            if basename.startswith(".") or name.startswith("__MACOSX/"):
+                continue
+            if basename.lower() in MANIFEST_NAMES and manifest is None:
+                with open_member() as f:
+                    content = f.read(MAX_MANIFEST_SIZE + 1)
+                if len(content) > MAX_MANIFEST_SIZE:
+                    raise ValueError("Manifest is too large")
+                manifest = parse_manifest(content, basename)
+                continue
+
+            file_ext = PurePosixPath(basename).suffix.lower()
+            if file_ext not in ALLOWED_EXTENSIONS:
+                continue
+            if len(results) >= settings.IMAGE_IMPORT_MAX_FILES:
+                raise ValueError(f"Archive contains more than {settings.IMAGE_IMPORT_MAX_FILES} images")
+
+            result = ImportResult(name)
+            try:
+                with open_member() as f:
+                    result.staged = _extract_image(f, file_ext, directory)
+            except (ValueError, OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+                result.fail(str(e))
+            results[name] = result
+    return results, manifest
+
+def _match_manifest(
+    results: Dict[str, ImportResult],
+    manifest: Dict[str, ProductRef]
+) -> List[ImportResult]:
+    """Attach manifest entries to extracted files, by member path or base name"""
+    by_basename: Dict[str, List[ImportResult]] = {}
+    for name, result in results.items():
+        by_basename.setdefault(PurePosixPath(name).name, []).append(result)
+
+    matched = []
+    matched_ids = set()
+    for filename, product in manifest.items():
+        candidates = [results[filename]] if filename in results else by_basename.get(filename, [])
+        if len(candidates) != 1 or id(candidates[0]) in matched_ids:
+            result = ImportResult(filename, product)
+            if not candidates:
+                result.fail("File not found in archive")
+            elif len(candidates) > 1:
+                result.fail("File name is ambiguous in archive")
+            else:
+                result.fail("File is listed more than once in the manifest")
+        else:
+            result = candidates[0]
+            result.product = product
+            matched_ids.add(id(result))
+        matched.append(result)
+
+    for result in results.values():
+        if id(result) not in matched_ids:
+            if result.status == ImportResult.PENDING:
+                result.status = ImportResult.SKIPPED
+                result.error = "File not listed in manifest"
+            matched.append(result)
+    return matched
+
+def _resolve_products(db: Session, results: List[ImportResult]) -> Dict[int, Product]:
+    """Look up the products named in the manifest with one query per reference kind"""
+    pending = [result for result in results if result.status == ImportResult.PENDING]
+    ids = {result.product for result in pending if isinstance(result.product, int)}
+    names = {result.product for result in pending if isinstance(result.product, str)}
+
+    products = {}
+    if ids:
+        products.update({product.id: product for product in db.query(Product).filter(Product.id.in_(ids))})
+    products_by_name: Dict[str, List[Product]] = {}
+    if names:
+        for product in db.query(Product).filter(Product.name.in_(names)):
+            products[product.id] = product
+            products_by_name.setdefault(product.name, []).append(product)
+
+    assigned = set()
+    for result in pending:
+        if isinstance(result.product, int):
+            product = products.get(result.product)
+            if product is None:
+                result.fail(f"Product {result.product} not found")
+                continue
+        else:
+            named = products_by_name.get(result.product, [])
+            if len(named) != 1:
+                result.fail(f"Product '{result.product}' not found" if not named else f"Product name '{result.product}' is ambiguous")
+                continue
+            product = named[0]
+        if product.id in assigned:
+            result.fail(f"Product {product.id} appears more than once in the manifest")
+            continue
+        assigned.add(product.id)
+        result.product_id = product.id
+    return products
+
+async def _process(result: ImportResult, limit: asyncio.Semaphore) -> None:
+    destination = primary_image_path(result.staged.content_key)
+    async with limit:
+        try:
+            job = await image_processor.process(
+                result.staged.path, destination, worker=generate_variants, reuse_existing=True
+            )
+        except AgroFarmException as e:
+            result.fail(e.detail)
+            return
+        except ValueError as e:
+            result.fail(str(e))
+            return
+    result.status = ImportResult.IMPORTED
+    result.deduplicated = job.deduplicated
+    result.image_url = str(destination.relative_to(UPLOAD_DIR))
+
+async def stage_archive(upload_file: UploadFile) -> Path:
+    """Stream an uploaded archive to the staging directory"""
+    suffix = "".join(PurePosixPath(upload_file.filename or "").suffixes[-2:])[:16]
+    archive_path = STAGING_DIR / f"{uuid4()}{suffix}"
+    await stream_upload(upload_file, archive_path, settings.IMAGE_IMPORT_MAX_ARCHIVE_SIZE)
+    return archive_path
+
+async def import_product_images(
+    db: Session,
+    archive: UploadFile,
+    manifest_file: Optional[UploadFile] = None
+) -> dict:
+    """Import an archive of product images and return a per-file report"""
+    manifest = None
+    if manifest_file is not None:
+        content = await manifest_file.read(MAX_MANIFEST_SIZE + 1)
+        if len(content) > MAX_MANIFEST_SIZE:
+            raise ValueError("Manifest is too large")
+        manifest = parse_manifest(content, manifest_file.filename or "manifest.json")
+
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    archive_path = await stage_archive(archive)
+    extract_dir = STAGING_DIR / f"import-{uuid4().hex}"
+    extract_dir.mkdir()
+    try:
+        try:
+            extracted, archive_manifest = await asyncio.to_thread(extract_archive, archive_path, extract_dir)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+            raise ValueError(f"Archive is corrupt: {str(e)}")
+        archive_path.unlink(missing_ok=True)
+        manifest = manifest if manifest is not None else archive_manifest
+        if manifest is None:
+            raise ValueError(f"No manifest provided or found in archive ({', '.join(MANIFEST_NAMES)})")
+
+        results = _match_manifest(extracted, manifest)
+        products = _resolve_products(db, results)
+
+        # Images are processed in parallel, up to the size of the worker pool
+        limit = asyncio.Semaphore(max(image_processor.max_workers, 1))
+        await asyncio.gather(*(
+            _process(result, limit) for result in results
+            if result.product_id is not None and result.staged is not None
+        ))
+
+        # Point every product at its new image in one transaction
+        old_images = set()
+        for result in results:
+            if result.status == ImportResult.IMPORTED:
+                product = products[result.product_id]
+                if product.image_url and product.image_url != result.image_url:
+                    old_images.add(product.image_url)
+                product.image_url = result.image_url
+        db.commit()
+
+        unused = old_images - find_references(db, old_images)
+        for image_path in unused:
+            await delete_image(image_path)
+    finally:
+        archive_path.unlink(missing_ok=True)
+        shutil.rmtree(extract_dir, ignore_errors=True)
+
+    counts = {status: 0 for status in (ImportResult.IMPORTED, ImportResult.FAILED, ImportResult.SKIPPED)}
+    for result in results:
+        counts[result.status] += 1
+    logger.info(
+        f"Image import: {counts[ImportResult.IMPORTED]} imported, "
+        f"{counts[ImportResult.FAILED]} failed, {counts[ImportResult.SKIPPED]} skipped"
+    )
+    return {**counts, "results": [result.to_dict() for result in results]}
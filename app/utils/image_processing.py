@@ -0,0 +1,350 @@
+import asyncio
+import functools
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Set, Tuple
+from uuid import uuid4
+from loguru import logger
+from app.core.config import settings
+from app.core.exceptions import ImageProcessingBusy
+from app.core.metrics import registry
+
+MAX_DIMENSION = 2000  # Maximum width/height in pixels
+JPEG_QUALITY = 85  # Good balance between quality and file size
+MAX_TRACKED_JOBS = 1000  # Finished jobs kept for status lookups
+# Resample in two steps (fast integer reduce, then LANCZOS) when shrinking by
+# more than this factor; quality is indistinguishable and it is much cheaper
+REDUCING_GAP = 3.0
+
+# Responsive variants generated for product images: name -> maximum width.
+# The detail variant is also bounded in height by MAX_DIMENSION.
+IMAGE_VARIANTS = {
+    "thumb": 200,
+    "card": 600,
+    "detail": MAX_DIMENSION,
+}
+# Output formats: name -> (Pillow format, file extension, save options)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", ".webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", ".jpg", {"quality": JPEG_QUALITY, "optimize": True, "progressive": True}),
+}
+# Written last, so its presence means the whole variant set exists
+PRIMARY_VARIANT = ("detail", "jpeg")
+
+image_jobs_total = registry.counter(
+    "image_jobs_total", "Image processing jobs by outcome", ("outcome",)
+)
+image_job_duration_seconds = registry.histogram(
+    "image_job_duration_seconds", "Image processing time in seconds, including queueing"
+)
+image_jobs_pending = registry.gauge(
+    "image_jobs_pending", "Image processing jobs queued or running"
+)
+
+class ImageTooLarge(ValueError):
+    """The image would decode to more pixels than the decoding budget allows"""
+
+def fit_size(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """Largest size with the same aspect ratio that fits in box, never upscaling"""
+    width, height = size
+    ratio = min(box[0] / width, box[1] / height, 1)
+    return max(int(width * ratio), 1), max(int(height * ratio), 1)
+
+def open_bounded(source: str, box: Tuple[int, int], max_pixels: int):
+    """Open an image for downscaling into box without decoding more than max_pixels.
+
+    JPEGs are decoded at the smallest of 1/2, 1/4 or 1/8 scale that still
+    covers the target size (draft mode), so the full-resolution bitmap is
+    never allocated. Formats without reduced decoding must fit the budget
+    at their stored size. Only headers have been read when the budget is
+    checked.
+    """
+    from PIL import Image  # Imported lazily to keep application startup fast
+
+    try:
+        img = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e)) from e
+    try:
+        img.draft("RGB", fit_size(img.size, box))
+        if img.width * img.height > max_pixels:
+            raise ImageTooLarge(
+                f"Image of {img.width}x{img.height} pixels exceeds the decoding "
+                f"budget of {max_pixels} pixels"
+            )
+        img.load()
+    except BaseException:
+        img.close()
+        raise
+    return img
+
+def resize_image(
+    source: str,
+    destination: str,
+    max_dimension: int = MAX_DIMENSION,
+    max_pixels: int = settings.IMAGE_MAX_DECODED_PIXELS
+) -> None:
+    """Decode, downscale and re-encode an image. Runs inside a worker process.
+
+    The result is written to a temporary name and renamed over destination,
+    so a failed job never leaves a partial file and an in-place job never
+    loses the original.
+    """
+    from PIL import Image  # Imported lazily to keep application startup fast
+
+    # Keeps the extension, which Pillow picks the output format from
+    temp_path = Path(destination).with_name(f".{uuid4().hex}.{Path(destination).name}")
+    try:
+        with open_bounded(source, (max_dimension, max_dimension), max_pixels) as img:
+            # Convert RGBA to RGB if needed
+            if img.mode == 'RGBA':
+                img = img.convert('RGB')
+
+            # Resize if image is too large
+            new_size = fit_size(img.size, (max_dimension, max_dimension))
+            if new_size != img.size:
+                img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+            # Optimize and save
+            img.save(temp_path, optimize=True, quality=JPEG_QUALITY)
+        os.replace(temp_path, destination)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+def variant_filename(key: str, variant: str, image_format: str) -> str:
+    """File name of one variant of a content-addressed image"""
+    return f"{key}-{variant}{IMAGE_FORMATS[image_format][1]}"
+
+def generate_variants(
+    source: str,
+    destination: str,
+    max_pixels: int = settings.IMAGE_MAX_DECODED_PIXELS
+) -> None:
+    """Write every variant of an image next to destination. Runs inside a worker process.
+
+    destination is the primary variant path; the other variants share its
+    content key. Each file is written to a temporary name and renamed into
+    place, so concurrent jobs for the same content never see partial files.
+    """
+    from PIL import Image  # Imported lazily to keep application startup fast
+
+    directory = Path(destination).parent
+    key = Path(destination).name.partition("-")[0]
+    primary = Path(destination)
+    written = []
+    try:
+        with open_bounded(source, (MAX_DIMENSION, MAX_DIMENSION), max_pixels) as img:
+            current = img.convert("RGB") if img.mode != "RGB" else img.copy()
+
+        # Largest first, so each smaller variant is resampled from the previous one
+        for variant, width in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+            height_limit = MAX_DIMENSION if variant == "detail" else current.height
+            new_size = fit_size(current.size, (width, height_limit))
+            if new_size != current.size:
+                current = current.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+            for image_format, (pil_format, _, options) in IMAGE_FORMATS.items():
+                path = directory / variant_filename(key, variant, image_format)
+                temp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+                current.save(temp_path, pil_format, **options)
+                written.append((temp_path, path))
+
+        # Rename the primary variant last
+        written.sort(key=lambda paths: paths[1] == primary)
+        for temp_path, path in written:
+            os.replace(temp_path, path)
+    finally:
+        for temp_path, _ in written:
+            if temp_path.exists():
+                temp_path.unlink()
+
+class ImageJob:
+    """State of one image processing job"""
+
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, source: Path, destination: Path):
+        self.id = uuid4().hex
+        self.source = source
+        self.destination = destination
+        self.status = ImageJob.PROCESSING
+        self.deduplicated = False
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.finished = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "deduplicated": self.deduplicated,
+        }
+
+class ImageProcessor:
+    """Runs image processing in a bounded process pool, off the event loop.
+
+    With max_workers=0 images are processed inline on the event loop, which
+    is only meant for debugging and comparison benchmarks.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, timeout: float):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, ImageJob]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a pool that lost a worker process; the next job starts a new one"""
+        if self._executor is executor:
+            logger.error("Image worker process died, restarting the process pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_job(self, job_id: str) -> Optional[ImageJob]:
+        return self._jobs.get(job_id)
+
+    def submit(
+        self,
+        source: Path,
+        destination: Path,
+        on_complete: Optional[Callable[[ImageJob], Awaitable[None]]] = None,
+        worker: Callable[[str, str], None] = resize_image,
+        reuse_existing: bool = False
+    ) -> ImageJob:
+        """Queue an image for processing and return immediately.
+
+        worker is a picklable function called with the source and destination
+        paths in a pool process. With reuse_existing, a job whose destination
+        already exists completes without running the worker.
+        """
+        if self._pending >= self.queue_size:
+            raise ImageProcessingBusy()
+
+        job = ImageJob(source, destination)
+        self._jobs[job.id] = job
+        while len(self._jobs) > MAX_TRACKED_JOBS:
+            self._jobs.popitem(last=False)
+
+        self._pending += 1
+        image_jobs_pending.inc()
+        task = asyncio.get_running_loop().create_task(
+            self._run(job, on_complete, worker, reuse_existing)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def process(
+        self,
+        source: Path,
+        destination: Path,
+        worker: Callable[[str, str], None] = resize_image,
+        reuse_existing: bool = False
+    ) -> ImageJob:
+        """Process an image and wait for the result"""
+        job = self.submit(source, destination, worker=worker, reuse_existing=reuse_existing)
+        await job.finished.wait()
+        if job.status == ImageJob.FAILED:
+            raise ValueError(job.error)
+        return job
+
+    async def _run(self, job: ImageJob, on_complete, worker, reuse_existing: bool) -> None:
+        still_running = False
+        try:
+            if reuse_existing and job.destination.exists():
+                job.deduplicated = True
+            elif self.max_workers > 0:
+                loop = asyncio.get_running_loop()
+                executor = self._get_executor()
+                try:
+                    future = loop.run_in_executor(executor, worker, str(job.source), str(job.destination))
+                    # Shielded: a timeout can't stop the pool process, only stop waiting for it
+                    await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    still_running = True
+                    future.add_done_callback(functools.partial(self._finish_late, job, reuse_existing, executor))
+                    raise
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+                    raise
+            else:
+                worker(str(job.source), str(job.destination))
+            job.status = ImageJob.DONE
+        except asyncio.TimeoutError:
+            job.status = ImageJob.FAILED
+            job.error = f"Image processing timed out after {self.timeout}s"
+        except ImageTooLarge as e:
+            job.status = ImageJob.FAILED
+            job.error = str(e)
+        except BrokenProcessPool:
+            job.status = ImageJob.FAILED
+            job.error = "Image processing worker crashed"
+        except Exception as e:
+            job.status = ImageJob.FAILED
+            job.error = "Invalid or unsupported image"
+            logger.error(f"Error processing image {job.source}: {str(e)}")
+        finally:
+            if not still_running:
+                self._pending -= 1
+                image_jobs_pending.dec()
+            job.finished_at = time.time()
+            image_jobs_total.inc(job.status)
+            image_job_duration_seconds.observe(job.finished_at - job.created_at)
+
+        # Workers only write temporary files of their own and rename them into place, so a
+        # failed job has nothing to remove; the destination may be a content-addressed file
+        # another job produced and other products reference
+        if not still_running and job.source != job.destination and job.source.exists():
+            job.source.unlink()
+
+        try:
+            if on_complete:
+                await on_complete(job)
+        except Exception as e:
+            logger.error(f"Error completing image job {job.id}: {str(e)}")
+        finally:
+            job.finished.set()
+
+    def _finish_late(
+        self, job: ImageJob, reuse_existing: bool, executor: ProcessPoolExecutor, future: asyncio.Future
+    ) -> None:
+        """Free the queue slot of a timed-out job once its pool process has really finished"""
+        self._pending -= 1
+        image_jobs_pending.dec()
+        error = None if future.cancelled() else future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._discard_executor(executor)
+        succeeded = not future.cancelled() and error is None
+        # The job was already reported failed, so discard its result. Content-addressed files
+        # are kept: they are correct, and other jobs may reference them.
+        if succeeded and not reuse_existing and job.source != job.destination:
+            job.destination.unlink(missing_ok=True)
+        if job.source != job.destination:
+            job.source.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+image_processor = ImageProcessor(
+    max_workers=settings.IMAGE_WORKERS,
+    queue_size=settings.IMAGE_QUEUE_SIZE,
+    timeout=settings.IMAGE_JOB_TIMEOUT
+)
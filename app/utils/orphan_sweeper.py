@@ -0,0 +1,218 @@
+"""Removal of uploaded files that no product references.
+
+The sweeper lists the uploads directory once with os.scandir, loads the
+referenced image paths once (streamed from the database), and deletes the
+difference in batches. Each batch is re-checked against the database right
+before deletion, so an image that became referenced during the sweep is kept.
+
+Usage:
+    python -m app.utils.orphan_sweeper [--dry-run] [--incremental]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from loguru import logger
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import ReadSessionLocal
+from app.core.metrics import registry
+from app.models.product import Product
+from app.utils.file_upload import UPLOAD_DIR, image_reference_path
+
+REFERENCE_QUERY_BATCH_SIZE = 1000  # Rows streamed per fetch when loading references
+REPORT_SAMPLE_SIZE = 20  # Orphan paths included in log summaries
+
+orphan_files_deleted_total = registry.counter(
+    "orphan_files_deleted_total", "Unreferenced upload files deleted by the sweeper"
+)
+
+class SweepReport:
+    """Outcome of one orphan sweep"""
+
+    def __init__(self, incremental: bool, dry_run: bool, cutoff: float, since: Optional[float]):
+        self.incremental = incremental
+        self.dry_run = dry_run
+        self.cutoff = cutoff
+        self.since = since
+        self.scanned = 0
+        self.candidates = 0
+        self.orphans: List[str] = []
+        self.orphan_bytes = 0
+        self.deleted = 0
+        self.errors = 0
+        self.duration = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": "incremental" if self.incremental else "full",
+            "dry_run": self.dry_run,
+            "scanned": self.scanned,
+            "candidates": self.candidates,
+            "orphans": len(self.orphans),
+            "orphan_bytes": self.orphan_bytes,
+            "deleted": self.deleted,
+            "errors": self.errors,
+            "duration_seconds": round(self.duration, 3),
+        }
+
+    def summary(self) -> str:
+        stats = ", ".join(f"{key}={value}" for key, value in self.to_dict().items())
+        sample = ", ".join(self.orphans[:REPORT_SAMPLE_SIZE])
+        return f"Orphan sweep: {stats}" + (f"; orphans: {sample}" if sample else "")
+
+def scan_files(root: Path) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield (path relative to root, stat) for every regular file below root"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        yield str(Path(entry.path).relative_to(root)), entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+
+def normalize_reference(image_url: str) -> str:
+    """Stored image_url as a path relative to the uploads directory"""
+    return image_url.removeprefix("/uploads/").lstrip("/")
+
+def load_references(db: Session) -> Set[str]:
+    """All image paths referenced by products, streamed from the database"""
+    rows = db.query(Product.image_url).filter(Product.image_url.isnot(None))
+    return {normalize_reference(image_url) for image_url, in rows.yield_per(REFERENCE_QUERY_BATCH_SIZE)}
+
+def find_references(db: Session, paths: Iterable[str]) -> Set[str]:
+    """The subset of paths referenced by a product"""
+    paths = list(set(paths))
+    referenced: Set[str] = set()
+    for start in range(0, len(paths), REFERENCE_QUERY_BATCH_SIZE):
+        batch = paths[start:start + REFERENCE_QUERY_BATCH_SIZE]
+        rows = db.query(Product.image_url).filter(
+            Product.image_url.in_(batch + [f"/uploads/{path}" for path in batch])
+        )
+        referenced.update(normalize_reference(image_url) for image_url, in rows)
+    return referenced
+
+def load_state(state_file: Path) -> Optional[float]:
+    """Cutoff of the last completed sweep, if any"""
+    try:
+        return float(json.loads(state_file.read_text())["cutoff"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def save_state(state_file: Path, cutoff: float) -> None:
+    temp_path = state_file.with_name(state_file.name + ".tmp")
+    temp_path.write_text(json.dumps({"cutoff": cutoff}))
+    os.replace(temp_path, state_file)
+
+def _delete_files(root: Path, paths: List[str]) -> Tuple[int, int]:
+    deleted = errors = 0
+    for path in paths:
+        try:
+            (root / path).unlink()
+            deleted += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            errors += 1
+            logger.error(f"Error deleting orphaned file {path}: {str(e)}")
+    return deleted, errors
+
+async def sweep_orphans(
+    incremental: bool = False,
+    dry_run: bool = False,
+    min_age_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    root: Path = UPLOAD_DIR,
+    state_file: Optional[Path] = None,
+) -> SweepReport:
+    """Find and delete uploaded files older than min_age_days that no product references.
+
+    A full sweep inspects every old file. An incremental sweep only inspects
+    files that became old enough since the last sweep, and looks up just
+    their references instead of loading all of them; files orphaned later
+    in their life, e.g. by a crash between replacing and deleting an image,
+    are left for the next full sweep.
+    """
+    min_age_days = settings.ORPHAN_MIN_AGE_DAYS if min_age_days is None else min_age_days
+    batch_size = batch_size or settings.ORPHAN_SWEEP_BATCH_SIZE
+    state_file = state_file or Path(settings.ORPHAN_SWEEP_STATE_FILE)
+
+    start_time = time.perf_counter()
+    cutoff = time.time() - min_age_days * 86400
+    since = load_state(state_file) if incremental else None
+    report = SweepReport(incremental, dry_run, cutoff, since)
+
+    def list_candidates() -> Dict[str, Tuple[str, int]]:
+        candidates = {}
+        for path, stat_result in scan_files(root):
+            report.scanned += 1
+            if stat_result.st_mtime >= cutoff or (since is not None and stat_result.st_mtime < since):
+                continue
+            candidates[path] = (image_reference_path(path), stat_result.st_size)
+        return candidates
+
+    # Listing and the reference query both block, so they run off the event loop
+    candidates = await asyncio.to_thread(list_candidates)
+    report.candidates = len(candidates)
+
+    def load_referenced() -> Set[str]:
+        db = ReadSessionLocal()
+        try:
+            if since is None:
+                return load_references(db)
+            return find_references(db, (reference for reference, _ in candidates.values()))
+        finally:
+            db.close()
+
+    referenced = await asyncio.to_thread(load_referenced) if candidates else set()
+    orphans = sorted(path for path, (reference, _) in candidates.items() if reference not in referenced)
+    report.orphans = orphans
+    report.orphan_bytes = sum(candidates[path][1] for path in orphans)
+
+    if not dry_run:
+        for start in range(0, len(orphans), batch_size):
+            batch = orphans[start:start + batch_size]
+
+            def delete_batch() -> Tuple[int, int]:
+                db = ReadSessionLocal()
+                try:
+                    # Keep anything referenced since the sweep started
+                    still_referenced = find_references(db, (candidates[path][0] for path in batch))
+                finally:
+                    db.close()
+                return _delete_files(root, [
+                    path for path in batch if candidates[path][0] not in still_referenced
+                ])
+
+            deleted, errors = await asyncio.to_thread(delete_batch)
+            report.deleted += deleted
+            report.errors += errors
+            orphan_files_deleted_total.inc(amount=deleted)
+
+        save_state(state_file, cutoff)
+
+    report.duration = time.perf_counter() - start_time
+    return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete uploaded files that no product references")
+    parser.add_argument("--dry-run", action="store_true", help="Only report orphaned files")
+    parser.add_argument("--incremental", action="store_true", help="Only inspect files added since the last sweep")
+    parser.add_argument("--min-age-days", type=int, default=None)
+    args = parser.parse_args()
+
+    report = asyncio.run(sweep_orphans(
+        incremental=args.incremental, dry_run=args.dry_run, min_age_days=args.min_age_days
+    ))
+    print(json.dumps({**report.to_dict(), "orphan_paths": report.orphans}, indent=2))
+
+if __name__ == "__main__":
+    main()
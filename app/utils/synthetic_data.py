@@ -0,0 +1,320 @@
+"""Deterministic synthetic datasets for benchmarks and capacity tests.
+
+Builds users, products, orders and order items of any size from a seed:
+the same seed and sizes always produce the same rows. Product prices are
+log-normal around a per-category median, order times spread over --days
+before --end-date, and both product popularity and customer activity are
+Zipf-skewed, so a few products and customers account for most orders.
+
+Rows are generated in chunks and loaded with SQLAlchemy Core executemany,
+committing every --commit-every rows. Secondary indexes are dropped before
+loading and built once at the end, which is much faster than maintaining
+them row by row. The target database must not already contain products.
+
+Usage:
+    python -m app.utils.synthetic_data --database-url sqlite:///./bench.db \\
+        [--products 1000000] [--users 100000] [--orders 4000000] [--seed 0]
+"""
+import argparse
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from loguru import logger
+from sqlalchemy import Index, Table, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from app.core.database import Base, create_db_engine
+from app.core.recommendations import rebuild_cooccurrences
+from app.core.sales import repair_sales_counters
+from app.core.security import get_password_hash
+from app.models import lease, outbox  # noqa: F401 - registers every table for create_all
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product, ProductCategory
+from app.models.user import User
+
+ADMIN_EMAIL = "admin@agrofarm.com"
+ADMIN_PASSWORD = "admin123"
+USER_PASSWORD = "password123"
+DEFAULT_END_DATE = datetime(2026, 1, 1)
+
+# Share of the catalog, median price and units per category
+CATEGORIES = {
+    ProductCategory.VEGETABLES: (0.32, 2.5, ("kg", "bunch", "pieces")),
+    ProductCategory.FRUITS: (0.28, 3.5, ("kg", "pieces", "box")),
+    ProductCategory.DAIRY: (0.15, 4.0, ("litres", "kg", "pieces")),
+    ProductCategory.GRAINS: (0.15, 2.0, ("kg", "bag")),
+    ProductCategory.OTHER: (0.10, 6.0, ("pieces", "jar", "kg")),
+}
+PRODUCT_NOUNS = {
+    ProductCategory.VEGETABLES: ("Tomatoes", "Carrots", "Spinach", "Potatoes", "Onions", "Peppers", "Cabbage"),
+    ProductCategory.FRUITS: ("Apples", "Mangoes", "Bananas", "Oranges", "Grapes", "Pears", "Plums"),
+    ProductCategory.DAIRY: ("Milk", "Yogurt", "Cheese", "Butter", "Cream", "Ghee"),
+    ProductCategory.GRAINS: ("Rice", "Wheat", "Oats", "Barley", "Millet", "Lentils"),
+    ProductCategory.OTHER: ("Honey", "Eggs", "Jam", "Pickles", "Herbs", "Mushrooms"),
+}
+ADJECTIVES = ("Fresh", "Organic", "Local", "Heirloom", "Premium", "Farm", "Hill", "Golden", "Wild", "Valley")
+PRICE_SIGMA = 0.5  # Spread of the log-normal price distribution
+
+# Orders placed in the last few days can still be open; older ones are settled
+OPEN_ORDER_DAYS = 3
+OPEN_STATUSES = (
+    (OrderStatus.PENDING, 0.35), (OrderStatus.CONFIRMED, 0.2), (OrderStatus.PROCESSING, 0.2),
+    (OrderStatus.SHIPPED, 0.15), (OrderStatus.CANCELLED, 0.1),
+)
+SETTLED_STATUSES = ((OrderStatus.DELIVERED, 0.88), (OrderStatus.CANCELLED, 0.12))
+
+class DatasetSpec:
+    """Sizes and distribution parameters of a dataset"""
+
+    def __init__(
+        self,
+        products: int = 10_000,
+        users: int = 1_000,
+        orders: int = 50_000,
+        items_per_order: float = 2.5,
+        product_skew: float = 1.1,
+        user_skew: float = 0.8,
+        days: int = 730,
+        end_date: datetime = DEFAULT_END_DATE,
+        seed: int = 0
+    ):
+        if products < 1 or users < 1:
+            raise ValueError("A dataset needs at least one product and one user")
+        self.products = products
+        self.users = users
+        self.orders = orders
+        self.items_per_order = max(items_per_order, 1.0)
+        self.product_skew = product_skew
+        self.user_skew = user_skew
+        self.days = days
+        self.end_date = end_date
+        self.seed = seed
+
+    def rng(self, stream: str) -> random.Random:
+        """Independent random stream per table, so changing one size doesn't reshuffle the others"""
+        return random.Random(f"{self.seed}:{stream}")
+
+def zipf_weights(n: int, skew: float) -> List[float]:
+    """Cumulative weights of ranks 1..n under a Zipf distribution"""
+    return list(itertools.accumulate(1.0 / rank ** skew for rank in range(1, n + 1)))
+
+def chunked(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def generate_users(spec: DatasetSpec) -> Iterator[dict]:
+    """The admin user first, then customers; all customers share one password"""
+    rng = spec.rng("users")
+    start = spec.end_date - timedelta(days=spec.days)
+    yield {
+        "id": 1, "email": ADMIN_EMAIL, "full_name": "Admin User",
+        "hashed_password": get_password_hash(ADMIN_PASSWORD),
+        "is_active": True, "is_admin": True, "created_at": start, "updated_at": start,
+    }
+    hashed_password = get_password_hash(USER_PASSWORD)  # Hashed once; bcrypt is slow by design
+    for user_id in range(2, spec.users + 1):
+        created_at = start + timedelta(seconds=rng.uniform(0, spec.days * 86400))
+        yield {
+            "id": user_id, "email": f"user{user_id}@example.com", "full_name": f"Customer {user_id}",
+            "hashed_password": hashed_password, "is_active": rng.random() > 0.02, "is_admin": False,
+            "created_at": created_at, "updated_at": created_at,
+        }
+
+def generate_products(spec: DatasetSpec, prices: List[float]) -> Iterator[dict]:
+    """Products with category-dependent prices; fills prices[id] for order items"""
+    rng = spec.rng("products")
+    categories = list(CATEGORIES)
+    category_weights = list(itertools.accumulate(share for share, _, _ in CATEGORIES.values()))
+    start = spec.end_date - timedelta(days=spec.days)
+    for product_id in range(1, spec.products + 1):
+        category = rng.choices(categories, cum_weights=category_weights)[0]
+        _, median_price, units = CATEGORIES[category]
+        price = round(median_price * math.exp(rng.gauss(0, PRICE_SIGMA)), 2) or 0.01
+        prices[product_id] = price
+        created_at = start + timedelta(seconds=rng.uniform(0, spec.days * 86400))
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(PRODUCT_NOUNS[category])} {product_id}"
+        unit = rng.choice(units)
+        yield {
+            "id": product_id, "name": name,
+            "description": f"{name} from {rng.choice(ADJECTIVES).lower()} farms, sold per {unit}",
+            "price": price,
+            "stock_quantity": 0 if rng.random() < 0.03 else rng.randint(1, 1000),
+            "category": category, "unit": unit,
+            "created_at": created_at, "updated_at": created_at,
+        }
+
+def generate_orders(spec: DatasetSpec, prices: Sequence[float], chunk_size: int) -> Iterator[Tuple[List[dict], List[dict]]]:
+    """Chunks of (orders, items); order totals match their items"""
+    rng = spec.rng("orders")
+    # Popularity follows a random permutation of ids so popular products aren't just the oldest
+    popular_products = list(range(1, spec.products + 1))
+    rng.shuffle(popular_products)
+    product_weights = zipf_weights(spec.products, spec.product_skew)
+    active_users = list(range(2, spec.users + 1)) or [1]
+    rng.shuffle(active_users)
+    user_weights = zipf_weights(len(active_users), spec.user_skew)
+    open_statuses, open_weights = zip(*OPEN_STATUSES)
+    settled_statuses, settled_weights = zip(*SETTLED_STATUSES)
+    # Extra items per order are geometric with this continuation probability
+    more_items = 1 - 1 / spec.items_per_order
+    window = spec.days * 86400
+
+    item_id = 0
+    order_id = 0
+    while order_id < spec.orders:
+        size = min(chunk_size, spec.orders - order_id)
+        user_ids = rng.choices(active_users, cum_weights=user_weights, k=size)
+        orders, items = [], []
+        for user_id in user_ids:
+            order_id += 1
+            age = rng.random() ** 0.7 * window  # Order volume grows towards the end date
+            created_at = spec.end_date - timedelta(seconds=age)
+            if age < OPEN_ORDER_DAYS * 86400:
+                status = rng.choices(open_statuses, open_weights)[0]
+            else:
+                status = rng.choices(settled_statuses, settled_weights)[0]
+            updated_at = created_at + timedelta(seconds=rng.uniform(0, min(age, 5 * 86400)))
+
+            count = 1
+            while count < 10 and rng.random() < more_items:
+                count += 1
+            total = 0.0
+            for product_id in set(rng.choices(popular_products, cum_weights=product_weights, k=count)):
+                item_id += 1
+                quantity = rng.randint(1, 5)
+                total += prices[product_id] * quantity
+                items.append({
+                    "id": item_id, "order_id": order_id, "product_id": product_id,
+                    "quantity": quantity, "unit_price": prices[product_id], "created_at": created_at,
+                })
+            orders.append({
+                "id": order_id, "user_id": user_id, "total_amount": round(total, 2), "status": status,
+                "shipping_address": f"{rng.randint(1, 999)} Farm Road", "contact_phone": f"555-{rng.randint(0, 9999):04d}",
+                "created_at": created_at, "updated_at": updated_at,
+            })
+        yield orders, items
+
+class BulkLoader:
+    """Executemany inserts on one connection, committing every commit_every rows"""
+
+    def __init__(self, conn: Connection, commit_every: int):
+        self.conn = conn
+        self.commit_every = commit_every
+        self.pending = 0
+        self.counts: Dict[str, int] = {}
+
+    def insert(self, table: Table, rows: List[dict]) -> None:
+        if not rows:
+            return
+        self.conn.execute(insert(table), rows)
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(rows)
+        self.pending += len(rows)
+        if self.pending >= self.commit_every:
+            self.conn.commit()
+            self.pending = 0
+
+    def finish(self) -> None:
+        self.conn.commit()
+        self.pending = 0
+
+def loaded_tables() -> List[Table]:
+    return [User.__table__, Product.__table__, Order.__table__, OrderItem.__table__]
+
+def generate_dataset(
+    engine: Engine,
+    spec: DatasetSpec,
+    chunk_size: int = 10_000,
+    commit_every: int = 500_000
+) -> Dict[str, int]:
+    """Create the schema and load a dataset. Returns the rows loaded per table."""
+    Base.metadata.create_all(bind=engine)
+    tables = loaded_tables()
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(Product.__table__)).scalar():
+            raise ValueError("The target database already contains products")
+
+    # Build secondary indexes once after loading instead of on every insert
+    indexes: List[Index] = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        index.drop(bind=engine, checkfirst=True)
+
+    is_sqlite = engine.dialect.name == "sqlite"
+    prices: List[float] = [0.0] * (spec.products + 1)
+    with engine.connect() as conn:
+        if is_sqlite:
+            # A failed load leaves a half-built dataset anyway; skip fsyncs
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        loader = BulkLoader(conn, commit_every)
+        for table, rows in (
+            (User.__table__, generate_users(spec)),
+            (Product.__table__, generate_products(spec, prices)),
+        ):
+            start = time.perf_counter()
+            for chunk in chunked(rows, chunk_size):
+                loader.insert(table, chunk)
+            logger.info(f"Loaded {loader.counts.get(table.name, 0)} {table.name} in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        for orders, items in generate_orders(spec, prices, chunk_size):
+            loader.insert(Order.__table__, orders)
+            loader.insert(OrderItem.__table__, items)
+        loader.finish()
+        logger.info(
+            f"Loaded {loader.counts.get('orders', 0)} orders and {loader.counts.get('order_items', 0)} "
+            f"items in {time.perf_counter() - start:.1f}s"
+        )
+
+    start = time.perf_counter()
+    for index in indexes:
+        index.create(bind=engine)
+    logger.info(f"Built {len(indexes)} indexes in {time.perf_counter() - start:.1f}s")
+
+    # Sales and co-purchase counters are normally kept by the order endpoints; derive them in one pass
+    start = time.perf_counter()
+    with Session(engine) as db:
+        repair_sales_counters(db, today=spec.end_date.date())
+        rebuild_cooccurrences(db)
+    if is_sqlite:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    logger.info(f"Built sales counters and co-purchases in {time.perf_counter() - start:.1f}s")
+    return {table.name: loader.counts.get(table.name, 0) for table in tables}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset")
+    parser.add_argument("--database-url", required=True, help="Target database, e.g. sqlite:///./bench.db")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--items-per-order", type=float, default=2.5, help="Mean items per order")
+    parser.add_argument("--product-skew", type=float, default=1.1, help="Zipf exponent of product popularity")
+    parser.add_argument("--user-skew", type=float, default=0.8, help="Zipf exponent of customer activity")
+    parser.add_argument("--days", type=int, default=730, help="Days of order history")
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=DEFAULT_END_DATE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Rows per executemany")
+    parser.add_argument("--commit-every", type=int, default=500_000, help="Rows per transaction")
+    args = parser.parse_args(argv)
+
+    spec = DatasetSpec(
+        products=args.products, users=args.users, orders=args.orders,
+        items_per_order=args.items_per_order, product_skew=args.product_skew, user_skew=args.user_skew,
+        days=args.days, end_date=args.end_date, seed=args.seed
+    )
+    start = time.perf_counter()
+    counts = generate_dataset(
+        create_db_engine(args.database_url), spec, chunk_size=args.chunk_size, commit_every=args.commit_every
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Catalog page image weight: single full-size image vs responsive variants.
+
+Processes N synthetic photos both ways: the old pipeline (one JPEG of up to
+MAX_DIMENSION pixels per product) and generate_variants. Reports the image
+bytes a catalog page of --page-size products downloads when the grid uses
+the full image, the card variant, or the thumbnail variant.
+
+Usage:
+    python -m benchmarks.catalog_weight [--images 20] [--page-size 20]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from benchmarks.image_uploads import make_jpeg
+from app.utils.image_processing import (
+    IMAGE_FORMATS, PRIMARY_VARIANT, generate_variants, resize_image, variant_filename
+)
+
+def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        sizes: Dict[str, int] = {}
+        timings = {"single": 0.0, "variants": 0.0}
+        for i in range(args.images):
+            source = workdir / f"source-{i}.jpg"
+            source.write_bytes(make_jpeg(args.width, args.height, i))
+
+            start = time.perf_counter()
+            single = workdir / f"single-{i}.jpg"
+            resize_image(str(source), str(single))
+            timings["single"] += time.perf_counter() - start
+            sizes["single"] = sizes.get("single", 0) + single.stat().st_size
+
+            start = time.perf_counter()
+            key = f"{i:032x}"
+            generate_variants(str(source), str(workdir / variant_filename(key, *PRIMARY_VARIANT)))
+            timings["variants"] += time.perf_counter() - start
+            for variant in ("card", "thumb"):
+                for image_format in IMAGE_FORMATS:
+                    label = f"{variant}.{image_format}"
+                    path = workdir / variant_filename(key, variant, image_format)
+                    sizes[label] = sizes.get(label, 0) + path.stat().st_size
+
+    results = {}
+    for label, total in sizes.items():
+        results[label] = {
+            "page_kb": total / args.images * args.page_size / 1024,
+            "reduction": sizes["single"] / total,
+        }
+    results["processing_seconds_per_image"] = {
+        label: seconds / args.images for label, seconds in timings.items()
+    }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    timings = results.pop("processing_seconds_per_image")
+    for label, stats in results.items():
+        print(f"{label:>10}: {stats['page_kb']:9.1f} KB per page  {stats['reduction']:6.1f}x smaller")
+    print(
+        f"processing per image: single {timings['single'] * 1000:.0f} ms, "
+        f"variants {timings['variants'] * 1000:.0f} ms"
+    )
+    if args.json:
+        args.json.write_text(json.dumps({**results, "processing_seconds_per_image": timings}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Mixed read/write SQLite benchmark: default engine vs the tuned engine profile.
+
+Readers page through products (like list_products) while writers place
+orders (decrement stock and insert an order with items, one transaction
+each). The default profile uses one engine with SQLite's default rollback
+journal; the tuned profile uses create_db_engine with WAL and pragmas and a
+separate read-only engine for readers.
+
+Usage:
+    python -m benchmarks.db_mixed [--products 5000] [--readers 8] [--writers 2] [--seconds 5]
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import Base, create_db_engine
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product, ProductCategory
+from app.models.user import User
+
+def build_database(engine: Engine, products: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    categories = list(ProductCategory)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "email": "bench@example.com", "full_name": "Bench", "hashed_password": "x",
+            "is_active": True, "is_admin": False,
+        }])
+        conn.execute(insert(Product), [{
+            "name": f"Product {i}", "description": "Benchmark product " * 10,
+            "price": 1 + (i % 50), "stock_quantity": 1_000_000,
+            "category": categories[i % len(categories)], "unit": "kg",
+        } for i in range(products)])
+
+def reader(engine: Engine, products: int, stop: threading.Event, latencies: List[float], errors: List[str]):
+    rng = random.Random()
+    while not stop.is_set():
+        offset = rng.randrange(0, max(products - 20, 1))
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    select(Product).order_by(Product.name).offset(offset).limit(20)
+                ).all()
+        except OperationalError as e:
+            errors.append(str(e.orig))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+def writer(engine: Engine, products: int, stop: threading.Event, latencies: List[float], errors: List[str]):
+    rng = random.Random()
+    while not stop.is_set():
+        product_ids = rng.sample(range(1, products + 1), 3)
+        start = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                for product_id in product_ids:
+                    conn.execute(
+                        update(Product).where(Product.id == product_id)
+                        .values(stock_quantity=Product.stock_quantity - 1)
+                    )
+                order_id = conn.execute(insert(Order).values(
+                    user_id=1, total_amount=10.0, status=OrderStatus.PENDING,
+                    shipping_address="1 Bench Road", contact_phone="0",
+                    created_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+                )).inserted_primary_key[0]
+                conn.execute(insert(OrderItem), [{
+                    "order_id": order_id, "product_id": product_id,
+                    "quantity": 1, "unit_price": 1.0, "created_at": datetime.utcnow(),
+                } for product_id in product_ids])
+        except OperationalError as e:
+            errors.append(str(e.orig))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+def summarize(latencies: List[float], errors: List[str], seconds: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    def percentile(p: float) -> float:
+        return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000 if ordered else 0.0
+    return {
+        "ops_per_sec": len(latencies) / seconds,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "errors": len(errors),
+    }
+
+def run_profile(name: str, args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / f'{name}.db'}"
+        if name == "tuned":
+            write_engine = create_db_engine(url)
+            read_engine = create_db_engine(url, read_only=True)
+        else:
+            write_engine = read_engine = create_engine(url, connect_args={"check_same_thread": False})
+
+        build_database(write_engine, args.products)
+
+        stop = threading.Event()
+        read_latencies: List[float] = []
+        write_latencies: List[float] = []
+        read_errors: List[str] = []
+        write_errors: List[str] = []
+        threads = [
+            threading.Thread(target=reader, args=(read_engine, args.products, stop, read_latencies, read_errors))
+            for _ in range(args.readers)
+        ] + [
+            threading.Thread(target=writer, args=(write_engine, args.products, stop, write_latencies, write_errors))
+            for _ in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        write_engine.dispose()
+        read_engine.dispose()
+        return {
+            "reads": summarize(read_latencies, read_errors, args.seconds),
+            "writes": summarize(write_latencies, write_errors, args.seconds),
+        }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = {name: run_profile(name, args) for name in ("default", "tuned")}
+    for name, result in results.items():
+        for kind, stats in result.items():
+            print(
+                f"{name:>8} {kind:>6}: {stats['ops_per_sec']:9.1f} ops/s  "
+                f"p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms  "
+                f"p99 {stats['p99_ms']:7.2f} ms  errors {stats['errors']}"
+            )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
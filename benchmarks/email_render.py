@@ -0,0 +1,98 @@
+"""Email rendering benchmark: messages rendered per second.
+
+Renders order status emails for a batch of orders (like a mass status
+update) three ways: the previous approach of building the template dict
+and calling str.format per message, the compiled Jinja2 templates one
+message at a time, and render_order_status_batch over the whole batch.
+The Jinja2 paths produce both an HTML and a plain-text part.
+
+Usage:
+    python -m benchmarks.email_render [--messages 2000] [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from app.models.order import OrderStatus
+from app.utils.email_templates import (
+    email_templates, order_status_context, render_order_status, render_order_status_batch
+)
+
+def legacy_template(status: OrderStatus) -> Dict[str, str]:
+    """The per-call dict of str.format templates this benchmark compares against (one status kept)"""
+    templates = {
+        OrderStatus.SHIPPED: {
+            "subject": "Your Order Has Been Shipped",
+            "body": """
+            Dear {customer_name},
+
+            Your order #{order_id} is on its way to you!
+
+            Order Details:
+            - Order ID: {order_id}
+            - Total Amount: ${total_amount:.2f}
+            - Status: Shipped
+            - Tracking Number: {tracking_number}
+
+            You can track your order using the tracking number above.
+
+            Thank you for shopping with Agro Farm!
+            """
+        },
+    }
+    return templates[status]
+
+def time_runs(render: Callable[[List[dict]], None], contexts: List[dict], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        render(contexts)
+        timings.append(time.perf_counter() - start)
+    return len(contexts) / statistics.median(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    status = OrderStatus.SHIPPED
+    contexts = [
+        order_status_context(f"Customer {i}", i, 10.0 + i % 100, status, tracking_number=f"TRK{i:08d}")
+        for i in range(args.messages)
+    ]
+
+    start = time.perf_counter()
+    email_templates.load()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    def legacy(batch: List[dict]) -> None:
+        for context in batch:
+            legacy_template(status)["body"].format(**context)
+
+    def single(batch: List[dict]) -> None:
+        for context in batch:
+            render_order_status(status, context)
+
+    def batched(batch: List[dict]) -> None:
+        render_order_status_batch(status, batch)
+
+    results = {
+        "template_load_ms": load_ms,
+        "str_format_html_only": time_runs(legacy, contexts, args.runs),
+        "jinja2_single": time_runs(single, contexts, args.runs),
+        "jinja2_batch": time_runs(batched, contexts, args.runs),
+    }
+    print(f"template load: {load_ms:.1f} ms (once at startup)")
+    for name, rate in results.items():
+        if name != "template_load_ms":
+            print(f"{name:>22}: {rate:10.0f} messages/s")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
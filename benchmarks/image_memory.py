@@ -0,0 +1,126 @@
+"""Peak memory per image: full-resolution decoding vs bounded (draft mode) decoding.
+
+Builds a corpus of large JPEG and PNG photos, then processes each image in
+a fresh subprocess and reports its peak RSS (VmHWM on Linux, ru_maxrss
+elsewhere). The "full" mode is
+the old pipeline, which decodes at original resolution and then resizes. The
+"bounded" mode is resize_image, which decodes JPEGs at reduced scale and
+enforces IMAGE_MAX_DECODED_PIXELS.
+
+Usage:
+    python -m benchmarks.image_memory [--json results.json]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from benchmarks.image_uploads import make_jpeg
+
+CORPUS = {
+    "jpeg_4000x3000": (4000, 3000, "JPEG"),
+    "jpeg_8000x6000": (8000, 6000, "JPEG"),
+    "jpeg_12000x9000": (12000, 9000, "JPEG"),
+    "png_4000x3000": (4000, 3000, "PNG"),
+}
+
+def build_corpus(directory: Path) -> Dict[str, Path]:
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = None
+    paths = {}
+    for name, (width, height, image_format) in CORPUS.items():
+        path = directory / f"{name}.{image_format.lower()}"
+        if image_format == "JPEG":
+            path.write_bytes(make_jpeg(width, height, len(paths)))
+        else:
+            Image.new("RGB", (width, height), "green").save(path)
+        paths[name] = path
+    return paths
+
+def process_full(source: str, destination: str) -> None:
+    """The pipeline before bounded decoding"""
+    from PIL import Image
+
+    with Image.open(source) as img:
+        img = img.convert("RGB")
+        ratio = min(2000 / img.width, 2000 / img.height)
+        img = img.resize((int(img.width * ratio), int(img.height * ratio)), Image.Resampling.LANCZOS)
+        img.save(destination, quality=85)
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives exec on Linux, so a child would report its parent's
+    # peak; the VmHWM high-water mark starts fresh in each process
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+def measure(mode: str, source: str, destination: str) -> None:
+    """Run in a subprocess: process one image and print peak RSS"""
+    from PIL import Image
+    from app.utils.image_processing import resize_image
+
+    Image.MAX_IMAGE_PIXELS = None
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    error = None
+    try:
+        if mode == "full":
+            process_full(source, destination)
+        else:
+            resize_image(source, destination)
+    except ValueError as e:
+        error = str(e)
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+        "growth_mb": peak_rss_mb() - baseline_mb,
+        "error": error,
+    }))
+
+def run(workdir: Path) -> Dict[str, Dict[str, dict]]:
+    results: Dict[str, Dict[str, dict]] = {}
+    for name, path in build_corpus(workdir).items():
+        results[name] = {}
+        for mode in ("full", "bounded"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.image_memory", "--measure", mode,
+                 str(path), str(workdir / f"{name}-{mode}.jpg")],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results[name][mode] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--measure", nargs=3, metavar=("MODE", "SOURCE", "DESTINATION"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(Path(tmp))
+    for name, modes in results.items():
+        line = f"{name:>16}:"
+        for mode, stats in modes.items():
+            outcome = "rejected" if stats["error"] else f"{stats['seconds'] * 1000:6.0f} ms"
+            line += f"  {mode} peak {stats['peak_rss_mb']:7.1f} MB (+{stats['growth_mb']:6.1f}) {outcome}"
+        print(line)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
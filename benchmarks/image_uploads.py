@@ -0,0 +1,141 @@
+"""API latency while product images are being uploaded and processed.
+
+Drives the ASGI app in-process with httpx. While N images are uploaded
+concurrently, a probe requests GET /health every few milliseconds; its
+latency shows how much image work blocks the event loop. Runs once with
+inline processing (IMAGE_WORKERS=0, the old behaviour) and once with the
+process pool.
+
+Usage:
+    python -m benchmarks.image_uploads [--images 20] [--workers 2]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+def make_jpeg(width: int, height: int, seed: int) -> bytes:
+    from PIL import Image
+
+    noise = Image.effect_noise((width // 4, height // 4), 40 + seed % 20).convert("RGB")
+    img = noise.resize((width, height))
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000 if ordered else 0.0
+
+async def run_scenario(app, headers: Dict[str, str], product_ids: List[int], images: List[bytes]) -> Dict[str, float]:
+    import httpx
+    from app.utils.image_processing import image_processor
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        probe_latencies: List[float] = []
+        uploads_done = asyncio.Event()
+
+        async def probe():
+            while not uploads_done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        async def upload(product_id: int, content: bytes) -> float:
+            start = time.perf_counter()
+            response = await client.post(
+                f"/api/products/{product_id}/image",
+                files={"image": ("photo.jpg", content, "image/jpeg")},
+                headers=headers,
+            )
+            response.raise_for_status()
+            job = image_processor.get_job(response.json()["job_id"])
+            await job.finished.wait()
+            return time.perf_counter() - start
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        durations = await asyncio.gather(*(
+            upload(product_ids[i % len(product_ids)], content) for i, content in enumerate(images)
+        ))
+        total = time.perf_counter() - start
+        uploads_done.set()
+        await probe_task
+
+    return {
+        "total_seconds": total,
+        "upload_p50_ms": percentile(durations, 0.50),
+        "probe_p50_ms": percentile(probe_latencies, 0.50),
+        "probe_p95_ms": percentile(probe_latencies, 0.95),
+        "probe_max_ms": max(probe_latencies) * 1000,
+        "probe_mean_ms": statistics.fmean(probe_latencies) * 1000,
+    }
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    from app.main import app
+    from app.core.database import SessionLocal
+    from app.core.security import create_access_token
+    from app.models.product import Product
+    from app.models.user import User
+    from app.utils.image_processing import image_processor
+    from app.utils.seed_data import seed_initial_data
+
+    images = [make_jpeg(args.width, args.height, seed) for seed in range(args.images)]
+    print(f"{len(images)} images, {statistics.fmean(len(i) for i in images) / 1e6:.1f} MB average")
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        db = SessionLocal()
+        try:
+            seed_initial_data(db)
+            admin = db.query(User).filter(User.is_admin.is_(True)).first()
+            product_ids = [product.id for product in db.query(Product).all()]
+        finally:
+            db.close()
+        headers = {"Authorization": f"Bearer {create_access_token(admin.id)}"}
+
+        for label, workers in (("inline", 0), ("process_pool", args.workers)):
+            image_processor.shutdown()
+            image_processor.max_workers = workers
+            results[label] = await run_scenario(app, headers, product_ids, images)
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    # Run against a throwaway database and upload directory
+    root = Path(__file__).resolve().parent.parent
+    workdir = Path(tempfile.mkdtemp(prefix="agrofarm-bench-"))
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ["IMAGE_QUEUE_SIZE"] = str(max(args.images, 32))
+    os.environ["SCHEDULER_ENABLED"] = "False"
+    sys.path.insert(0, str(root))
+    os.chdir(workdir)
+
+    results = asyncio.run(main_async(args))
+    for label, stats in results.items():
+        print(
+            f"{label:>13}: total {stats['total_seconds']:6.2f} s  "
+            f"probe p50 {stats['probe_p50_ms']:7.1f} ms  p95 {stats['probe_p95_ms']:7.1f} ms  "
+            f"max {stats['probe_max_ms']:7.1f} ms"
+        )
+    if args.json:
+        (root / args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""In-process load test: throughput and latency percentiles for a scenario mix.
+
+Drives the ASGI app in-process with httpx against a throwaway database. A
+fixed number of virtual users each loop for --duration seconds, picking a
+scenario by weight on every iteration: browsing and searching the catalog,
+fetching a product, logging in, placing an order and listing orders. The
+first --warmup seconds are not measured.
+
+Results are reported per scenario (requests/s, errors, p50/p95/p99) and
+can be written as JSON. Given --baseline, a previous JSON result is
+compared against this run and any throughput drop or p95/p99 rise beyond
+--threshold percent is reported as a regression; the exit status is then 1.
+
+Usage:
+    python -m benchmarks.load_test [--concurrency 20] [--duration 10] [--mix browse=40,search=15,...]
+    python -m benchmarks.load_test --json baseline.json
+    python -m benchmarks.load_test --baseline baseline.json [--threshold 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+DEFAULT_MIX = "browse=40,search=15,get_product=25,login=2,create_order=8,list_orders=10"
+SEARCH_TERMS = ("fresh", "organic", "milk", "apple", "product 1", "farm")
+PASSWORD = "loadtest123"
+# Scenarios with fewer measured requests than this are too noisy to compare
+MIN_COMPARABLE_REQUESTS = 30
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name.strip()!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000 if ordered else 0.0
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict[str, float]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+class VirtualUser:
+    """One customer session issuing scenario requests back to back"""
+
+    def __init__(self, client, rng: random.Random, email: str, token: str, product_ids: List[int]):
+        self.client = client
+        self.rng = rng
+        self.email = email
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.product_ids = product_ids
+
+    async def browse(self):
+        limit = 20
+        skip = self.rng.randrange(0, max(len(self.product_ids) - limit, 1))
+        return await self.client.get("/api/products/", params={"skip": skip, "limit": limit})
+
+    async def search(self):
+        return await self.client.get("/api/products/", params={"search": self.rng.choice(SEARCH_TERMS)})
+
+    async def get_product(self):
+        return await self.client.get(f"/api/products/{self.rng.choice(self.product_ids)}")
+
+    async def login(self):
+        return await self.client.post("/api/auth/login", data={"username": self.email, "password": PASSWORD})
+
+    async def create_order(self):
+        items = [
+            {"product_id": product_id, "quantity": self.rng.randint(1, 3)}
+            for product_id in self.rng.sample(self.product_ids, self.rng.randint(1, 4))
+        ]
+        return await self.client.post("/api/orders/", headers=self.headers, json={
+            "shipping_address": "1 Farm Road", "contact_phone": "555-0100", "items": items,
+        })
+
+    async def list_orders(self):
+        return await self.client.get("/api/orders/", headers=self.headers)
+
+SCENARIOS = ("browse", "search", "get_product", "login", "create_order", "list_orders")
+
+def seed(products: int, users: int) -> Tuple[List[int], List[Tuple[str, str]]]:
+    """Insert products and customers; returns product ids and (email, token) pairs"""
+    from sqlalchemy import insert
+    from app.core.database import SessionLocal
+    from app.core.security import create_access_token, get_password_hash
+    from app.models.product import Product, ProductCategory
+    from app.models.user import User
+
+    categories = list(ProductCategory)
+    hashed_password = get_password_hash(PASSWORD)  # Hashed once; bcrypt is slow by design
+    db = SessionLocal()
+    try:
+        db.execute(insert(Product), [{
+            "name": f"Product {i}", "description": f"Fresh organic farm product number {i}",
+            "price": 1 + (i % 50), "stock_quantity": 10_000_000,
+            "category": categories[i % len(categories)], "unit": "kg",
+        } for i in range(products)])
+        db.execute(insert(User), [{
+            "email": f"customer{i}@example.com", "full_name": f"Customer {i}",
+            "hashed_password": hashed_password, "is_active": True, "is_admin": False,
+        } for i in range(users)])
+        db.commit()
+        product_ids = [product_id for product_id, in db.query(Product.id)]
+        customers = [(email, create_access_token(user_id)) for user_id, email in db.query(User.id, User.email)]
+    finally:
+        db.close()
+    return product_ids, customers
+
+async def run_load(app, args: argparse.Namespace, weights: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    product_ids, customers = seed(args.products, args.concurrency)
+    names, scenario_weights = list(weights), list(weights.values())
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + args.warmup
+        stop_at = measure_from + args.duration
+
+        async def virtual_user(index: int) -> None:
+            email, token = customers[index % len(customers)]
+            rng = random.Random(args.seed + index)
+            user = VirtualUser(client, rng, email, token, product_ids)
+            while loop.time() < stop_at:
+                name = rng.choices(names, scenario_weights)[0]
+                request: Callable[[], Awaitable] = getattr(user, name)
+                start = time.perf_counter()
+                response = await request()
+                elapsed = time.perf_counter() - start
+                if loop.time() < measure_from:
+                    continue
+                if response.status_code >= 400:
+                    errors[name] += 1
+                else:
+                    latencies[name].append(elapsed)
+
+        await asyncio.gather(*(virtual_user(i) for i in range(args.concurrency)))
+
+    results = {name: summarize(latencies[name], errors[name], args.duration) for name in names}
+    results["total"] = summarize(
+        [value for values in latencies.values() for value in values], sum(errors.values()), args.duration
+    )
+    return results
+
+async def main_async(args: argparse.Namespace, weights: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+    from app.core import logging as app_logging
+    from app.main import app
+
+    # Access logs still go to logs/access.log; keep them off the console
+    app_logging.LOG_LEVEL = "WARNING"
+    async with app.router.lifespan_context(app):
+        return await run_load(app, args, weights)
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Describe every metric that regressed by more than threshold percent"""
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if not before or min(stats["requests"], before["requests"]) < MIN_COMPARABLE_REQUESTS:
+            continue
+        change = (stats["rps"] - before["rps"]) / before["rps"] * 100
+        if change < -threshold:
+            regressions.append(f"{name}: throughput {before['rps']:.1f} -> {stats['rps']:.1f} req/s ({change:+.1f}%)")
+        for metric in ("p95_ms", "p99_ms"):
+            if before[metric] <= 0:
+                continue
+            change = (stats[metric] - before[metric]) / before[metric] * 100
+            if change > threshold:
+                regressions.append(
+                    f"{name}: {metric} {before[metric]:.1f} -> {stats[metric]:.1f} ms ({change:+.1f}%)"
+                )
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before that")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, name=weight,...")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--baseline", type=Path, help="Compare against results written by --json")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+    weights = parse_mix(args.mix)
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else None
+    json_path = args.json.resolve() if args.json else None
+
+    # Run against a throwaway database and upload directory
+    root = Path(__file__).resolve().parent.parent
+    workdir = Path(tempfile.mkdtemp(prefix="agrofarm-bench-"))
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ["SCHEDULER_ENABLED"] = "False"
+    sys.path.insert(0, str(root))
+    os.chdir(workdir)
+
+    results = asyncio.run(main_async(args, weights))
+    print(f"{args.concurrency} virtual users, {args.duration:.0f} s measured")
+    print(f"{'scenario':>13} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in results.items():
+        print(
+            f"{name:>13} {stats['requests']:9d} {stats['errors']:7d} {stats['rps']:8.1f} "
+            f"{stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f}"
+        )
+    if json_path:
+        output = {
+            "config": {
+                "concurrency": args.concurrency, "duration": args.duration,
+                "mix": weights, "products": args.products, "seed": args.seed,
+            },
+            "results": results,
+        }
+        json_path.write_text(json.dumps(output, indent=2))
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0f}% against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0f}% against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
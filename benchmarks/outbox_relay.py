@@ -0,0 +1,110 @@
+"""Outbox relay throughput, with and without concurrent writers.
+
+Seeds the outbox with pending events, then drains it with OutboxRelay into
+an EventManager with a no-op handler and reports events/sec. The second run
+keeps writer threads inserting new events (one per transaction, like order
+endpoints) while the relay drains, and reports the writers' commit latency.
+
+Usage:
+    python -m benchmarks.outbox_relay [--events 20000] [--batch-size 200] [--writers 2]
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, create_db_engine
+from app.core.events import EventManager
+from app.core.outbox import OutboxRelay, add_event
+from app.models.outbox import OutboxEvent
+
+EVENT_TYPE = "order.status_changed"
+
+async def noop_handler(order_id: int, new_status: str) -> None:
+    pass
+
+def seed(session_factory: sessionmaker, events: int) -> None:
+    with session_factory() as db:
+        db.execute(insert(OutboxEvent), [{
+            "event_type": EVENT_TYPE,
+            "payload": json.dumps({"order_id": i, "old_status": "pending", "new_status": "confirmed"}),
+            "created_at": datetime.utcnow(),
+        } for i in range(events)])
+        db.commit()
+
+def writer(session_factory: sessionmaker, stop: threading.Event, latencies: List[float]) -> None:
+    order_id = 0
+    while not stop.is_set():
+        order_id += 1
+        start = time.perf_counter()
+        with session_factory() as db:
+            add_event(db, EVENT_TYPE, order_id=order_id, old_status="pending", new_status="confirmed")
+            db.commit()
+        latencies.append(time.perf_counter() - start)
+
+async def drain(relay: OutboxRelay, events: int) -> float:
+    start = time.perf_counter()
+    relayed = 0
+    while relayed < events:
+        relayed += await relay.relay_once()
+    return time.perf_counter() - start
+
+def run(args: argparse.Namespace, writers: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'outbox.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(session_factory, args.events)
+
+        manager = EventManager()
+        manager.subscribe(EVENT_TYPE, noop_handler)
+        relay = OutboxRelay(manager, session_factory=session_factory, batch_size=args.batch_size)
+
+        stop = threading.Event()
+        latencies: List[float] = []
+        threads = [
+            threading.Thread(target=writer, args=(session_factory, stop, latencies)) for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        elapsed = asyncio.run(drain(relay, args.events))
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    ordered = sorted(latencies)
+    return {
+        "events_per_sec": args.events / elapsed,
+        "seconds": elapsed,
+        "writer_commits": len(latencies),
+        "writer_p95_ms": ordered[int(len(ordered) * 0.95)] * 1000 if ordered else 0.0,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results = {"idle": run(args, 0), "with_writers": run(args, args.writers)}
+    for name, stats in results.items():
+        print(
+            f"{name:>12}: {stats['events_per_sec']:9.1f} events/s  "
+            f"writer commits {stats['writer_commits']}  writer p95 {stats['writer_p95_ms']:.2f} ms"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Startup benchmark: cold start to first request.
+
+Runs each measurement in a fresh interpreter so nothing is cached in
+sys.modules. Reports the slowest imports from ``python -X importtime`` and
+the wall-clock time to import ``app.main``, run the lifespan startup and
+serve ``GET /health``.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--top 15] [--json results.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FIRST_REQUEST_SCRIPT = """
+import time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    response = client.get("/health")
+    assert response.status_code == 200
+    first_request = time.perf_counter()
+print(imported - start, started - start, first_request - start)
+"""
+
+def run_python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+def import_times(module: str = "app.main") -> List[Tuple[int, int, str]]:
+    """Return (self_us, cumulative_us, module) rows from -X importtime"""
+    result = run_python(["-X", "importtime", "-c", f"import {module}"])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+def cold_start(runs: int) -> Dict[str, float]:
+    """Median seconds from interpreter start to import, lifespan startup and first response"""
+    samples = []
+    for _ in range(runs):
+        output = run_python(["-c", FIRST_REQUEST_SCRIPT]).stdout.split()
+        samples.append([float(value) for value in output[-3:]])
+    imported, started, first_request = zip(*samples)
+    return {
+        "import_seconds": statistics.median(imported),
+        "startup_seconds": statistics.median(started),
+        "first_request_seconds": statistics.median(first_request),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    rows = import_times()
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]
+    print(f"{'cumulative [ms]':>16} {'self [ms]':>10}  module")
+    for self_us, cumulative_us, name in slowest:
+        print(f"{cumulative_us / 1000:16.1f} {self_us / 1000:10.1f}  {name}")
+
+    timings = cold_start(args.runs)
+    print()
+    for name, seconds in timings.items():
+        print(f"{name:>22}: {seconds * 1000:8.1f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "timings": timings,
+            "slowest_imports": [
+                {"module": name, "self_us": self_us, "cumulative_us": cumulative_us}
+                for self_us, cumulative_us, name in slowest
+            ],
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Typeahead benchmark: prefix index lookups and updates at catalog scale.
+
+Builds the suggest prefix index over synthetic product names (the same
+generator as app.utils.synthetic_data, with Pareto-distributed units sold)
+and times lookups for every prefix a user would type on the way to a random
+product name, then single-product adds and removes.
+
+Usage:
+    python -m benchmarks.suggest [--products 1000000] [--lookups 20000]
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from app.core.suggest import PrefixIndex
+from app.utils.synthetic_data import DatasetSpec, generate_products
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    spec = DatasetSpec(products=args.products, seed=args.seed)
+    prices = [0.0] * (args.products + 1)
+    products = [
+        (row["id"], row["name"], row["category"], int(rng.paretovariate(1.2)))
+        for row in generate_products(spec, prices)
+    ]
+
+    start = time.perf_counter()
+    index = PrefixIndex(products)
+    print(f"Built index of {len(index)} products ({len(index.keys)} keys) in {time.perf_counter() - start:.1f}s")
+
+    # Every prefix typed on the way to a name, so short and long prefixes are both covered
+    queries = []
+    while len(queries) < args.lookups:
+        name = rng.choice(products)[1]
+        queries.extend(name[:length] for length in range(1, len(name) + 1))
+    latencies = []
+    for query in queries[:args.lookups]:
+        start = time.perf_counter()
+        index.search(query, args.limit)
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"Lookups: p50 {percentile(latencies, 0.50):.3f} ms, p99 {percentile(latencies, 0.99):.3f} ms, "
+        f"max {max(latencies) * 1000:.3f} ms"
+    )
+
+    new_ids = range(args.products + 1, args.products + 201)
+    start = time.perf_counter()
+    for product_id in new_ids:
+        _, name, category, units_sold = rng.choice(products)
+        index.add(product_id, name, category, units_sold)
+    added = time.perf_counter() - start
+    start = time.perf_counter()
+    for product_id in new_ids:
+        index.remove(product_id)
+    removed = time.perf_counter() - start
+    print(f"Updates: add {added / len(new_ids) * 1000:.2f} ms, remove {removed / len(new_ids) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
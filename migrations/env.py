@@ -6,7 +6,7 @@ from alembic import context
 # Import our models and Base
 from app.core.config import settings
 from app.models.user import Base
-from app.models import user, product, order  # Import all models
+from app.models import user, product, order, outbox, lease  # Import all models
 
 # this is the Alembic Config object
 config = context.config
@@ -35,8 +35,24 @@ def run_migrations_offline() -> None:
     with context.begin_transaction():
         context.run_migrations()
 
+def run_migrations_on(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True  # Add this for SQLite support
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    # init_db passes the application's own connection
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations_on(connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -44,14 +60,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata,
-            render_as_batch=True  # Add this for SQLite support
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        run_migrations_on(connection)
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,29 @@
+"""Leases for leader election
+
+Revision ID: leases
+Revises: order_status_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'leases'
+down_revision = 'order_status_index'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases set up before migrations may already have it from create_all
+    if sa.inspect(op.get_bind()).has_table('leases'):
+        return
+    op.create_table(
+        'leases',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('holder', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+def downgrade():
+    op.drop_table('leases')
@@ -0,0 +1,23 @@
+"""Index open orders by status and the time they entered it
+
+Revision ID: order_status_index
+Revises: stock_alerts
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'order_status_index'
+down_revision = 'stock_alerts'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases set up before migrations may already have it from create_all
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('orders')}
+    if 'ix_orders_status_updated_at' not in indexes:
+        op.create_index('ix_orders_status_updated_at', 'orders', ['status', 'updated_at'])
+
+def downgrade():
+    op.drop_index('ix_orders_status_updated_at', 'orders')
@@ -0,0 +1,41 @@
+"""Transactional outbox
+
+Revision ID: outbox
+Revises: initial_setup
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'outbox'
+down_revision = 'initial_setup'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases set up before migrations may already have it from create_all
+    if sa.inspect(op.get_bind()).has_table('outbox'):
+        return
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_by', sa.String(), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_outbox_unprocessed', 'outbox', ['id'],
+        sqlite_where=sa.text('processed_at IS NULL'),
+        postgresql_where=sa.text('processed_at IS NULL')
+    )
+    op.create_index('ix_outbox_processed_at', 'outbox', ['processed_at'])
+
+def downgrade():
+    op.drop_index('ix_outbox_processed_at', 'outbox')
+    op.drop_index('ix_outbox_unprocessed', 'outbox')
+    op.drop_table('outbox')
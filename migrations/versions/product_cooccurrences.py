@@ -0,0 +1,46 @@
+"""Product co-purchase counts
+
+Revision ID: product_cooccurrences
+Revises: product_sales
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+# revision identifiers
+revision = 'product_cooccurrences'
+down_revision = 'product_sales'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases set up before migrations may already have it from create_all
+    if sa.inspect(op.get_bind()).has_table('product_cooccurrences'):
+        return
+    op.create_table(
+        'product_cooccurrences',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('related_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['related_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id', 'related_id')
+    )
+    op.create_index(
+        'ix_product_cooccurrences_top', 'product_cooccurrences', ['product_id', 'count', 'related_id']
+    )
+    # Counts for past orders, as python -m app.core.recommendations --rebuild computes them
+    op.execute(
+        "INSERT INTO product_cooccurrences (product_id, related_id, count) "
+        "SELECT item.product_id, other.product_id, COUNT(DISTINCT item.order_id) "
+        "FROM order_items item JOIN order_items other "
+        "ON other.order_id = item.order_id AND other.product_id != item.product_id "
+        "WHERE item.order_id IN (SELECT order_id FROM order_items GROUP BY order_id "
+        f"HAVING COUNT(DISTINCT product_id) <= {int(settings.RECOMMENDATIONS_MAX_BASKET)}) "
+        "GROUP BY item.product_id, other.product_id"
+    )
+
+def downgrade():
+    op.drop_index('ix_product_cooccurrences_top', 'product_cooccurrences')
+    op.drop_table('product_cooccurrences')
@@ -0,0 +1,76 @@
+"""Product sales counters and daily buckets
+
+Revision ID: product_sales
+Revises: leases
+Create Date: 2026-10-19
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+# revision identifiers
+revision = 'product_sales'
+down_revision = 'leases'
+branch_labels = None
+depends_on = None
+
+# Order items of orders that still count as sales
+LIVE_ITEMS = (
+    "FROM order_items JOIN orders ON orders.id = order_items.order_id "
+    "WHERE orders.status != 'CANCELLED'"
+)
+
+def upgrade():
+    # Databases set up before migrations may already have these from create_all
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('products')}
+    if 'units_sold' not in existing:
+        op.add_column('products', sa.Column('units_sold', sa.Integer(), nullable=False, server_default='0'))
+    if 'order_count' not in existing:
+        op.add_column('products', sa.Column('order_count', sa.Integer(), nullable=False, server_default='0'))
+    if 'last_sold_at' not in existing:
+        op.add_column('products', sa.Column('last_sold_at', sa.DateTime(), nullable=True))
+    if 'ix_products_popularity' not in {index['name'] for index in inspector.get_indexes('products')}:
+        op.create_index('ix_products_popularity', 'products', ['units_sold', 'id'])
+    has_buckets = inspector.has_table('product_sales_buckets')
+    if not has_buckets:
+        op.create_table(
+            'product_sales_buckets',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('units_sold', sa.Integer(), nullable=False),
+            sa.Column('order_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('day', 'product_id')
+        )
+
+    # Counters for past orders, as the repair job computes them
+    op.execute(
+        "UPDATE products SET "
+        f"units_sold = COALESCE((SELECT SUM(order_items.quantity) {LIVE_ITEMS} "
+        "AND order_items.product_id = products.id), 0), "
+        f"order_count = (SELECT COUNT(DISTINCT order_items.order_id) {LIVE_ITEMS} "
+        "AND order_items.product_id = products.id), "
+        "last_sold_at = (SELECT MAX(orders.created_at) FROM order_items "
+        "JOIN orders ON orders.id = order_items.order_id WHERE order_items.product_id = products.id)"
+    )
+    if not has_buckets:
+        start = datetime.utcnow().date() - timedelta(days=settings.SALES_BUCKET_RETENTION_DAYS - 1)
+        op.get_bind().execute(
+            sa.text(
+                "INSERT INTO product_sales_buckets (day, product_id, units_sold, order_count) "
+                "SELECT DATE(orders.created_at), order_items.product_id, SUM(order_items.quantity), "
+                f"COUNT(DISTINCT order_items.order_id) {LIVE_ITEMS} AND orders.created_at >= :start "
+                "GROUP BY DATE(orders.created_at), order_items.product_id"
+            ),
+            {"start": datetime.combine(start, datetime.min.time())}
+        )
+
+def downgrade():
+    op.drop_table('product_sales_buckets')
+    op.drop_index('ix_products_popularity', 'products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('last_sold_at')
+        batch_op.drop_column('order_count')
+        batch_op.drop_column('units_sold')
@@ -0,0 +1,32 @@
+"""Low-stock threshold and alert state on products
+
+Revision ID: stock_alerts
+Revises: outbox
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'stock_alerts'
+down_revision = 'outbox'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('low_stock_threshold', sa.Integer()),
+    ('low_stock_alerted_at', sa.DateTime()),
+    ('low_stock_alerted_quantity', sa.Integer()),
+]
+
+def upgrade():
+    # Databases set up before migrations may already have them from create_all
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('products')}
+    for name, column_type in COLUMNS:
+        if name not in existing:
+            op.add_column('products', sa.Column(name, column_type, nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        for name, _ in reversed(COLUMNS):
+            batch_op.drop_column(name)